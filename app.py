@@ -1,6 +1,22 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
-from crawler import scrape_news
+from crawler import (scrape_news, crawl_job, crawl_options, conditional_stats,
+                     circuit_breakers, MAX_STORIES, HEADERS, request_url)
+from news_cache import NewsCache
+from frontier import encode_cursor, decode_cursor, story_id
+from crawl_job import CrawlJob, news_for_query
+from article_store import ArticleStore
+from crawl_worker import NEWS_SNAPSHOT, JOB_SNAPSHOT
+import metrics
+from image_proxy import ImageProxy, ImageFetchError, parse_variant, check_image_url
+from response_cache import EncodedResponse, EncodedResponseCache
+from article_fields import format_timestamp, parse_time_arg
+from records import Article, json_default
+from collections import OrderedDict
+import functools
+import json
+import os
+import threading
 import socket
 import time
 import logging
@@ -38,81 +54,344 @@ class CustomRequestHandler(WSGIRequestHandler):
 app = Flask(__name__)
 CORS(app)  # 允許跨域請求，讓Flutter可以調用
 
-def ensure_images_field(news_item):
-    """確保新聞項目包含images字段，提供向後兼容性"""
-    if 'images' not in news_item:
-        news_item['images'] = []
-    elif news_item['images'] is None:
-        news_item['images'] = []
-    elif not isinstance(news_item['images'], list):
-        news_item['images'] = []
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """記錄每個端點的處理時間（串流回應只計到開始傳送為止）"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unknown'
+        metrics.registry.observe('api_request_seconds', time.perf_counter() - started, endpoint=endpoint)
+        metrics.registry.inc('api_requests_total', endpoint=endpoint, status=response.status_code)
+    return response
+
+def process_news_item(news_item):
+    """
+    快照中的 dict 轉為 records.Article（驗證圖片欄位）；爬蟲與本地儲存產生的 Article
+    已在解析時正規化，直接沿用，不再逐則複製
+    """
+    return Article.from_dict(news_item)
+
+# 新聞來源：crawl 在 API 程序內以背景執行緒爬取；store 只讀取 crawl_worker.py 寫入的快照
+NEWS_SOURCE = os.environ.get('NEWS_SOURCE', 'crawl')
+
+# 最近一次爬取的摘要（metrics.CrawlSummary.as_dict），由 /api/health 回報
+last_crawl_summary = None
+# store 模式下最近讀到的快照由工作程序寫入的時間
+last_snapshot_at = None
+
+def record_crawl_summary(summary):
+    """保存並記錄單次爬取的摘要"""
+    global last_crawl_summary
+    last_crawl_summary = summary
+    stages = ', '.join(f"{stage} {stats['total']:.3f}s" for stage, stats in summary['stages'].items())
+    logger.info(f"爬取耗時 {summary['elapsed']:.3f}s ({stages})")
+
+def read_snapshot(name):
+    """讀取工作程序寫入的快照，並以快照中的爬取摘要作為 /api/health 的 last_crawl"""
+    global last_crawl_summary, last_snapshot_at
+    snapshot = ArticleStore.default().get_snapshot(name)
+    if snapshot is None:
+        logger.warning(f"尚無爬蟲工作程序寫入的 {name} 快照")
+        return None
+    if snapshot['summary']:
+        last_crawl_summary = snapshot['summary']
+    last_snapshot_at = snapshot['updated_at']
+    return snapshot['data']
+
+def load_news_from_store(limit=MAX_STORIES, offset=0, cursor=None):
+    """從快照中取出分頁區段，不執行爬蟲"""
+    news_data = read_snapshot(NEWS_SNAPSHOT) or []
+    if cursor is not None:
+        cursor_id = decode_cursor(cursor)
+        news_data = [item for item in news_data if story_id(item['url']) < cursor_id]
+    return [process_news_item(item) for item in news_data[offset:offset + limit]]
+
+def load_news(limit=MAX_STORIES, offset=0, cursor=None, progress=None):
+    """
+    執行爬蟲並整理資料，由快取在背景呼叫
+    progress 為每完成一則新聞時呼叫的函數（見 NewsCache.stream），store 模式下不使用
+    """
+    if NEWS_SOURCE == 'store':
+        return load_news_from_store(limit, offset, cursor)
+    news_data, summary = scrape_news(limit=limit, offset=offset, cursor=cursor,
+                                     with_summary=True, progress=progress, **crawl_options())
+    record_crawl_summary(summary)
     
-    # 驗證每個圖片物件的格式
-    valid_images = []
-    for img in news_item['images']:
-        if isinstance(img, dict) and 'url' in img and img['url']:
-            # 確保每個圖片物件都有必要的字段
-            validated_img = {
-                'url': str(img.get('url', '')),
-                'alt': str(img.get('alt', '')),
-                'title': str(img.get('title', '')),
-                'is_main': bool(img.get('is_main', False))
-            }
-            valid_images.append(validated_img)
+    # 確保每條新聞都有images字段
+    processed_news = [process_news_item(news_item) for news_item in news_data]
     
-    news_item['images'] = valid_images
-    return news_item
+    logger.info(f"背景爬取完成，共 {len(processed_news)} 條新聞")
+    return processed_news
+
+# 多主題爬取工作（CRAWL_KEYWORDS × CRAWL_CATEGORIES），供 /api/news?q= 查詢
+news_job = CrawlJob.from_env()
+
+def load_job():
+    """
+    執行多主題爬取工作（store 模式下讀取快照），每則新聞只整理一次，所有主題共用結果
+    沒有任何新聞（或還沒有快照）時回傳各主題都是空列表的結果
+    """
+    if NEWS_SOURCE == 'store':
+        result = read_snapshot(JOB_SNAPSHOT)
+    else:
+        result = crawl_job(news_job, **crawl_options())
+        record_crawl_summary(result['summary'])
+    if not result or not result['article_count']:
+        return {'topics': {topic.key: [] for topic in news_job.topics()}, 'article_count': 0}
+
+    processed = {}
+    for key, news in result['topics'].items():
+        for item in news:
+            if item['url'] not in processed:
+                processed[item['url']] = process_news_item(item)
+        result['topics'][key] = [processed[item['url']] for item in news]
+    logger.info(f"爬取工作完成，{len(result['topics'])} 個主題共 {result['article_count']} 條新聞")
+    return result
+
+# store 模式下快取只是為了減少讀取資料庫，過期時間改為 NEWS_STORE_POLL 秒
+NEWS_CACHE_TTL = int(os.environ.get('NEWS_STORE_POLL', 10) if NEWS_SOURCE == 'store'
+                     else os.environ.get('NEWS_CACHE_TTL', 300))
+NEWS_CACHE_WAIT = int(os.environ.get('NEWS_CACHE_WAIT', 60))
+MAX_LIMIT = 50           # 單次請求最多的新聞數
+MAX_WINDOW_CACHES = 32   # 非預設分頁區段的快取數量上限
+
+# 新聞快取：TTL 內直接回傳，過期時回傳舊資料並在背景更新
+news_cache = NewsCache(load_news, ttl=NEWS_CACHE_TTL, wait_timeout=NEWS_CACHE_WAIT, progress=True)
+
+# 多主題爬取工作的快取
+job_cache = NewsCache(load_job, ttl=NEWS_CACHE_TTL, wait_timeout=NEWS_CACHE_WAIT,
+                      is_empty=lambda result: not result['article_count'])
+
+# 其他分頁區段各自一個快取，依最近使用淘汰
+window_caches = OrderedDict()
+window_caches_lock = threading.Lock()
+
+def get_news_cache(limit=MAX_STORIES, offset=0, cursor=None):
+    """取得分頁區段對應的新聞快取，預設區段使用 news_cache"""
+    key = (limit, offset, cursor)
+    if key == (MAX_STORIES, 0, None):
+        return news_cache
+    with window_caches_lock:
+        cache = window_caches.get(key)
+        if cache is None:
+            loader = functools.partial(load_news, limit=limit, offset=offset, cursor=cursor)
+            cache = NewsCache(loader, ttl=NEWS_CACHE_TTL, wait_timeout=NEWS_CACHE_WAIT, progress=True)
+            window_caches[key] = cache
+            while len(window_caches) > MAX_WINDOW_CACHES:
+                window_caches.popitem(last=False)
+        else:
+            window_caches.move_to_end(key)
+        return cache
+
+def parse_window_args(args):
+    """解析 limit/offset/cursor 查詢參數，格式錯誤時拋出 ValueError"""
+    limit = int(args.get('limit', MAX_STORIES))
+    offset = int(args.get('offset', 0))
+    cursor = args.get('cursor') or None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit 必須介於 1 到 {MAX_LIMIT}")
+    if offset < 0:
+        raise ValueError("offset 不可為負數")
+    if cursor is not None:
+        decode_cursor(cursor)
+        offset = 0
+    return limit, offset, cursor
+
+def parse_time_range_args(args):
+    """解析 since/until 查詢參數（見 parse_time_arg，只有日期的 until 包含當天），格式錯誤時拋出 ValueError"""
+    since = parse_time_arg(args.get('since'))
+    until = parse_time_arg(args.get('until'), end_of_day=True)
+    if since is not None and until is not None and since >= until:
+        raise ValueError("since 必須早於 until")
+    return since, until
+
+def in_time_range(news_item, since, until):
+    """
+    新聞的 published_at 是否落在 [since, until)，沒有發佈時間的新聞不符合任何範圍
+    since / until 為 format_timestamp 產生的台北時間 ISO 8601 字串，與 published_at 格式相同，直接比較字串
+    """
+    published = news_item.get('published_at')
+    if published is None:
+        return False
+    return (since is None or published >= since) and (until is None or published < until)
+
+def query_job_news(result, q, category, limit, offset, cursor, since=None, until=None):
+    """
+    從多主題爬取工作的結果取出符合 q（與 since/until 發佈時間範圍）的新聞並套用分頁
+    工作中沒有該主題時回傳 None（見 news_for_query）
+    """
+    if not result:  # 冷啟動等待逾時，還沒有任何結果
+        return []
+    news = news_for_query(result, q, category)
+    if news is None:
+        return None
+    if since is not None or until is not None:
+        since, until = format_timestamp(since), format_timestamp(until)
+        news = [item for item in news if in_time_range(item, since, until)]
+    if cursor is not None:
+        cursor_id = decode_cursor(cursor)
+        news = [item for item in news if story_id(item['url']) < cursor_id]
+    return news[offset:offset + limit]
+
+def build_news_payload(processed_news, pagination, cache_meta=None):
+    """
+    組出 /api/news 的回應內容；只包含隨結果改變的欄位，才能預先編碼並共用 ETag
+    cache_meta 為 None（直接查詢儲存的結果）時不含 cache 與 timestamp；cache 固定是最後一個欄位，
+    每次請求不同的 cache_age/stale/refreshing 由 send_encoded 補在後面（見 response_cache.EncodedResponse）
+    fetched_at 為目前這份內容取得的時間，內容沒變的更新（例如 store 模式每次輪詢）不會改變 ETag
+    """
+    extra = {}
+    if cache_meta is not None:
+        if processed_news:
+            extra['timestamp'] = cache_meta['updated_at']
+        extra['cache'] = {'fetched_at': cache_meta['updated_at'], 'ttl': cache_meta['ttl']}
+    if not processed_news:
+        return {
+            'status': 'warning',
+            'message': '未獲取到新聞資料',
+            'data': [],
+            'count': 0,
+            'pagination': pagination,
+            **extra
+        }
+    # 統計圖片資訊
+    total_images = sum(len(item.get('images', [])) for item in processed_news)
+    news_with_images = sum(1 for item in processed_news if item.get('images'))
+    return {
+        'status': 'success',
+        'message': f'成功獲取 {len(processed_news)} 條新聞',
+        'data': processed_news,
+        'count': len(processed_news),
+        'stats': {
+            'total_images': total_images,
+            'news_with_images': news_with_images,
+            'image_coverage': round(news_with_images / len(processed_news) * 100, 1)
+        },
+        'pagination': pagination,
+        **extra
+    }
+
+# 預先編碼的 /api/news 回應，快取中的新聞內容改變（version 不同）後才重新序列化與壓縮
+encoded_responses = EncodedResponseCache(max_entries=MAX_WINDOW_CACHES * 2)
+
+def send_encoded(encoded, cache_meta=None):
+    """
+    回應預先編碼的 JSON：If-None-Match 相符時回傳 304，否則依 Accept-Encoding 選擇壓縮版本
+    有 cache_meta 時把每次請求都不同的快取狀態補進回應的 cache 欄位，ETag 不包含這些欄位
+    """
+    headers = {
+        'ETag': encoded.etag,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    if request.if_none_match.contains(encoded.etag.strip('"')):
+        return Response(status=304, headers=headers)
+    extra = None
+    if cache_meta is not None:
+        extra = {key: cache_meta[key] for key in ('cache_age', 'stale', 'refreshing')}
+    body, content_encoding = encoded.negotiate(request.headers.get('Accept-Encoding'), extra)
+    if content_encoding:
+        headers['Content-Encoding'] = content_encoding
+    return Response(body, mimetype='application/json', headers=headers)
+
+def invalid_argument(e):
+    return jsonify({
+        'status': 'error',
+        'message': f'參數錯誤: {e}'
+    }), 400
+
+def unknown_topic(q):
+    return jsonify({
+        'status': 'error',
+        'message': f'爬取工作中沒有關鍵字 {q} 的主題',
+        'keywords': news_job.keywords,
+        'categories': news_job.categories
+    }), 404
+
+def send_news_between(since, until, limit, offset):
+    """
+    回應發佈時間在 [since, until) 之間的已儲存新聞（不觸發爬取）
+    以索引範圍掃描只讀取該頁的新聞，不經過新聞快取；編碼後的回應綁定資料庫版本，
+    沒有新的寫入時直接沿用，ETag 只隨結果改變
+    """
+    store = ArticleStore.default()
+
+    def build():
+        news, has_more = store.news_between(since, until, limit=limit, offset=offset)
+        pagination = {
+            'limit': limit,
+            'offset': offset,
+            'since': since,
+            'until': until,
+            'next_offset': offset + limit if has_more else None
+        }
+        processed_news = [process_news_item(item) for item in news]
+        return EncodedResponse(build_news_payload(processed_news, pagination))
+
+    key = ('between', store.path, since, until, limit, offset)
+    return send_encoded(encoded_responses.get(key, store.version(), build))
 
 @app.route('/api/news', methods=['GET'])
 def get_news():
-    """獲取新聞資料的API端點"""
+    """
+    獲取新聞資料的API端點
+    支援 limit/offset 分頁，或以上一次回應的 next_cursor 作為 cursor 取下一段
+    q（可搭配 category）從多主題爬取工作的結果中取出該關鍵字的新聞
+    since/until 限定發佈時間；沒有 q 時直接以 articles 表的發佈時間索引做範圍查詢（以 offset 分頁）
+    """
     try:
-        logger.info("收到新聞爬取請求")
-        
-        # 執行爬蟲
-        news_data = scrape_news()
-        
-        # 確保每條新聞都有images字段
-        processed_news = []
-        for news_item in news_data:
-            try:
-                processed_item = ensure_images_field(news_item.copy())
-                processed_news.append(processed_item)
-            except Exception as e:
-                logger.error(f"處理新聞項目時發生錯誤: {e}")
-                # 為有問題的新聞項目添加空的images字段
-                news_item['images'] = []
-                processed_news.append(news_item)
-        
-        if not processed_news:
-            logger.warning("未獲取到任何新聞資料")
-            return jsonify({
-                'status': 'warning',
-                'message': '未獲取到新聞資料',
-                'data': [],
-                'count': 0
-            }), 200
-        
-        # 統計圖片資訊
-        total_images = sum(len(item.get('images', [])) for item in processed_news)
-        news_with_images = sum(1 for item in processed_news if item.get('images'))
-        
-        response_data = {
-            'status': 'success',
-            'message': f'成功獲取 {len(processed_news)} 條新聞',
-            'data': processed_news,
-            'count': len(processed_news),
-            'timestamp': time.time(),
-            'stats': {
-                'total_images': total_images,
-                'news_with_images': news_with_images,
-                'image_coverage': round(news_with_images / len(processed_news) * 100, 1) if processed_news else 0
+        limit, offset, cursor = parse_window_args(request.args)
+        q = request.args.get('q') or None
+        category = request.args.get('category')
+        category = int(category) if category else None
+        since, until = parse_time_range_args(request.args)
+        time_range = since is not None or until is not None
+        if time_range and not q and cursor is not None:
+            raise ValueError("依發佈時間查詢時請以 offset 分頁，不支援 cursor")
+    except ValueError as e:
+        return invalid_argument(e)
+
+    try:
+        logger.info(f"收到新聞請求 (q={q}, limit={limit}, offset={offset}, cursor={cursor}, "
+                    f"since={since}, until={until})")
+
+        if time_range and not q:
+            return send_news_between(since, until, limit, offset)
+        if q and (q not in news_job.keywords or category not in (None, *news_job.categories)):
+            return unknown_topic(q)
+
+        # 從快取讀取，必要時由背景執行緒重新爬取
+        if q:
+            source, cache_meta = job_cache.get()
+        else:
+            source, cache_meta = get_news_cache(limit, offset, cursor).get()
+
+        def build():
+            processed_news = source
+            if q:
+                processed_news = query_job_news(source, q, category, limit, offset, cursor, since, until)
+                if processed_news is None:
+                    return None
+            pagination = {
+                'limit': limit,
+                'offset': offset,
+                'cursor': cursor,
+                'next_cursor': encode_cursor(processed_news[-1]['url']) if processed_news else None
             }
-        }
-        
-        logger.info(f"成功返回 {len(processed_news)} 條新聞資料，包含 {total_images} 張圖片")
-        return jsonify(response_data), 200
-        
+            return EncodedResponse(build_news_payload(processed_news, pagination, cache_meta), extend='cache')
+
+        encoded = encoded_responses.get((q, category, limit, offset, cursor, since, until),
+                                        cache_meta['version'], build)
+        if encoded is None:  # store 模式的快照來自設定不同的爬取工作
+            return unknown_topic(q)
+        if not source:
+            logger.warning("未獲取到任何新聞資料")
+        return send_encoded(encoded, cache_meta)
+
     except Exception as e:
         logger.error(f"API處理過程中發生錯誤: {e}")
         return jsonify({
@@ -121,15 +400,180 @@ def get_news():
             'error': str(e)
         }), 500
 
+@app.route('/api/news/stream', methods=['GET'])
+def stream_news():
+    """
+    逐則串流新聞的API端點，分頁參數同 /api/news
+    format=ndjson（預設）每行一則新聞；format=sse 以 Server-Sent Events 傳送，結束時送出 done 事件
+    快取資料仍新鮮時直接串流快取，否則加入該分頁快取的背景更新（沒有時啟動一次）邊爬取邊送出，
+    同時串流的請求與一般請求共用同一次爬取，完成後結果寫回快取；store 模式下一律串流快照
+    """
+    stream_format = request.args.get('format', 'ndjson')
+    if stream_format not in ('ndjson', 'sse'):
+        return jsonify({
+            'status': 'error',
+            'message': 'format 參數只支援 ndjson 或 sse'
+        }), 400
+    try:
+        limit, offset, cursor = parse_window_args(request.args)
+    except ValueError as e:
+        return invalid_argument(e)
+
+    cache = get_news_cache(limit, offset, cursor)
+    cached_news, cache_meta = cache.peek()
+    if cached_news and not cache_meta['stale']:
+        source = 'cache'
+        news_items = iter(cached_news)
+    elif NEWS_SOURCE == 'store':
+        source = 'store'
+        news_items = iter(cache.get()[0])
+    else:
+        source = 'live'
+        news_items = map(process_news_item, cache.stream())
+
+    def generate():
+        count = 0
+        try:
+            for news_item in news_items:
+                count += 1
+                payload = json.dumps(news_item, ensure_ascii=False, default=json_default)
+                if stream_format == 'sse':
+                    yield f"event: article\ndata: {payload}\n\n"
+                else:
+                    yield payload + '\n'
+        except Exception as e:
+            logger.error(f"串流新聞時發生錯誤: {e}")
+            if stream_format == 'sse':
+                yield f"event: error\ndata: {json.dumps({'message': str(e)}, ensure_ascii=False)}\n\n"
+            return
+
+        if stream_format == 'sse':
+            yield f"event: done\ndata: {json.dumps({'count': count})}\n\n"
+        logger.info(f"串流完成，共送出 {count} 條新聞 (來源: {source})")
+
+    logger.info(f"收到新聞串流請求 (格式: {stream_format}, 來源: {source})")
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # 避免反向代理緩衝串流
+            'X-News-Source': source
+        }
+    )
+
+@app.route('/api/search', methods=['GET'])
+def search_news():
+    """
+    全文檢索已爬取的新聞（不會觸發爬取）
+    q 為關鍵字（空白分隔的詞都必須出現），reporter 只比對記者欄位，
+    since / until 為發佈時間（epoch 秒或台北時間的 YYYY-MM-DD[ HH:MM]，只有日期的 until 包含當天），
+    order 為 relevance（預設）或 time，limit / offset 分頁
+    """
+    q = (request.args.get('q') or '').strip()
+    reporter = (request.args.get('reporter') or '').strip()
+    order = request.args.get('order', 'relevance')
+    try:
+        limit = int(request.args.get('limit', MAX_STORIES))
+        offset = int(request.args.get('offset', 0))
+        since = parse_time_arg(request.args.get('since'))
+        until = parse_time_arg(request.args.get('until'), end_of_day=True)
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit 必須介於 1 到 {MAX_LIMIT}")
+        if offset < 0:
+            raise ValueError("offset 不可為負數")
+        if order not in ('relevance', 'time'):
+            raise ValueError("order 只支援 relevance 或 time")
+        if not (q or reporter or since is not None or until is not None):
+            raise ValueError("請提供 q、reporter、since 或 until")
+    except ValueError as e:
+        return invalid_argument(e)
+
+    started = time.perf_counter()
+    try:
+        results, has_more = ArticleStore.default().search(
+            q=q, reporter=reporter, since=since, until=until, limit=limit, offset=offset, order=order
+        )
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 501
+    took_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"搜尋 q={q} reporter={reporter} 共 {len(results)} 筆 ({took_ms:.1f} ms)")
+
+    payload = {
+        'status': 'success',
+        'count': len(results),
+        'data': results,
+        'pagination': {
+            'limit': limit,
+            'offset': offset,
+            'next_offset': offset + limit if has_more else None
+        },
+        'took_ms': round(took_ms, 2)
+    }
+    return Response(json.dumps(payload, ensure_ascii=False), mimetype='application/json')
+
+# 圖片代理：第一次請求時才建立磁碟快取
+IMAGE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+image_proxy = None
+image_proxy_lock = threading.Lock()
+
+def get_image_proxy():
+    global image_proxy
+    with image_proxy_lock:
+        if image_proxy is None:
+            image_proxy = ImageProxy(
+                request_url=request_url,
+                headers={'User-Agent': HEADERS['User-Agent'], 'Referer': 'https://udn.com/'}
+            )
+        return image_proxy
+
+@app.route('/api/image', methods=['GET'])
+def proxy_image():
+    """
+    圖片代理端點：url 為新聞圖片網址，w/h 為縮圖最大寬高，format 為 jpeg/png/webp/original，q 為品質
+    原圖只下載一次，所有版本都從磁碟快取回應，並帶有內容雜湊的強 ETag 與長期的 Cache-Control
+    """
+    url = request.args.get('url')
+    try:
+        check_image_url(url)
+        width, height, fmt, quality = parse_variant(request.args)
+    except ValueError as e:
+        return invalid_argument(e)
+
+    try:
+        image = get_image_proxy().get(url, width, height, fmt, quality)
+    except ImageFetchError as e:
+        logger.warning(f"圖片代理失敗: {url} - {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 502
+
+    headers = {'ETag': image.etag, 'Cache-Control': IMAGE_CACHE_CONTROL}
+    if request.if_none_match.contains(image.etag.strip('"')):
+        return Response(status=304, headers=headers)
+
+    response = send_file(image.path, mimetype=image.mime, conditional=False, etag=False)
+    response.headers.update(headers)
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康檢查端點"""
     return jsonify({
         'status': 'healthy',
         'message': 'API服務正常運行',
-        'timestamp': time.time()
+        'timestamp': time.time(),
+        'conditional_requests': conditional_stats.as_dict(),
+        'unhealthy_hosts': circuit_breakers.unhealthy(),
+        'news_source': NEWS_SOURCE,
+        'last_snapshot_at': last_snapshot_at,
+        'last_crawl': last_crawl_summary
     }), 200
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 文字格式的爬蟲與 API 指標"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/', methods=['GET'])
 def index():
     """根路徑"""
@@ -138,13 +582,18 @@ def index():
         'version': '1.1',
         'features': ['新聞抓取', '圖片抓取', '向後兼容'],
         'endpoints': {
-            '/api/news': 'GET - 獲取空汙相關新聞',
-            '/api/health': 'GET - 健康檢查'
+            '/api/news': 'GET - 獲取空汙相關新聞（q=關鍵字 查詢多主題爬取工作，since/until=發佈時間範圍）',
+            '/api/news/stream': 'GET - 逐則串流新聞 (format=ndjson|sse)',
+            '/api/search': 'GET - 全文檢索已爬取的新聞 (q, reporter, since, until, order, limit, offset)',
+            '/api/health': 'GET - 健康檢查',
+            '/api/metrics': 'GET - Prometheus 格式的效能指標',
+            '/api/image': 'GET - 圖片代理與縮圖 (url=圖片網址, w/h=最大寬高, format=jpeg|png|webp)'
         }
     })
 
 if __name__ == '__main__':
     logger.info("啟動新聞API服務器...")
+    logger.warning("這是 Werkzeug 開發伺服器，正式環境請使用: gunicorn -c gunicorn.conf.py wsgi:app")
     logger.info("API端點: http://localhost:5000/api/news")
     logger.info("健康檢查: http://localhost:5000/api/health")
     
@@ -0,0 +1,111 @@
+"""
+新聞欄位正規化
+新聞頁面上的發佈時間與記者欄位是原始文字（例如「2024-01-15 10:30」、「聯合報 記者王小明／台北報導」），
+這裡轉成可排序的台北時間時間戳記與乾淨的記者姓名，原始文字仍保留在 publish_time / reporter
+"""
+
+import math
+import re
+from datetime import datetime, timedelta, timezone
+
+TAIPEI = timezone(timedelta(hours=8))
+# API 時間參數允許的範圍（超出時 format_timestamp 無法轉換）
+MIN_TIMESTAMP = datetime(1900, 1, 1, tzinfo=TAIPEI).timestamp()
+MAX_TIMESTAMP = datetime(9999, 1, 1, tzinfo=TAIPEI).timestamp()
+
+_PUBLISH_TIME_RE = re.compile(
+    r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[ T]+(\d{1,2}):(\d{2})(?::(\d{2}))?)?'
+)
+# 記者欄位開頭的媒體名稱與職稱
+_MEDIA_PREFIXES = ('聯合新聞網', '聯合報', '經濟日報', '聯合晚報', '世界日報', '中央社', 'udn')
+_TITLE_PREFIXES = ('實習記者', '特派記者', '記者', '特派員', '編譯', '攝影')
+_NAME_SEPARATOR_RE = re.compile(r'[、,，\s]+')
+
+
+def parse_publish_time(text):
+    """將新聞頁面上的發佈時間（例如 2024-01-15 10:30）轉為 epoch 秒，視為台北時間；無法辨識時回傳 None"""
+    match = _PUBLISH_TIME_RE.search(text or '')
+    if not match:
+        return None
+    year, month, day, hour, minute, second = (int(value) if value else 0 for value in match.groups())
+    try:
+        return datetime(year, month, day, hour, minute, second, tzinfo=TAIPEI).timestamp()
+    except ValueError:
+        return None
+
+
+def format_timestamp(timestamp):
+    """epoch 秒轉為台北時間的 ISO 8601 字串（例如 2024-01-15T10:30:00+08:00），None 維持 None"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, TAIPEI).isoformat()
+
+
+def parse_published_at(value):
+    """format_timestamp 產生的 ISO 8601 字串（published_at）轉回 epoch 秒，None 維持 None"""
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+def parse_time_arg(value, end_of_day=False):
+    """
+    解析 API 的時間參數：epoch 秒、台北時間的日期/日期時間字串，或含時區的 ISO 8601（published_at 的格式）
+    end_of_day 為 True 且只有日期時回傳隔天 0 點（作為不包含的上限）
+    格式錯誤、nan/inf 或超出 MIN_TIMESTAMP 到 MAX_TIMESTAMP 的範圍時拋出 ValueError
+    """
+    if value is None or value == '':
+        return None
+    value = value.strip()
+    try:
+        timestamp = float(value)
+    except ValueError:
+        timestamp = _parse_time_text(value, end_of_day)
+    if not (math.isfinite(timestamp) and MIN_TIMESTAMP <= timestamp <= MAX_TIMESTAMP):
+        raise ValueError(f"時間超出範圍: {value}")
+    return timestamp
+
+
+def _parse_time_text(value, end_of_day):
+    match = _PUBLISH_TIME_RE.fullmatch(value)
+    if match:
+        timestamp = parse_publish_time(value)
+    else:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            parsed = None
+        try:
+            timestamp = parsed.replace(tzinfo=parsed.tzinfo or TAIPEI).timestamp() if parsed else None
+        except OverflowError:
+            timestamp = None
+    if timestamp is None:
+        raise ValueError(f"無法辨識的時間: {value}")
+    if end_of_day and match and match.group(4) is None:
+        timestamp += 86400
+    return timestamp
+
+
+def _strip_prefixes(text, prefixes):
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in prefixes:
+            if text.startswith(prefix):
+                text = text[len(prefix):].lstrip()
+                stripped = True
+    return text
+
+
+def clean_reporter(text):
+    """
+    從記者欄位取出記者姓名：去掉「／台北報導」等地點、開頭的媒體名稱與職稱，
+    多位記者以「、」連接；沒有姓名（例如「記者不明」、「聯合新聞網／綜合報導」）時回傳 None
+    """
+    text = re.split(r'[／/]', text or '', maxsplit=1)[0].strip()
+    names = []
+    for part in _NAME_SEPARATOR_RE.split(text):
+        name = _strip_prefixes(_strip_prefixes(part, _MEDIA_PREFIXES), _TITLE_PREFIXES)
+        if name and name not in _MEDIA_PREFIXES and name != '不明' and not name.endswith('報導'):
+            names.append(name)
+    return '、'.join(names) or None
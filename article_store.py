@@ -0,0 +1,491 @@
+"""
+新聞文章持久化儲存
+以正規化後的新聞URL為鍵，將解析結果與 ETag/Last-Modified 存入 SQLite，
+讓爬蟲只下載沒看過的新聞，舊新聞則以條件請求重新驗證
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+from http_cache import conditional_headers
+import search_index
+from article_fields import clean_reporter, format_timestamp, parse_publish_time
+from records import Article, json_default
+import dedupe
+from dedupe import content_hash
+
+DEFAULT_DB_PATH = os.environ.get('ARTICLE_DB', 'articles.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    valid INTEGER NOT NULL,
+    title TEXT,
+    publish_time TEXT,
+    reporter TEXT,
+    reporter_name TEXT,
+    content TEXT,
+    images TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER,
+    published_at REAL,
+    content_hash TEXT,
+    minhash BLOB,
+    first_fetched_at REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS article_bands (
+    band INTEGER NOT NULL,
+    key INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (band, key, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS article_bands_url ON article_bands(url);
+CREATE TABLE IF NOT EXISTS crawl_state (
+    query TEXT PRIMARY KEY,
+    high_water INTEGER NOT NULL,
+    urls TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    exhausted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    width INTEGER,
+    height INTEGER,
+    bytes INTEGER,
+    mime TEXT,
+    probed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    summary TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+def normalize_story_url(url):
+    """正規化新聞URL：統一 https、小寫主機、移除查詢參數、錨點與結尾斜線"""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', parts.netloc.lower(), path, '', ''))
+
+
+class ArticleStore:
+    """以 SQLite 實作的新聞儲存，可跨執行緒共用"""
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            # WAL 模式下 NORMAL 不會損壞資料庫，只是斷電時可能遺失最後幾筆交易，換來每次寫入不需 fsync
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+            try:
+                self._conn.executescript(search_index.FTS_SCHEMA)
+                self.search_enabled = True
+            except sqlite3.OperationalError:  # SQLite 未編譯 FTS5
+                self.search_enabled = False
+        if self.search_enabled and self._index_is_empty():
+            self.rebuild_search_index()
+
+    def _migrate(self):
+        """為舊版資料庫補上新增的欄位"""
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(articles)')}
+        if 'size' not in columns:
+            self._conn.execute('ALTER TABLE articles ADD COLUMN size INTEGER')
+        if 'published_at' not in columns:
+            self._conn.execute('ALTER TABLE articles ADD COLUMN published_at REAL')
+            for url, publish_time in self._conn.execute(
+                    'SELECT url, publish_time FROM articles WHERE valid = 1').fetchall():
+                self._conn.execute('UPDATE articles SET published_at = ? WHERE url = ?',
+                                   (parse_publish_time(publish_time), url))
+        if 'reporter_name' not in columns:
+            self._conn.execute('ALTER TABLE articles ADD COLUMN reporter_name TEXT')
+            for url, reporter in self._conn.execute(
+                    'SELECT url, reporter FROM articles WHERE valid = 1').fetchall():
+                self._conn.execute('UPDATE articles SET reporter_name = ? WHERE url = ?',
+                                   (clean_reporter(reporter), url))
+        if 'content_hash' not in columns:
+            self._conn.execute('ALTER TABLE articles ADD COLUMN content_hash TEXT')
+            for url, content in self._conn.execute(
+                    'SELECT url, content FROM articles WHERE valid = 1').fetchall():
+                self._conn.execute('UPDATE articles SET content_hash = ? WHERE url = ?',
+                                   (content_hash(content), url))
+        if 'minhash' not in columns:
+            self._conn.execute('ALTER TABLE articles ADD COLUMN minhash BLOB')
+            for url, content in self._conn.execute(
+                    'SELECT url, content FROM articles WHERE valid = 1').fetchall():
+                self._index_signature(url, content)
+        if 'exhausted' not in {row['name'] for row in self._conn.execute('PRAGMA table_info(crawl_state)')}:
+            self._conn.execute('ALTER TABLE crawl_state ADD COLUMN exhausted INTEGER NOT NULL DEFAULT 0')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS articles_published_at ON articles(published_at)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS articles_content_hash ON articles(content_hash)'
+        )
+
+    def _index_is_empty(self):
+        with self._lock:
+            has_articles = self._conn.execute('SELECT 1 FROM articles WHERE valid = 1 LIMIT 1').fetchone()
+            has_index = self._conn.execute('SELECT 1 FROM articles_fts LIMIT 1').fetchone()
+        return bool(has_articles) and not has_index
+
+    def rebuild_search_index(self):
+        """以 articles 表重建全文索引（舊版資料庫第一次開啟時自動執行）"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('delete-all')")
+            rows = self._conn.execute(
+                'SELECT rowid, title, reporter, content FROM articles WHERE valid = 1'
+            ).fetchall()
+            for row in rows:
+                search_index.index_article(self._conn, row['rowid'], dict(row))
+        return len(rows)
+
+    @classmethod
+    def default(cls):
+        """取得預設路徑的共用儲存實例"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def get(self, url):
+        """取得URL對應的記錄，沒有時回傳 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM articles WHERE url = ?', (normalize_story_url(url),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def save(self, url, news_item, etag=None, last_modified=None, size=None):
+        """
+        儲存下載並解析後的新聞
+        news_item 為 None 表示頁面內容不完整，仍會記錄以免重複下載
+        發佈時間（published_at）與記者姓名（reporter_name）一律由原始文字重新推導，與 parse_story 的結果一致
+        size 為下載的頁面位元組數，用來估算 304 省下的頻寬
+        回傳內文是否改變：新的新聞為 True；重新下載的頁面以內文的 content_hash 與上次比較
+        （只有 ETag 或版面改變、內文相同時為 False）
+        """
+        now = time.time()
+        item = news_item or {}
+        digest = content_hash(item['content']) if news_item else None
+        with self._lock, self._conn:
+            old = self._conn.execute(
+                'SELECT valid, title, reporter, content, content_hash FROM articles WHERE url = ?',
+                (normalize_story_url(url),)
+            ).fetchone()
+            self._conn.execute(
+                """
+                INSERT INTO articles (url, valid, title, publish_time, reporter, content, images,
+                                      etag, last_modified, size, published_at, reporter_name, content_hash,
+                                      first_fetched_at, fetched_at, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    valid = excluded.valid,
+                    title = excluded.title,
+                    publish_time = excluded.publish_time,
+                    reporter = excluded.reporter,
+                    content = excluded.content,
+                    images = excluded.images,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    size = excluded.size,
+                    published_at = excluded.published_at,
+                    reporter_name = excluded.reporter_name,
+                    content_hash = excluded.content_hash,
+                    fetched_at = excluded.fetched_at,
+                    checked_at = excluded.checked_at
+                """,
+                (
+                    normalize_story_url(url), 1 if news_item else 0,
+                    item.get('title'), item.get('publish_time'), item.get('reporter'),
+                    item.get('content'), json.dumps(item.get('images', []), ensure_ascii=False, default=json_default),
+                    etag, last_modified, size, parse_publish_time(item.get('publish_time')),
+                    clean_reporter(item.get('reporter')) if news_item else None, digest,
+                    now, now, now
+                )
+            )
+            if old is None or old['content_hash'] != digest:
+                self._index_signature(normalize_story_url(url), item.get('content'))
+            # 在同一個交易中更新全文索引；內文、標題與記者都沒變時不需重新索引
+            unchanged = (old is not None and old['valid'] and old['content_hash'] == digest
+                         and (old['title'], old['reporter']) == (item.get('title'), item.get('reporter')))
+            if self.search_enabled and not unchanged:
+                rowid = self._conn.execute(
+                    'SELECT rowid FROM articles WHERE url = ?', (normalize_story_url(url),)
+                ).fetchone()[0]
+                search_index.index_article(self._conn, rowid, news_item,
+                                           old_item=dict(old) if old and old['valid'] else None)
+        return old is None or old['content_hash'] != digest
+
+    def _index_signature(self, url, content):
+        """更新新聞的 MinHash 簽章與 LSH 分段（呼叫端需持有鎖並在交易中）；內文太短或無效時只清除"""
+        signature = dedupe.fingerprint(content) if content is not None else None
+        self._conn.execute('DELETE FROM article_bands WHERE url = ?', (url,))
+        self._conn.execute('UPDATE articles SET minhash = ? WHERE url = ?',
+                           (dedupe.pack_signature(signature) if signature else None, url))
+        if signature:
+            self._conn.executemany('INSERT OR IGNORE INTO article_bands (band, key, url) VALUES (?, ?, ?)',
+                                   [(band, key, url) for band, key in dedupe.band_keys(signature)])
+
+    def find_duplicates(self, content, exclude=()):
+        """
+        已儲存、內文與 content 相同或近似的新聞URL（最近儲存的在前），不含 exclude 中的URL
+        內文完全相同時以 content_hash 索引查詢，其餘以 LSH 分段找出候選再以估計的 Jaccard 相似度確認；
+        內文太短（見 dedupe.fingerprint）時回傳空列表
+        """
+        signature = dedupe.fingerprint(content)
+        if signature is None:
+            return []
+        keys = dedupe.band_keys(signature)
+        with self._lock:
+            exact = self._conn.execute(
+                'SELECT rowid, url FROM articles WHERE content_hash = ? AND valid = 1', (content_hash(content),)
+            ).fetchall()
+            candidates = self._conn.execute(
+                'SELECT DISTINCT a.rowid, a.url, a.minhash FROM article_bands b JOIN articles a ON a.url = b.url '
+                f'WHERE {" OR ".join(["(b.band = ? AND b.key = ?)"] * len(keys))}',
+                [value for key in keys for value in key]
+            ).fetchall()
+        matches = {row['url']: row['rowid'] for row in exact}
+        for row in candidates:
+            if row['url'] not in matches and dedupe.similarity(
+                    signature, dedupe.unpack_signature(row['minhash'])) >= dedupe.SIMILARITY_THRESHOLD:
+                matches[row['url']] = row['rowid']
+        return [url for url in sorted(matches, key=matches.get, reverse=True) if url not in exclude]
+
+    def touch(self, url):
+        """伺服器回應 304 時只更新驗證時間"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE articles SET checked_at = ? WHERE url = ?',
+                (time.time(), normalize_story_url(url))
+            )
+
+    def get_crawl_state(self, query):
+        """
+        取得搜尋查詢上一次的高水位（最新新聞ID）、結果URL列表與搜尋結果是否已用盡，沒有時回傳 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM crawl_state WHERE query = ?', (query,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'high_water': row['high_water'],
+            'urls': json.loads(row['urls']),
+            'exhausted': bool(row['exhausted']),
+            'updated_at': row['updated_at']
+        }
+
+    def save_crawl_state(self, query, high_water, urls, exhausted=False):
+        """
+        記錄搜尋查詢的高水位與本次結果URL列表，供增量爬取使用
+        exhausted 為 True 表示搜尋結果已全部載入（沒有更舊的新聞可補足）
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO crawl_state (query, high_water, urls, updated_at, exhausted) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(query) DO UPDATE SET
+                    high_water = excluded.high_water,
+                    urls = excluded.urls,
+                    updated_at = excluded.updated_at,
+                    exhausted = excluded.exhausted
+                """,
+                (query, high_water, json.dumps(urls), time.time(), int(exhausted))
+            )
+
+    def get_image_meta(self, url):
+        """取得圖片的探測結果 {'width', 'height', 'bytes', 'mime'}，沒有探測過時回傳 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT width, height, bytes, mime FROM images WHERE url = ?', (url,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def save_image_meta(self, url, meta):
+        """記錄圖片的探測結果；mime 為 None 表示不是可辨識的圖片"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO images (url, width, height, bytes, mime, probed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (url, meta['width'], meta['height'], meta['bytes'], meta['mime'], time.time())
+            )
+
+    def get_snapshot(self, name):
+        """取得爬蟲工作程序寫入的快照 {'data', 'summary', 'updated_at'}，沒有時回傳 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data, summary, updated_at FROM snapshots WHERE name = ?', (name,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'data': json.loads(row['data']),
+            'summary': json.loads(row['summary']) if row['summary'] else None,
+            'updated_at': row['updated_at']
+        }
+
+    def save_snapshot(self, name, data, summary=None):
+        """以單一交易取代整份快照，讀取端不會看到寫到一半的結果"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO snapshots (name, data, summary, updated_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (name, json.dumps(data, ensure_ascii=False, default=json_default),
+                 json.dumps(summary, ensure_ascii=False) if summary else None, time.time())
+            )
+
+    def optimize_search_index(self):
+        """將全文索引合併成單一區段；逐則寫入會留下大量小區段，合併後查詢約快一倍"""
+        if not self.search_enabled:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+
+    def search(self, q=None, reporter=None, since=None, until=None, limit=10, offset=0, order='relevance'):
+        """
+        全文檢索已儲存的新聞，回傳 (結果列表, 是否還有下一頁)
+        q / reporter 見 search_index.build_match_query；since / until 為發佈時間的 epoch 秒（until 不包含）
+        order 為 relevance（bm25）或 time（由新到舊）；沒有查詢詞時只依發佈時間篩選
+        relevance 只排序發佈時間最新的 search_index.RANK_WINDOW 則命中，其餘命中依時間接在後面且 score 為 None
+        每筆結果包含 url、title、publish_time、published_at（ISO 8601）、reporter、reporter_name、images、snippet 與 score
+        """
+        match = search_index.build_match_query(q, reporter)
+        conditions, params = ['a.valid = 1'], []
+        if since is not None:
+            conditions.append('a.published_at >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('a.published_at < ?')
+            params.append(until)
+
+        columns = 'a.url, a.title, a.publish_time, a.published_at, a.reporter, a.reporter_name, a.content, a.images'
+        if match:
+            if not self.search_enabled:
+                raise RuntimeError("SQLite 未支援 FTS5，無法全文檢索")
+            weights = ', '.join(str(weight) for weight in search_index.BM25_WEIGHTS)
+            score, score_params = f'bm25(articles_fts, {weights})', []
+            if order == 'relevance':
+                # 只為發佈時間最新的 RANK_WINDOW 則命中計算 bm25，視窗與 offset 無關，翻頁時排序不變；
+                # 視窗外的命中（score 為 NULL）依發佈時間排在後面
+                with self._lock:
+                    bound = self._conn.execute(
+                        'SELECT a.published_at FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid '
+                        f'WHERE articles_fts MATCH ? AND {" AND ".join(conditions)} '
+                        'ORDER BY a.published_at DESC LIMIT 1 OFFSET ?',
+                        [match, *params, search_index.RANK_WINDOW - 1]
+                    ).fetchone()
+                if bound and bound[0] is not None:
+                    score, score_params = f'CASE WHEN a.published_at >= ? THEN {score} END', [bound[0]]
+            sql = (f'SELECT {columns}, {score} AS score '
+                   'FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid '
+                   f'WHERE articles_fts MATCH ? AND {" AND ".join(conditions)} ')
+            params[:0] = [*score_params, match]
+            if order == 'relevance':
+                sql += 'ORDER BY score IS NULL, score, a.published_at DESC'
+            else:
+                sql += 'ORDER BY a.published_at DESC'
+        else:
+            sql = (f'SELECT {columns}, NULL AS score FROM articles a '
+                   f'WHERE {" AND ".join(conditions)} ORDER BY a.published_at DESC')
+        sql += ' LIMIT ? OFFSET ?'
+        params.extend((limit + 1, offset))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = [
+            {
+                'url': row['url'],
+                'title': row['title'],
+                'publish_time': row['publish_time'],
+                'published_at': format_timestamp(row['published_at']),
+                'reporter': row['reporter'],
+                'reporter_name': row['reporter_name'],
+                'images': json.loads(row['images'] or '[]'),
+                'snippet': search_index.make_snippet(row['content'], q),
+                # bm25 越小越相關，轉為越大越相關
+                'score': round(-row['score'], 4) if row['score'] is not None else None
+            }
+            for row in rows[:limit]
+        ]
+        return results, len(rows) > limit
+
+    def news_between(self, since=None, until=None, limit=10, offset=0):
+        """
+        依發佈時間由新到舊列出 [since, until) 之間的新聞（epoch 秒，None 表示不限），回傳 (新聞列表, 是否還有下一頁)
+        以 articles_published_at 索引做範圍掃描，只讀取需要的列；新聞格式同 to_news_item
+        """
+        conditions, params = ['valid = 1'], []
+        if since is not None:
+            conditions.append('published_at >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('published_at < ?')
+            params.append(until)
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT * FROM articles WHERE {" AND ".join(conditions)} '
+                'ORDER BY published_at DESC, rowid DESC LIMIT ? OFFSET ?',
+                [*params, limit + 1, offset]
+            ).fetchall()
+        return [self.to_news_item(row) for row in rows[:limit]], len(rows) > limit
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def version(self):
+        """
+        資料庫的版本：本連線的累計寫入數與 PRAGMA data_version（其他連線，例如爬蟲工作程序提交時改變）
+        兩次取得的值相同表示期間沒有任何寫入，可沿用依資料庫內容產生的結果
+        """
+        with self._lock:
+            return self._conn.total_changes, self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def to_news_item(record, url=None):
+        """將資料庫記錄轉回爬蟲輸出的新聞格式（records.Article），無效記錄回傳 None"""
+        if not record or not record['valid']:
+            return None
+        return Article(
+            title=record['title'],
+            publish_time=record['publish_time'],
+            published_at=format_timestamp(record['published_at']),
+            reporter=record['reporter'],
+            reporter_name=record['reporter_name'],
+            content=record['content'],
+            url=url or record['url'],
+            images=json.loads(record['images'] or '[]')
+        )
+
+    @staticmethod
+    def conditional_headers(record):
+        """依記錄中的驗證資訊產生條件請求標頭"""
+        if not record:
+            return {}
+        return conditional_headers(record.get('etag'), record.get('last_modified'))
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+歷史新聞回填
+逐頁走訪搜尋結果（可限定頁數範圍或發佈時間範圍），把爬取邊界保存在 SQLite：
+每個新聞URL的狀態為 pending（待爬）、in_flight（爬取中）、done（完成）或 failed（重試用盡），
+並記錄下一個要載入的搜尋頁。完成的狀態每 checkpoint_every 則寫入一次；
+當機或中斷後以同一個名稱重新執行，in_flight 的新聞放回 pending，從停下的地方繼續。
+已下載的新聞存在 articles.db，最後一次存檔點之後完成的新聞重新執行時直接從本地讀取，不會重新下載。
+
+發佈時間範圍只能在下載後得知：搜尋結果由新到舊排列，until 之後的新聞仍會被走訪並存入 articles.db，
+一批新聞的發佈時間全部早於 since 時停止載入更多頁。
+回填期間新發佈的新聞會讓搜尋結果往後移，某一頁可能全是已看過的新聞；
+搜尋頁沒有任何結果，或連續 max_stale_pages 頁沒有新的新聞時，才視為走訪完畢。
+
+用法:
+    python backfill.py air-2020 --keyword 空汙 --since 2020-01-01 --until 2020-12-31
+    python backfill.py air-pages --start-page 1 --end-page 500 --checkpoint-every 100
+    python backfill.py air-2020                   # 續傳（沿用第一次執行時的設定）
+    python backfill.py air-2020 --status
+    python backfill.py air-2020 --retry-failed    # 失敗的新聞放回 pending 再試一次
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sqlite3
+import threading
+import time
+
+from article_fields import parse_published_at, parse_time_arg
+from article_store import ArticleStore, DEFAULT_DB_PATH
+from crawl_job import DEFAULT_CATEGORY, DEFAULT_KEYWORD, search_url
+from crawl_worker import CrawlLock
+from crawler import backfill_async, crawl_options
+from frontier import search_page_url, story_id
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+STATES = (PENDING, IN_FLIGHT, DONE, FAILED)
+
+DEFAULT_CHECKPOINT_EVERY = 50
+MAX_ATTEMPTS = 3  # 每則新聞爬取失敗幾次後標記為 failed
+MAX_STALE_PAGES = 5  # 連續幾頁搜尋結果都是已看過的新聞時視為走訪完畢
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backfill_jobs (
+    name TEXT PRIMARY KEY,
+    base_url TEXT NOT NULL,
+    since REAL,
+    until REAL,
+    end_page INTEGER,
+    next_page INTEGER NOT NULL,
+    exhausted INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    stale_pages INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS backfill_urls (
+    job TEXT NOT NULL,
+    url TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    published_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job, url)
+);
+CREATE INDEX IF NOT EXISTS backfill_urls_state ON backfill_urls(job, state, page)
+"""
+
+
+class BackfillFrontier:
+    """
+    保存在 SQLite 的回填邊界（預設與新聞儲存共用 articles.db）
+    第一次以 name 開啟時需提供 base_url 並建立設定，之後開啟同名的邊界即沿用保存的設定與進度
+    """
+
+    def __init__(self, name, path=DEFAULT_DB_PATH, base_url=None, since=None, until=None,
+                 start_page=1, end_page=None, checkpoint_every=DEFAULT_CHECKPOINT_EVERY,
+                 max_attempts=MAX_ATTEMPTS, max_stale_pages=MAX_STALE_PAGES):
+        self.name = name
+        self.path = path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.max_attempts = max_attempts
+        self.max_stale_pages = max(1, max_stale_pages)
+        self._lock = threading.Lock()
+        self._updates = {}  # 尚未寫入的完成狀態: url -> (state, published_at)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+            job = self._conn.execute('SELECT * FROM backfill_jobs WHERE name = ?', (name,)).fetchone()
+            if job is None:
+                if not base_url:
+                    raise ValueError(f"沒有名為 {name} 的回填工作，第一次執行需要指定搜尋網址")
+                now = time.time()
+                self._conn.execute(
+                    'INSERT INTO backfill_jobs (name, base_url, since, until, end_page, next_page, exhausted, '
+                    'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)',
+                    (name, base_url, since, until, end_page, max(1, start_page), now, now)
+                )
+                job = self._conn.execute('SELECT * FROM backfill_jobs WHERE name = ?', (name,)).fetchone()
+            # 上次中斷時正在爬取的新聞放回 pending
+            resumed = self._conn.execute(
+                'UPDATE backfill_urls SET state = ? WHERE job = ? AND state = ?', (PENDING, name, IN_FLIGHT)
+            ).rowcount
+        self.job = dict(job)
+        if resumed:
+            logger.info(f"回填 {name}：{resumed} 則上次中斷時未完成的新聞放回 pending")
+
+    def _migrate(self):
+        """為舊版資料庫補上新增的欄位"""
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(backfill_jobs)')}
+        if 'stale_pages' not in columns:
+            self._conn.execute('ALTER TABLE backfill_jobs ADD COLUMN stale_pages INTEGER NOT NULL DEFAULT 0')
+
+    @property
+    def exhausted(self):
+        return bool(self.job['exhausted'])
+
+    def _set_job(self, **fields):
+        fields['updated_at'] = time.time()
+        self._conn.execute(
+            f'UPDATE backfill_jobs SET {", ".join(f"{key} = ?" for key in fields)} WHERE name = ?',
+            (*fields.values(), self.name)
+        )
+        self.job.update(fields)
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM backfill_urls WHERE job = ? AND state = ?', (self.name, PENDING)
+            ).fetchone()[0]
+
+    async def load_next_page(self, fetch_page):
+        """
+        載入下一頁搜尋結果，把沒看過的新聞加入 pending，回傳是否還有下一頁可載入
+        搜尋頁沒有結果，或連續 max_stale_pages 頁都沒有新的新聞時標記為走訪完畢
+        fetch_page 同 SearchFrontier；請求失敗時拋出 RuntimeError，不推進頁數
+        """
+        if self.exhausted:
+            return False
+        page = self.job['next_page']
+        if self.job['end_page'] is not None and page > self.job['end_page']:
+            with self._lock, self._conn:
+                self._set_job(exhausted=1)
+            return False
+        page_urls = await fetch_page(search_page_url(self.job['base_url'], page))
+        if page_urls is None:
+            raise RuntimeError(f"第 {page} 頁搜尋結果載入失敗")
+
+        now = time.time()
+        with self._lock, self._conn:
+            added = 0
+            for url in sorted(page_urls, key=story_id, reverse=True):
+                added += self._conn.execute(
+                    'INSERT OR IGNORE INTO backfill_urls (job, url, page, state, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (self.name, url, page, PENDING, now)
+                ).rowcount
+            stale_pages = 0 if added else self.job['stale_pages'] + 1
+            exhausted = not page_urls or stale_pages >= self.max_stale_pages
+            # 頁數與新增的URL在同一個交易中寫入，當機時不會跳過或重複一頁
+            self._set_job(next_page=page + 1, stale_pages=stale_pages, exhausted=int(exhausted))
+        logger.info(f"回填 {self.name}：第 {page} 頁新增 {added} 則新聞")
+        return not exhausted
+
+    def take(self, limit):
+        """取出最多 limit 則 pending 的新聞（依搜尋頁順序）並標記為 in_flight"""
+        with self._lock, self._conn:
+            urls = [row['url'] for row in self._conn.execute(
+                'SELECT url FROM backfill_urls WHERE job = ? AND state = ? ORDER BY page, rowid LIMIT ?',
+                (self.name, PENDING, limit)
+            )]
+            self._conn.executemany(
+                'UPDATE backfill_urls SET state = ?, updated_at = ? WHERE job = ? AND url = ?',
+                [(IN_FLIGHT, time.time(), self.name, url) for url in urls]
+            )
+        return urls
+
+    def finish(self, url, news_item, source):
+        """
+        記錄一則新聞的結果：source 為 'failed' 時累計失敗次數，未達上限前放回 pending，
+        其餘（包含內容不完整的頁面）為 done；累積 checkpoint_every 則後寫入
+        """
+        published_at = parse_published_at(news_item.get('published_at')) if news_item else None
+        with self._lock:
+            self._updates[url] = (FAILED if source == 'failed' else DONE, published_at)
+            due = len(self._updates) >= self.checkpoint_every
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """把累積的完成狀態寫入資料庫"""
+        with self._lock, self._conn:
+            updates, self._updates = self._updates, {}
+            now = time.time()
+            for url, (state, published_at) in updates.items():
+                if state == FAILED:
+                    self._conn.execute(
+                        'UPDATE backfill_urls SET attempts = attempts + 1, updated_at = ?, '
+                        'state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE job = ? AND url = ?',
+                        (now, self.max_attempts, FAILED, PENDING, self.name, url)
+                    )
+                else:
+                    self._conn.execute(
+                        'UPDATE backfill_urls SET state = ?, published_at = ?, updated_at = ? '
+                        'WHERE job = ? AND url = ?',
+                        (DONE, published_at, now, self.name, url)
+                    )
+        return len(updates)
+
+    def release(self, urls):
+        """把沒有結果（逾時或中斷）的新聞放回 pending"""
+        with self._lock, self._conn:
+            unfinished = [url for url in urls if url not in self._updates]
+            self._conn.executemany(
+                'UPDATE backfill_urls SET state = ? WHERE job = ? AND url = ? AND state = ?',
+                [(PENDING, self.name, url, IN_FLIGHT) for url in unfinished]
+            )
+
+    def end_batch(self, news_items):
+        """
+        一批新聞完成後呼叫；搜尋結果由新到舊排列，
+        若這批新聞的發佈時間全部早於 since，之後的頁面只會更舊，不再載入
+        """
+        since = self.job['since']
+        times = [parse_published_at(item.get('published_at')) for item in news_items if item]
+        times = [value for value in times if value is not None]
+        if since is not None and times and max(times) < since and not self.exhausted:
+            logger.info(f"回填 {self.name}：已早於起始時間，不再載入更多頁")
+            with self._lock, self._conn:
+                self._set_job(exhausted=1)
+
+    def retry_failed(self):
+        """把 failed 的新聞放回 pending 並重設失敗次數，回傳筆數"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                'UPDATE backfill_urls SET state = ?, attempts = 0 WHERE job = ? AND state = ?',
+                (PENDING, self.name, FAILED)
+            ).rowcount
+
+    def in_range_count(self):
+        """已完成且發佈時間在 [since, until) 內的新聞數"""
+        since, until = self.job['since'], self.job['until']
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM backfill_urls WHERE job = ? AND state = ? AND published_at >= ? '
+                'AND published_at < ?',
+                (self.name, DONE, since if since is not None else float('-inf'),
+                 until if until is not None else float('inf'))
+            ).fetchone()[0]
+
+    def status(self):
+        """各狀態的新聞數與搜尋頁進度"""
+        with self._lock:
+            counts = dict(self._conn.execute(
+                'SELECT state, COUNT(*) FROM backfill_urls WHERE job = ? GROUP BY state', (self.name,)
+            ).fetchall())
+        return {
+            'name': self.name,
+            'base_url': self.job['base_url'],
+            'next_page': self.job['next_page'],
+            'exhausted': self.exhausted,
+            'counts': {state: counts.get(state, 0) for state in STATES},
+            'in_range': self.in_range_count(),
+        }
+
+    def complete(self):
+        """搜尋頁已走訪完畢且沒有 pending 的新聞"""
+        return self.exhausted and self.pending_count() == 0
+
+    def close(self):
+        self.checkpoint()
+        with self._lock:
+            self._conn.close()
+
+
+def format_status(status):
+    counts = status['counts']
+    return (f"{status['name']}: 下一頁 {status['next_page']}{'（搜尋頁已走訪完畢）' if status['exhausted'] else ''}，"
+            f"pending {counts[PENDING]}、in_flight {counts[IN_FLIGHT]}、done {counts[DONE]}"
+            f"（時間範圍內 {status['in_range']}）、failed {counts[FAILED]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='歷史新聞回填（可中斷、續傳）')
+    parser.add_argument('name', help='回填工作名稱；以相同名稱重新執行即從上次停下的地方繼續')
+    parser.add_argument('--keyword', default=DEFAULT_KEYWORD, help='搜尋關鍵字（只在第一次執行時使用）')
+    parser.add_argument('--category', type=int, default=DEFAULT_CATEGORY, help='搜尋分類ID')
+    parser.add_argument('--since', help='發佈時間下限（台北時間 YYYY-MM-DD[ HH:MM] 或 epoch 秒）')
+    parser.add_argument('--until', help='發佈時間上限（只有日期時包含當天）')
+    parser.add_argument('--start-page', type=int, default=1, help='從第幾頁搜尋結果開始')
+    parser.add_argument('--end-page', type=int, help='走訪到第幾頁搜尋結果為止')
+    parser.add_argument('--checkpoint-every', type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help='每完成幾則新聞寫入一次進度')
+    parser.add_argument('--max-articles', type=int, help='本次最多處理的新聞數')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='新聞儲存與回填進度的 SQLite 檔案')
+    parser.add_argument('--status', action='store_true', help='只顯示進度')
+    parser.add_argument('--retry-failed', action='store_true', help='把 failed 的新聞放回 pending')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    frontier = BackfillFrontier(
+        args.name, args.db, base_url=search_url(args.keyword, args.category),
+        since=parse_time_arg(args.since), until=parse_time_arg(args.until, end_of_day=True),
+        start_page=args.start_page, end_page=args.end_page, checkpoint_every=args.checkpoint_every
+    )
+    try:
+        if args.retry_failed:
+            logger.info(f"{frontier.retry_failed()} 則失敗的新聞放回 pending")
+        if args.status:
+            print(format_status(frontier.status()))
+            return
+
+        lock = CrawlLock(f'{args.db}.backfill-{args.name}.lock')
+        if not lock.acquire():
+            raise SystemExit(f"回填 {args.name} 已在執行中（{lock.holder()}）")
+        try:
+            stop = threading.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+            options = crawl_options()
+            for key in ('deadline', 'incremental', 'dedupe'):
+                options.pop(key)
+            processed, summary = asyncio.run(backfill_async(
+                frontier, store=ArticleStore(args.db), max_articles=args.max_articles, stop=stop, **options
+            ))
+            logger.info(f"本次處理 {processed} 則新聞，耗時 {summary['elapsed']:.1f}s")
+        finally:
+            lock.release()
+        print(format_status(frontier.status()))
+        if frontier.complete():
+            logger.info(f"回填 {args.name} 已完成")
+    finally:
+        frontier.close()
+
+
+if __name__ == "__main__":
+    main()
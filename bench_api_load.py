@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+API 負載測試
+以多個執行緒、各自一條 keep-alive 連線持續發送請求，回報每個端點的每秒請求數、
+延遲 p50/p95/p99 與錯誤數
+
+用法:
+    gunicorn -c gunicorn.conf.py wsgi:app &
+    python bench_api_load.py --url http://127.0.0.1:5000 -c 32 -d 20
+    python bench_api_load.py --path /api/news?limit=20 --path /api/health
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from metrics import percentile
+
+DEFAULT_PATHS = ['/api/news', '/api/health']
+
+
+def _worker(host, port, path, deadline, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+            else:
+                latencies.append(time.perf_counter() - start)
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+    conn.close()
+
+
+def run_load(base_url, path, concurrency=16, duration=10.0):
+    """
+    對單一路徑施加負載 duration 秒，回傳
+    {'path', 'requests', 'errors', 'rps', 'p50', 'p95', 'p99'}（延遲單位為秒）
+    """
+    parts = urlsplit(base_url)
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=_worker, args=(parts.hostname, parts.port or 80, path, deadline,
+                                               latencies, errors), daemon=True)
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'path': path,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API 負載測試')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='API 位址')
+    parser.add_argument('--path', action='append', help='要測試的路徑（可重複，預設 /api/news 與 /api/health）')
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help='同時的連線數')
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='每個路徑的測試秒數')
+    parser.add_argument('--warmup', type=float, default=1.0, help='正式計時前的暖機秒數')
+    args = parser.parse_args()
+
+    print(f"目標: {args.url}  並發 {args.concurrency}  每個路徑 {args.duration:.0f} 秒")
+    print("=" * 78)
+    print(f"{'路徑':<24} {'請求數':>8} {'錯誤':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for path in args.path or DEFAULT_PATHS:
+        if args.warmup:
+            run_load(args.url, path, args.concurrency, args.warmup)
+        result = run_load(args.url, path, args.concurrency, args.duration)
+        print(f"{path:<24} {result['requests']:>8} {result['errors']:>6} {result['rps']:>9.1f} "
+              f"{result['p50'] * 1000:>8.2f} {result['p95'] * 1000:>8.2f} {result['p99'] * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+爬取吞吐量基準測試
+以 replay_server 重播 cassette（預設為合成頁面），在不連網的情況下量測：
+每秒爬取的新聞數、每則新聞的 p50/p95 延遲、解析 CPU 時間、記憶體峰值，
+以及 /api/news 冷啟動與快取命中時的回應時間
+
+用法:
+    python bench_crawl.py                              # 合成頁面，並發 1/2/4/8
+    python bench_crawl.py --latency 0.1 --jitter 0.05  # 模擬網路延遲
+    python bench_crawl.py --cassette udn.json -c 4 8   # 使用錄製的真實頁面
+"""
+
+import argparse
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+from metrics import percentile
+
+
+def fresh_store():
+    from article_store import ArticleStore
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    return ArticleStore(path)
+
+
+def bench_crawl(concurrency, limit, rate):
+    """以空白的本地儲存完整爬取一次，回傳量測結果"""
+    import crawler
+    from http_cache import ValidatorCache
+
+    latencies = []
+    parse_cpu = [0.0]
+    original_fetch_story = crawler.fetch_story
+    original_parse_story = crawler.parse_story
+
+    async def timed_fetch_story(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original_fetch_story(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    def timed_parse_story(*args, **kwargs):
+        start = time.thread_time()
+        try:
+            return original_parse_story(*args, **kwargs)
+        finally:
+            parse_cpu[0] += time.thread_time() - start
+
+    crawler.fetch_story = timed_fetch_story
+    crawler.parse_story = timed_parse_story
+    crawler.search_page_cache = ValidatorCache()
+    try:
+        start = time.perf_counter()
+        news = crawler.scrape_news(concurrency=concurrency, rate=rate, limit=limit,
+                                   store=fresh_store())
+        elapsed = time.perf_counter() - start
+    finally:
+        crawler.fetch_story = original_fetch_story
+        crawler.parse_story = original_parse_story
+
+    return {
+        'concurrency': concurrency,
+        'articles': len(news),
+        'elapsed': elapsed,
+        'articles_per_sec': len(news) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'parse_cpu': parse_cpu[0],
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def bench_api(limit, requests_count):
+    """/api/news 第一次請求（觸發爬取）與之後快取命中的回應時間"""
+    import app as api
+
+    client = api.app.test_client()
+    start = time.perf_counter()
+    response = client.get(f'/api/news?limit={limit}')
+    cold = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+
+    timings = []
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        client.get(f'/api/news?limit={limit}')
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'cold': cold,
+        'warm_rps': len(timings) / sum(timings),
+        'p50': percentile(timings, 0.50),
+        'p95': percentile(timings, 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬取吞吐量基準測試')
+    parser.add_argument('--cassette', help='cassette 檔路徑，未指定時使用合成頁面')
+    parser.add_argument('--stories', type=int, default=40, help='合成頁面的新聞數')
+    parser.add_argument('-c', '--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--limit', type=int, default=30, help='每次爬取的新聞數')
+    parser.add_argument('--rate', type=float, default=1000.0, help='每秒請求數上限')
+    parser.add_argument('--latency', type=float, default=0.02, help='重播伺服器的回應延遲秒數')
+    parser.add_argument('--jitter', type=float, default=0.01, help='延遲的隨機增減範圍')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回應錯誤的機率 (0-1)')
+    parser.add_argument('--api-requests', type=int, default=200, help='/api/news 快取命中的請求數')
+    args = parser.parse_args()
+
+    # 在匯入爬蟲之前設定，讓預設儲存與 API 都使用暫存資料庫與相同的限速
+    workdir = tempfile.mkdtemp(prefix='bench_crawl_')
+    os.environ['ARTICLE_DB'] = os.path.join(workdir, 'articles.db')
+    os.environ['CRAWL_RATE'] = str(args.rate)
+    os.environ['CRAWL_CONCURRENCY'] = str(max(args.concurrency))
+
+    import crawler
+    from replay import Cassette, make_sample_cassette
+    from replay_server import ReplayServer
+
+    cassette = Cassette(args.cassette) if args.cassette else make_sample_cassette(story_count=args.stories)
+    server = ReplayServer(cassette, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, seed=1).start()
+    crawler.use_cassette(None)
+    crawler.ORIGIN_OVERRIDES['https://udn.com'] = server.url
+
+    print(f"重播 {len(cassette)} 個回應，延遲 {args.latency}±{args.jitter} 秒，錯誤率 {args.error_rate}")
+    results = []
+    try:
+        for concurrency in args.concurrency:
+            results.append(bench_crawl(concurrency, args.limit, args.rate))
+        api_result = bench_api(args.limit, args.api_requests)
+    finally:
+        server.stop()
+
+    print("\n" + "=" * 78)
+    print(f"{'並發':>6} {'新聞數':>8} {'總時間(s)':>10} {'新聞/秒':>10} "
+          f"{'p50(ms)':>9} {'p95(ms)':>9} {'解析CPU(s)':>11} {'RSS(MB)':>9}")
+    for r in results:
+        print(f"{r['concurrency']:>6} {r['articles']:>8} {r['elapsed']:>10.2f} "
+              f"{r['articles_per_sec']:>10.1f} {r['p50'] * 1000:>9.1f} {r['p95'] * 1000:>9.1f} "
+              f"{r['parse_cpu']:>11.3f} {r['peak_rss_mb']:>9.1f}")
+
+    if len(results) > 1:
+        speedup = results[-1]['articles_per_sec'] / max(results[0]['articles_per_sec'], 1e-9)
+        print(f"\n並發 {results[-1]['concurrency']} 相對並發 {results[0]['concurrency']} "
+              f"的吞吐量: {speedup:.1f}x")
+
+    print(f"\n/api/news 冷啟動: {api_result['cold'] * 1000:.1f} ms")
+    print(f"/api/news 快取命中: {api_result['warm_rps']:.0f} req/s "
+          f"(p50 {api_result['p50'] * 1000:.2f} ms, p95 {api_result['p95'] * 1000:.2f} ms)")
+    print(f"平均每則解析 CPU: "
+          f"{statistics.mean(r['parse_cpu'] / max(r['articles'], 1) for r in results) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+圖片URL過濾基準測試
+比較舊版以子字串比對的規則與 image_filter.py 的編譯規則：每次判斷的耗時，以及誤判率
+（有效新聞圖片被排除的比例、廣告/圖示被放行的比例）
+
+用法:
+    python bench_image_filter.py                    # 依聯合新聞網URL樣式產生的標註語料
+    python bench_image_filter.py urls.tsv           # 每行「URL<TAB>valid|invalid」的標註語料
+    python bench_image_filter.py --db articles.db   # 已爬取新聞中的圖片URL（無標註，只比較結果差異）
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import time
+
+from image_filter import ImageUrlRules
+
+LEGACY_KEYWORDS = [
+    'ad', 'ads', 'advertisement', 'banner', 'logo',
+    'facebook', 'twitter', 'line', 'weibo',
+    'pixel', 'tracking', 'beacon'
+]
+LEGACY_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp', '.gif']
+
+
+def legacy_is_valid(img_url):
+    """舊版 is_valid_news_image 的URL判斷（子字串比對）"""
+    img_url_lower = img_url.lower()
+    for keyword in LEGACY_KEYWORDS:
+        if keyword in img_url_lower:
+            return False
+    return any(ext in img_url_lower for ext in LEGACY_EXTENSIONS)
+
+
+# 路徑中常見、但包含舊版關鍵字子字串的字詞
+BENIGN_WORDS = ['upload', 'header', 'headline', 'online', 'download', 'roadside', 'pipeline',
+                'deadline', 'shadow', 'trade', 'grade', 'loading', 'leader', 'islander', 'madrid']
+
+SITE_ICONS = [
+    'https://s.udn.com.tw/static/font-icons/facebook.png',
+    'https://s.udn.com.tw/static/font-icons/line.png',
+    'https://s.udn.com.tw/static/font-icons/twitter.png',
+    'https://s.udn.com.tw/static/img/logo/udn-logo.png',
+    'https://s.udn.com.tw/static/img/icon-share.svg',
+]
+
+
+def make_corpus(pages=2000, seed=1):
+    """
+    產生標註語料：每頁 3-8 張新聞圖片，加上每頁都有的網站圖示與偶爾出現的廣告、追蹤像素
+    回傳 [(url, is_valid), ...]
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for page in range(pages):
+        story_id = 7700000 + page
+        for n in range(rng.randint(3, 8)):
+            date = f'2024/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}'
+            folder = rng.choice(['realtime', 'news', rng.choice(BENIGN_WORDS)])
+            name = rng.choice([f'{story_id}_{n}', f'{rng.choice(BENIGN_WORDS)}-{story_id}-{n}'])
+            ext = rng.choice(['jpg', 'jpg', 'jpg', 'png', 'webp'])
+            source = f'https://uc.udn.com.tw/photo/{date}/{folder}/{name}.{ext}'
+            if rng.random() < 0.7:
+                url = f'https://pgw.udn.com.tw/gw/photo.php?u={source}&x=0&y=0&sw=0&sh=0&sl=W&fw=800&exp=3600'
+            else:
+                url = source
+            corpus.append((url, True))
+
+        corpus.extend((url, False) for url in SITE_ICONS)
+        if rng.random() < 0.3:
+            corpus.append((rng.choice([
+                f'https://tpc.googlesyndication.com/simgad/{rng.getrandbits(48)}.jpg',
+                f'https://ad.doubleclick.net/ddm/ad/{rng.getrandbits(32)}.gif',
+                f'https://s.udn.com.tw/static/ad/banner_{rng.randint(1, 99)}.jpg',
+                f'https://udn.com/static/pixel.gif?t={rng.getrandbits(32)}',
+            ]), False))
+    return corpus
+
+
+def load_labelled(path):
+    corpus = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            url, _, label = line.rstrip('\n').partition('\t')
+            if url:
+                corpus.append((url, label.strip() != 'invalid'))
+    return corpus
+
+
+def load_db_urls(path):
+    conn = sqlite3.connect(path)
+    urls = []
+    for (images,) in conn.execute('SELECT images FROM articles WHERE valid = 1'):
+        urls.extend(image['url'] for image in json.loads(images or '[]'))
+    conn.close()
+    return urls
+
+
+def time_per_call(check, urls, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for url in urls:
+            check(url)
+        best = min(best, time.perf_counter() - start)
+    return best / len(urls)
+
+
+def error_rates(check, corpus):
+    valid = [url for url, ok in corpus if ok]
+    invalid = [url for url, ok in corpus if not ok]
+    false_reject = sum(1 for url in valid if not check(url))
+    false_accept = sum(1 for url in invalid if check(url))
+    return (false_reject / len(valid) if valid else 0.0,
+            false_accept / len(invalid) if invalid else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='圖片URL過濾基準測試')
+    parser.add_argument('corpus', nargs='?', help='標註語料（URL<TAB>valid|invalid）')
+    parser.add_argument('--db', help='從 articles.db 讀取已爬取的圖片URL')
+    parser.add_argument('--pages', type=int, default=2000, help='合成語料的頁數')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='計時重複次數（取最佳）')
+    args = parser.parse_args()
+
+    if args.db:
+        corpus = [(url, None) for url in load_db_urls(args.db)]
+    elif args.corpus:
+        corpus = load_labelled(args.corpus)
+    else:
+        corpus = make_corpus(args.pages)
+    urls = [url for url, _ in corpus]
+    if not urls:
+        parser.error('語料中沒有URL')
+
+    uncached = ImageUrlRules(cache_size=0)
+    timings = {
+        '舊版（子字串）': time_per_call(legacy_is_valid, urls, args.repeat),
+        '編譯規則（不快取）': time_per_call(uncached.is_valid, urls, args.repeat),
+        # 每次計時都使用新的快取，只有語料中重複的URL會命中
+        '編譯規則（LRU 快取）': min(time_per_call(ImageUrlRules().is_valid, urls, 1)
+                              for _ in range(args.repeat)),
+    }
+
+    print(f"語料: {len(urls)} 個URL，其中 {len(set(urls))} 個不重複")
+    print("=" * 60)
+    baseline = timings['舊版（子字串）']
+    for name, seconds in timings.items():
+        print(f"{name:<16} {seconds * 1e6:8.2f} µs/URL  ({baseline / seconds:4.2f}x)")
+
+    if corpus[0][1] is None:
+        changed = [url for url in urls if legacy_is_valid(url) != uncached.is_valid(url)]
+        print(f"\n結果不同的URL: {len(changed)} 個")
+        for url in changed[:10]:
+            print(f"  {'放行' if uncached.is_valid(url) else '排除'}: {url}")
+        return
+
+    print()
+    for name, check in (('舊版（子字串）', legacy_is_valid), ('編譯規則', uncached.is_valid)):
+        false_reject, false_accept = error_rates(check, corpus)
+        print(f"{name:<16} 誤排除有效圖片 {false_reject:6.1%}   誤放行廣告/圖示 {false_accept:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+新聞記錄記憶體基準測試
+比較快取中保存 dict（快照讀回的 JSON 格式，也就是改用 records.py 之前的表示法）與
+Article / Image 記錄時，每則新聞佔用的位元組數（以 tracemalloc 量測常駐的配置）
+
+用法:
+    python bench_memory.py                 # 合成頁面解析出 200 則新聞，複製到 20000 則
+    python bench_memory.py -n 100000       # 快取 10 萬則新聞
+    python bench_memory.py --store articles.db -n 50000   # 使用本地儲存中的新聞
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from records import Article
+
+
+def load_articles(store_path=None, count=200):
+    """取得一組真實格式的新聞：本地儲存中的有效新聞，或解析合成頁面"""
+    if store_path:
+        from article_store import ArticleStore
+
+        store = ArticleStore(store_path)
+        news, _ = store.news_between(None, None, limit=count)
+        return news
+
+    from crawler import parse_story
+    from sample_pages import make_corpus
+
+    return [parse_story(html, url) for url, html in make_corpus(count)]
+
+
+def make_copy(item, n):
+    """第 n 份複本：新聞與圖片URL加上序號"""
+    return dict(item, url=f"{item['url']}?copy={n}",
+                images=[dict(image, url=f"{image['url']}&copy={n}") for image in item['images']])
+
+
+def measure(build):
+    """回傳 build() 結果常駐的位元組數（保留結果直到量測結束）"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='新聞記錄記憶體基準測試')
+    parser.add_argument('--store', help='articles.db 路徑，未指定時使用合成頁面')
+    parser.add_argument('--sample', type=int, default=200, help='作為樣本的新聞數')
+    parser.add_argument('-n', '--count', type=int, default=20000, help='快取中的新聞數（樣本重複使用）')
+    args = parser.parse_args()
+
+    # 每則新聞各自從 JSON 讀回，和快取從快照或資料庫載入時一樣不共用字串；
+    # 重複使用的樣本改寫新聞與圖片URL，避免 Image 的 interning 讓結果偏樂觀
+    sample = [item.as_dict() for item in load_articles(args.store, args.sample)]
+    if not sample:
+        parser.error('沒有可用的新聞')
+    payloads = [json.dumps(make_copy(sample[i % len(sample)], i), ensure_ascii=False) for i in range(args.count)]
+    image_count = sum(len(item['images']) for item in sample) * args.count / len(sample)
+
+    as_dicts = measure(lambda: [json.loads(payload) for payload in payloads])
+    as_records = measure(lambda: [Article.from_dict(json.loads(payload)) for payload in payloads])
+
+    print(f"{args.count} 則新聞（{len(sample)} 則樣本），平均每則 {image_count / args.count:.1f} 張圖片")
+    print("=" * 48)
+    print(f"{'表示法':<12} {'總計 (MB)':>12} {'每則位元組':>12}")
+    for name, size in (('dict', as_dicts), ('Article', as_records)):
+        print(f"{name:<12} {size / 1024 / 1024:>12.1f} {size / args.count:>12.0f}")
+    print(f"節省 {1 - as_records / as_dicts:.0%}（每則少 {(as_dicts - as_records) / args.count:.0f} 位元組）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+多程序解析基準測試
+以 cassette 中錄製的新聞頁面（預設為合成頁面）量測 ParsePool 在不同子程序數下的每秒解析頁數，
+並與在目前程序中直接呼叫 parse_story 比較，檢查解析結果是否一致
+
+用法:
+    python bench_parse_pool.py                           # 合成頁面，子程序數 1/2/4/... 到 CPU 核心數
+    python bench_parse_pool.py --cassette udn.json -w 1 2 4 8 -k 8
+"""
+
+import argparse
+import os
+import time
+
+from crawler import parse_story
+from parse_pool import ParsePool, DEFAULT_CHUNK_SIZE
+
+
+def load_corpus(cassette_path=None, story_count=200):
+    """取出 cassette 中的新聞頁面 [(原始位元組, 網址), ...]"""
+    from replay import Cassette, make_sample_cassette
+
+    cassette = Cassette(cassette_path) if cassette_path else make_sample_cassette(story_count=story_count)
+    return [(entry['body'], url) for url, entry in cassette.entries.items()
+            if '/news/story/' in url and entry['status'] == 200]
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    workers = [1]
+    while workers[-1] * 2 <= cores:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != cores:
+        workers.append(cores)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多程序解析基準測試')
+    parser.add_argument('--cassette', help='cassette 檔路徑，未指定時使用合成頁面')
+    parser.add_argument('--stories', type=int, default=200, help='合成頁面的新聞數')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', help='子程序數（預設 1、2、4… 到 CPU 核心數）')
+    parser.add_argument('-k', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每批送給子程序的頁面數')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='整份頁面重複解析的次數')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.cassette, args.stories)
+    pages = corpus * args.repeat
+    print(f"{len(corpus)} 個新聞頁面，重複 {args.repeat} 次，每批 {args.chunk_size} 頁，CPU 核心 {os.cpu_count()}")
+
+    started = time.perf_counter()
+    expected = [parse_story(html, url) for html, url in pages]
+    baseline = len(pages) / (time.perf_counter() - started)
+
+    print("=" * 52)
+    print(f"{'子程序數':<10} {'頁/秒':>10} {'加速':>8} {'平行效率':>10} {'結果一致':>8}")
+    print(f"{'同程序':<10} {baseline:>10.1f} {1.0:>8.2f} {'':>10} {'':>8}")
+    for workers in args.workers or default_workers():
+        with ParsePool(workers, args.chunk_size) as pool:
+            pool.parse_many(corpus[:workers * args.chunk_size])  # 暖機：等子程序啟動並載入模組
+            started = time.perf_counter()
+            news = pool.parse_many(pages)
+            rate = len(pages) / (time.perf_counter() - started)
+        speedup = rate / baseline
+        print(f"{workers:<10} {rate:>10.1f} {speedup:>8.2f} {speedup / workers:>10.0%} "
+              f"{'是' if news == expected else '否':>8}")
+
+
+if __name__ == "__main__":
+    main()
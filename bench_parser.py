@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+解析器基準測試
+比較 lxml 單次走訪的 parse_story 與舊版 BeautifulSoup (html.parser) 實作，
+回報每秒解析頁數與解析期間的記憶體峰值
+
+用法:
+    python bench_parser.py                 # 使用 sample_pages 產生的合成頁面
+    python bench_parser.py pages/ -n 5     # 使用資料夾中保存的 .html 頁面，每頁解析 5 次
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+import tracemalloc
+
+PARSERS = ('parse_story', 'parse_story_soup')
+
+
+def load_corpus(corpus_dir=None, count=50):
+    """讀取保存的頁面；未指定資料夾時使用合成頁面"""
+    if not corpus_dir:
+        from sample_pages import make_corpus
+        return [(url, html.encode('utf-8')) for url, html in make_corpus(count)]
+
+    corpus = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(corpus_dir, name), 'rb') as f:
+                corpus.append((f'https://udn.com/news/story/0/{name[:-5]}', f.read()))
+    return corpus
+
+
+def run_parser(parser_name, corpus_dir, count, repeat, queue):
+    """在獨立行程中執行解析，避免兩種實作的記憶體互相影響"""
+    import crawler
+
+    parse = getattr(crawler, parser_name)
+    corpus = load_corpus(corpus_dir, count)
+    if parser_name == 'parse_story_soup':
+        corpus = [(url, body.decode('utf-8', errors='replace')) for url, body in corpus]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    parsed = 0
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url, body in corpus:
+            if parse(body, url):
+                parsed += 1
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - start_cpu
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    pages = len(corpus) * repeat
+    queue.put({
+        'parser': parser_name,
+        'pages': pages,
+        'articles': parsed,
+        'seconds': elapsed,
+        'pages_per_sec': pages / elapsed if elapsed else 0,
+        'cpu_ms_per_page': cpu / pages * 1000 if pages else 0,
+        'py_peak_kb': py_peak / 1024,
+        'rss_growth_kb': rss_after - rss_before,
+    })
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='新聞頁解析器基準測試')
+    arg_parser.add_argument('corpus', nargs='?', help='保存的 .html 頁面資料夾')
+    arg_parser.add_argument('-c', '--count', type=int, default=50, help='合成頁面數量')
+    arg_parser.add_argument('-n', '--repeat', type=int, default=3, help='每頁解析次數')
+    args = arg_parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.count)
+    total_bytes = sum(len(body) for _, body in corpus)
+    print("=== 解析器基準測試 ===")
+    print(f"頁面數: {len(corpus)}，平均大小: {total_bytes / max(1, len(corpus)) / 1024:.1f} KB，重複 {args.repeat} 次")
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for parser_name in PARSERS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_parser, args=(parser_name, args.corpus, args.count, args.repeat, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    print(f"\n{'解析器':<18}{'頁/秒':>10}{'CPU ms/頁':>12}{'Python 峰值 KB':>16}{'RSS 增長 KB':>14}{'有效新聞':>10}")
+    for r in results:
+        print(f"{r['parser']:<18}{r['pages_per_sec']:>10.1f}{r['cpu_ms_per_page']:>12.2f}"
+              f"{r['py_peak_kb']:>16.0f}{r['rss_growth_kb']:>14}{r['articles']:>10}")
+
+    fast, slow = results
+    if slow['pages_per_sec']:
+        print(f"\nparse_story 速度為舊版的 {fast['pages_per_sec'] / slow['pages_per_sec']:.1f} 倍")
+
+
+if __name__ == "__main__":
+    main()
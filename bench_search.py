@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+全文檢索基準測試
+以合成新聞（詞頻依 Zipf 分布）建立大量資料的索引，量測建立速度與各類查詢的 p50/p95 延遲
+
+用法:
+    python bench_search.py                     # 10 萬則新聞
+    python bench_search.py --count 300000
+    python bench_search.py --db articles.db    # 已爬取的資料（只量測查詢）
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from article_fields import parse_time_arg
+from article_store import ArticleStore
+from metrics import percentile
+
+
+def make_vocabulary(size, rng, charset_size=3000):
+    """由 charset_size 個常用字組成的隨機二到四字中文詞"""
+    charset = [chr(0x4e00 + i * 7) for i in range(charset_size)]
+    return list(dict.fromkeys(
+        ''.join(rng.choices(charset, k=rng.randint(2, 4))) for _ in range(size)
+    ))
+
+
+def populate(store, count, seed=1):
+    """寫入 count 則合成新聞，回傳 (詞彙表, 每秒寫入數)"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(20000, rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    reporters = [f'記者{rng.choice("王李張陳林黃吳劉")}{"".join(make_vocabulary(1, rng))}' for _ in range(300)]
+    start_time = 1672502400  # 2023-01-01 台北時間 0 點前後
+    started = time.perf_counter()
+    for n in range(count):
+        words = rng.choices(vocabulary, weights, k=rng.randint(150, 350))
+        published = start_time + n * 600
+        item = {
+            'title': ''.join(rng.choices(vocabulary, weights, k=6)),
+            'publish_time': time.strftime('%Y-%m-%d %H:%M', time.gmtime(published + 8 * 3600)),
+            'reporter': f'{rng.choice(reporters)}／台北報導',
+            'content': '，'.join(''.join(words[i:i + 8]) for i in range(0, len(words), 8)),
+            'images': [],
+        }
+        store.save(f'https://udn.com/news/story/7266/{8000000 + n}', item)
+    return vocabulary, count / (time.perf_counter() - started)
+
+
+def time_query(store, repeat, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        store.search(**kwargs)
+        timings.append(time.perf_counter() - started)
+    return percentile(timings, 0.50), percentile(timings, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全文檢索基準測試')
+    parser.add_argument('--count', type=int, default=100000, help='合成新聞數')
+    parser.add_argument('--db', help='使用既有的 articles.db，不產生合成資料')
+    parser.add_argument('--no-optimize', action='store_true', help='不合併索引區段（逐則寫入後的狀態）')
+    parser.add_argument('-r', '--repeat', type=int, default=50, help='每個查詢的重複次數')
+    args = parser.parse_args()
+
+    if args.db:
+        store = ArticleStore(args.db)
+        vocabulary = ['空汙', '空氣品質', '環境部', '細懸浮微粒', '颱風', '經濟']
+    else:
+        path = os.path.join(tempfile.mkdtemp(), 'articles.db')
+        store = ArticleStore(path)
+        vocabulary, rate = populate(store, args.count)
+        print(f"建立索引: {args.count} 則新聞，每秒 {rate:.0f} 則，資料庫 {os.path.getsize(path) / 1e6:.0f} MB")
+        if not args.no_optimize:
+            started = time.perf_counter()
+            store.optimize_search_index()
+            print(f"合併索引區段: {time.perf_counter() - started:.1f}s")
+
+    common, medium, rare = vocabulary[0], vocabulary[len(vocabulary) // 20], vocabulary[-1]
+    middle = store.search(since=0, limit=1, offset=max(0, store.count() // 2))[0]
+    since = parse_time_arg(middle[0]['published_at']) if middle else 0
+    queries = {
+        '常見詞': {'q': common},
+        '中頻詞': {'q': medium},
+        '罕見詞': {'q': rare},
+        '兩個詞': {'q': f'{medium} {vocabulary[len(vocabulary) // 10]}'},
+        '單一字': {'q': medium[0]},
+        '記者': {'reporter': '記者王'},
+        '中頻詞 + 時間': {'q': medium, 'since': since},
+        '中頻詞 依時間排序': {'q': medium, 'order': 'time'},
+        '只依時間': {'since': since},
+        '中頻詞 第 5 頁': {'q': medium, 'offset': 40},
+    }
+
+    print(f"共 {store.count()} 則新聞，每個查詢 {args.repeat} 次")
+    print("=" * 56)
+    print(f"{'查詢':<20} {'p50 ms':>10} {'p95 ms':>10} {'結果':>8}")
+    for name, kwargs in queries.items():
+        p50, p95 = time_query(store, args.repeat, **kwargs)
+        results, _ = store.search(**kwargs)
+        print(f"{name:<20} {p50 * 1000:>10.2f} {p95 * 1000:>10.2f} {len(results):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+測試共用的 pytest fixture
+爬蟲的模組層級狀態（搜尋頁快取、cassette、來源覆寫、斷路器）在每個測試結束後還原，
+本地儲存與暫存檔一律放在 pytest 的 tmp_path
+"""
+
+import pytest
+
+import crawler
+from article_store import ArticleStore
+from http_cache import ValidatorCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    """空白的本地新聞儲存"""
+    return ArticleStore(str(tmp_path / 'articles.db'))
+
+
+@pytest.fixture
+def default_store(store, monkeypatch):
+    """把空白的 store 設為 ArticleStore.default()（API 與爬蟲未指定儲存時使用），結束後還原"""
+    monkeypatch.setattr(ArticleStore, '_default', store)
+    return store
+
+
+@pytest.fixture
+def crawl_env(monkeypatch):
+    """
+    隔離爬蟲的全域狀態：空白的搜尋頁快取與斷路器、沒有 cassette 與來源覆寫
+    測試中以 crawler.use_cassette(...)、crawler.ORIGIN_OVERRIDES[...] 設定即可，結束後自動還原
+    回傳 crawler 模組
+    """
+    monkeypatch.setattr(crawler, 'search_page_cache', ValidatorCache())
+    monkeypatch.setattr(crawler, 'active_cassette', None)
+    monkeypatch.setattr(crawler, 'ORIGIN_OVERRIDES', {})
+    crawler.circuit_breakers.reset()
+    yield crawler
+    crawler.circuit_breakers.reset()
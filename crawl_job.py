@@ -0,0 +1,119 @@
+"""
+多關鍵字、多分類的爬取工作
+將每個 (關鍵字, 分類) 組合視為一個主題，所有主題的搜尋結果合併成一個去重的新聞URL邊界，
+每則新聞只下載、解析一次，再分配給所有搜尋到它的主題
+"""
+
+import os
+from collections import namedtuple
+
+from frontier import story_id, MAX_SEARCH_PAGES
+from dedupe import annotate_clusters, representatives
+
+DEFAULT_KEYWORD = '空汙'
+DEFAULT_CATEGORY = 2
+DEFAULT_TOPIC_LIMIT = 10  # 每個主題取的新聞數
+
+
+def search_url(keyword, category=DEFAULT_CATEGORY):
+    """聯合新聞網的搜尋結果頁網址"""
+    return f'https://udn.com/search/word/{category}/{keyword}'
+
+
+class Topic(namedtuple('Topic', ['keyword', 'category'])):
+    """一個搜尋主題"""
+    __slots__ = ()
+
+    @property
+    def key(self):
+        return f'{self.category}/{self.keyword}'
+
+    @property
+    def url(self):
+        return search_url(self.keyword, self.category)
+
+
+class CrawlJob:
+    """爬取工作設定：關鍵字 × 分類 的所有組合"""
+
+    def __init__(self, keywords, categories=(DEFAULT_CATEGORY,),
+                 limit=DEFAULT_TOPIC_LIMIT, max_pages=MAX_SEARCH_PAGES):
+        keywords = [k.strip() for k in keywords if k and k.strip()]
+        if not keywords:
+            raise ValueError("至少需要一個關鍵字")
+        # 去除重複並保留原本順序
+        self.keywords = list(dict.fromkeys(keywords))
+        self.categories = list(dict.fromkeys(int(c) for c in categories))
+        self.limit = limit
+        self.max_pages = max_pages
+
+    @classmethod
+    def from_env(cls):
+        """
+        從環境變數建立工作
+        CRAWL_KEYWORDS: 以逗號分隔的關鍵字（預設 空汙）
+        CRAWL_CATEGORIES: 以逗號分隔的分類ID（預設 2）
+        CRAWL_TOPIC_LIMIT: 每個主題取的新聞數
+        """
+        return cls(
+            keywords=os.environ.get('CRAWL_KEYWORDS', DEFAULT_KEYWORD).split(','),
+            categories=os.environ.get('CRAWL_CATEGORIES', str(DEFAULT_CATEGORY)).split(','),
+            limit=int(os.environ.get('CRAWL_TOPIC_LIMIT', DEFAULT_TOPIC_LIMIT))
+        )
+
+    def topics(self):
+        return [Topic(keyword, category) for keyword in self.keywords for category in self.categories]
+
+    @staticmethod
+    def merge_frontiers(topic_urls):
+        """合併各主題的新聞URL，去重後由新到舊排序"""
+        merged = {url for urls in topic_urls.values() for url in urls}
+        return sorted(merged, key=story_id, reverse=True)
+
+    @staticmethod
+    def build_result(topic_urls, articles, dedupe=False, store=None):
+        """
+        依各主題的URL順序分配已解析的新聞
+        topic_urls: {主題key: [url, ...]}
+        articles: {url: news_item}，同一則新聞在所有主題間共用同一個物件（records.Article 或 dict），
+                  並在 topics 欄位列出所有搜尋到它的主題
+        dedupe 為 True 時先在所有新聞間分群（由新到舊，見 dedupe.py），每個主題的列表中每群只保留第一則，
+        alternate_urls 列出同群的其他新聞（不限同一主題，store 有值時包含已儲存的相同新聞）；
+        article_count 仍為下載的新聞數
+        """
+        for news_item in articles.values():
+            news_item['topics'] = []
+        if dedupe:
+            annotate_clusters(sorted(articles.values(), key=lambda item: story_id(item['url']), reverse=True),
+                              store)
+
+        topics = {}
+        for key, urls in topic_urls.items():
+            news = [articles[url] for url in urls if url in articles]
+            topics[key] = representatives(news) if dedupe else news
+            for news_item in topics[key]:
+                news_item['topics'].append(key)
+
+        return {
+            'topics': topics,
+            'article_count': len(articles),
+        }
+
+
+def news_for_query(result, keyword, category=None):
+    """
+    取出符合關鍵字（與分類）的新聞，多個分類的結果去重後由新到舊排序，內容近似的新聞只保留一則
+    找不到對應主題時回傳 None
+    """
+    matched = [
+        news for key, news in result['topics'].items()
+        if key.split('/', 1)[1] == keyword and (category is None or key.split('/', 1)[0] == str(category))
+    ]
+    if not matched:
+        return None
+
+    merged = {}
+    for news in matched:
+        for news_item in news:
+            merged.setdefault(news_item['url'], news_item)
+    return representatives(sorted(merged.values(), key=lambda item: story_id(item['url']), reverse=True))
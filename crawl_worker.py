@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+獨立的爬蟲工作程序
+依排程（固定間隔或 cron 樣式）執行爬取，把結果寫入共用的 articles.db 快照；
+API 以 NEWS_SOURCE=store 啟動時只讀取快照，不在請求中爬取，因此可以獨立擴充 API 程序數量。
+以檔案鎖確保多個工作程序（或重疊的排程）同一時間只有一個在爬取。
+
+用法:
+    python crawl_worker.py --interval 300         # 每 5 分鐘爬取一次
+    python crawl_worker.py --cron "*/10 7-23 * * *"
+    python crawl_worker.py --once                 # 只爬取一次（適合交給系統 cron 執行）
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from article_store import ArticleStore, DEFAULT_DB_PATH
+from crawl_job import CrawlJob
+from crawler import scrape_news, crawl_job, crawl_options
+
+logger = logging.getLogger(__name__)
+
+NEWS_SNAPSHOT = 'news'   # 預設搜尋的新聞列表
+JOB_SNAPSHOT = 'job'     # 多主題爬取工作（CRAWL_KEYWORDS × CRAWL_CATEGORIES）的結果
+
+DEFAULT_INTERVAL = int(os.environ.get('CRAWL_INTERVAL', 300))
+DEFAULT_LOCK_PATH = os.environ.get('CRAWL_LOCK_FILE', f'{DEFAULT_DB_PATH}.lock')
+DEFAULT_WORKER_LIMIT = int(os.environ.get('CRAWL_WORKER_LIMIT', 50))  # 快照保留的新聞數，API 從中分頁
+
+
+class CrawlLock:
+    """
+    跨程序的非阻塞檔案鎖（flock），程序結束或當機時由作業系統自動釋放
+    鎖檔內容記錄持有者的主機、PID 與取得時間，方便排查
+    """
+
+    def __init__(self, path=DEFAULT_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """取得鎖回傳 True；已被其他程序持有時立即回傳 False"""
+        if self._file is not None:
+            raise RuntimeError("鎖已被此物件持有")
+        f = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+
+        f.seek(0)
+        f.truncate()
+        f.write(f'{socket.gethostname()} {os.getpid()} {time.time():.0f}\n')
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+    def holder(self):
+        """目前（或最後一次）持有者的 '主機 PID 時間戳'，沒有時回傳 None"""
+        try:
+            with open(self.path) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+
+class IntervalSchedule:
+    """每隔固定秒數執行一次"""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("間隔必須大於 0 秒")
+        self.seconds = seconds
+
+    def next_after(self, timestamp):
+        return timestamp + self.seconds
+
+    def __str__(self):
+        return f'每 {self.seconds} 秒'
+
+
+class CronSchedule:
+    """
+    cron 樣式的排程：「分 時 日 月 星期」五個欄位（本地時間）
+    每個欄位支援 *、數字、範圍 a-b、間隔 */n 或 a-b/n，以及以逗號分隔的組合；星期 0 與 7 皆為星期日
+    與標準 cron 相同，日與星期都有限制時符合其中之一即可
+    """
+
+    FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 需要 5 個欄位: {expression}")
+        self.expression = expression
+        values = {}
+        for part, (name, low, high) in zip(parts, self.FIELDS):
+            values[name] = self._parse_field(part, low, high)
+        self.minutes, self.hours = values['minute'], values['hour']
+        self.days, self.months = values['day'], values['month']
+        self.weekdays = {day % 7 for day in values['weekday']}
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for item in field.split(','):
+            spec, _, step = item.partition('/')
+            step = int(step) if step else 1
+            if spec == '*':
+                start, end = low, high
+            elif '-' in spec:
+                start, end = (int(value) for value in spec.split('-', 1))
+            else:
+                start = end = int(spec)
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"cron 欄位超出範圍: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        in_days = moment.day in self.days
+        in_weekdays = (moment.isoweekday() % 7) in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, timestamp):
+        """timestamp 之後第一個符合的整分鐘"""
+        moment = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)  # 涵蓋 2 月 29 日
+        while moment < limit:
+            if moment.month not in self.months or not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"cron 排程永遠不會觸發: {self.expression}")
+
+    def __str__(self):
+        return f'cron "{self.expression}"'
+
+
+class CrawlWorker:
+    """
+    執行一次完整的爬取並寫入快照
+    job 預設依環境變數建立（CrawlJob.from_env），為 False 時只爬取預設搜尋
+    scrape / run_job 預設為 crawler.scrape_news 與 crawler.crawl_job，測試時可替換
+    """
+
+    def __init__(self, store=None, lock=None, job=None, limit=DEFAULT_WORKER_LIMIT, options=None,
+                 scrape=scrape_news, run_job=crawl_job):
+        self.store = store or ArticleStore.default()
+        self.lock = lock or CrawlLock()
+        self.job = job if job is not None else CrawlJob.from_env()
+        self.limit = limit
+        self.options = options if options is not None else crawl_options()
+        self._scrape = scrape
+        self._run_job = run_job
+        self.runs = 0
+
+    def run_once(self):
+        """
+        取得鎖後爬取並寫入快照，回傳是否有執行
+        鎖被其他程序持有時跳過本次；爬取失敗或沒有結果時保留舊快照
+        """
+        if not self.lock.acquire():
+            logger.info(f"其他程序正在爬取（{self.lock.holder()}），跳過本次")
+            return False
+        try:
+            started = time.time()
+            news, summary = self._scrape(limit=self.limit, store=self.store, with_summary=True,
+                                         **self.options)
+            if news:
+                self.store.save_snapshot(NEWS_SNAPSHOT, news, summary)
+            else:
+                logger.warning("爬取結果為空，保留舊快照")
+
+            if self.job:
+                result = self._run_job(self.job, store=self.store, **self.options)
+                job_summary = result.pop('summary', None)
+                if result['article_count']:
+                    self.store.save_snapshot(JOB_SNAPSHOT, result, job_summary)
+            self.store.optimize_search_index()
+            self.runs += 1
+            logger.info(f"爬取完成，{len(news)} 條新聞，耗時 {time.time() - started:.1f}s")
+            return True
+        except Exception as e:
+            logger.error(f"爬取失敗，保留舊快照: {e}")
+            return False
+        finally:
+            self.lock.release()
+
+    def run_forever(self, schedule, stop=None, run_immediately=True):
+        """依排程重複執行，直到 stop（threading.Event）被設定"""
+        stop = stop or threading.Event()
+        next_run = time.time() if run_immediately else schedule.next_after(time.time())
+        logger.info(f"爬蟲工作程序啟動，排程: {schedule}")
+        while not stop.is_set():
+            delay = next_run - time.time()
+            if delay > 0 and stop.wait(delay):
+                break
+            started = time.time()
+            self.run_once()
+            next_run = schedule.next_after(started)
+            if next_run < time.time():  # 爬取時間超過排程間隔時不補跑錯過的排程
+                next_run = schedule.next_after(time.time())
+        logger.info("爬蟲工作程序已停止")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='排程爬蟲工作程序')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='每隔幾秒爬取一次')
+    group.add_argument('--cron', default=os.environ.get('CRAWL_CRON'), help='cron 樣式的排程（本地時間）')
+    group.add_argument('--once', action='store_true', help='只爬取一次後結束')
+    parser.add_argument('--lock-file', default=DEFAULT_LOCK_PATH, help='跨程序的鎖檔路徑')
+    parser.add_argument('--limit', type=int, default=DEFAULT_WORKER_LIMIT, help='快照保留的新聞數')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    worker = CrawlWorker(lock=CrawlLock(args.lock_file), limit=args.limit)
+    if args.once:
+        raise SystemExit(0 if worker.run_once() else 1)
+
+    schedule = CronSchedule(args.cron) if args.cron else IntervalSchedule(args.interval)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    worker.run_forever(schedule, stop, run_immediately=not args.cron)
+
+
+if __name__ == "__main__":
+    main()
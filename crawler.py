@@ -1,133 +1,877 @@
-import requests
+import asyncio
+import contextlib
+import os
 import time
+import aiohttp
+from collections import namedtuple
+import threading
 from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 from urllib.parse import urljoin
+from rate_limiter import HostRateLimiter
+from article_store import ArticleStore, normalize_story_url
+from http_cache import ValidatorCache, ConditionalStats
+from frontier import SearchFrontier, encode_cursor, story_id, MAX_SEARCH_PAGES
+from crawl_job import search_url, DEFAULT_KEYWORD, DEFAULT_CATEGORY
+from replay import Cassette, REPLAY
+import metrics
+from image_probe import ImageProber
+from image_filter import DEFAULT_RULES as DEFAULT_IMAGE_RULES
+from article_fields import clean_reporter, format_timestamp, parse_publish_time
+from parse_pool import ParsePool, DEFAULT_CHUNK_SIZE as DEFAULT_PARSE_CHUNK_SIZE
+from records import Article, Image
+from dedupe import DuplicateIndex, collapse
+from fetch_policy import (AdaptiveConcurrency, CircuitOpenError, FetchPolicy, HostCircuitBreakers,
+                          RetryPolicy, HALF_OPEN, RETRY_STATUSES, parse_retry_after)
 
-def scrape_news():
-    """改進的爬蟲函數，增加更好的錯誤處理和圖片抓取"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Cache-Control': 'no-cache',
+# Accept-Encoding 交由 aiohttp 依可解碼的格式自動設定
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+BASE_URL = search_url(DEFAULT_KEYWORD, DEFAULT_CATEGORY)
+
+# 並發與限速預設值
+DEFAULT_CONCURRENCY = 4      # 同時爬取的新聞數
+DEFAULT_RATE = 2.0           # 每個主機每秒最多請求數
+MAX_STORIES = 10             # 每次爬取的預設新聞數（limit）
+MAX_ATTEMPTS = 3             # 每個請求的嘗試次數
+RETRY_DELAY = 2              # 重試前的等待秒數
+BACKFILL_BATCH_SIZE = 50     # 回填時每批爬取的新聞數
+REQUEST_TIMEOUT = 15         # 單一請求的逾時秒數
+KEEPALIVE_TIMEOUT = 30       # 閒置連接保留秒數
+REVALIDATE_AFTER = 6 * 3600  # 已儲存的新聞超過此秒數才以條件請求重新驗證
+
+# 條件請求狀態：搜尋頁的驗證快取，以及所有頁面共用的命中統計
+search_page_cache = ValidatorCache()
+conditional_stats = ConditionalStats()
+# 每個主機的斷路器，跨爬取共用才能在主機異常時讓之後的爬取立即失敗
+circuit_breakers = HostCircuitBreakers()
+
+class FetchResult(namedtuple('FetchResult', ['url', 'status', 'headers', 'body'])):
+    """單次 HTTP 請求的結果"""
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+def _trace_config():
+    """記錄 DNS 查詢、建立連接（含 TLS）的耗時，以及連接的建立與重用次數"""
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        metrics.observe_stage('dns', time.perf_counter() - ctx.dns_start)
+
+    async def on_connect_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, ctx, params):
+        metrics.observe_stage('connect', time.perf_counter() - ctx.connect_start)
+        metrics.inc('crawler_connections_total', kind='new')
+
+    async def on_connection_reused(session, ctx, params):
+        metrics.inc('crawler_connections_total', kind='reused')
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connect_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reused)
+    return trace_config
+
+def create_client_session(concurrency=DEFAULT_CONCURRENCY):
+    """創建共用連接池的 aiohttp 會話，連接保持 keep-alive 以供重用"""
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=concurrency,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=300
+    )
+    return aiohttp.ClientSession(headers=HEADERS, connector=connector,
+                                 trace_configs=[_trace_config()])
+
+# 錄製/重播（見 replay.py）：設定 cassette 後，replay 模式不連網、record 模式會保存每個回應
+active_cassette = None
+
+# 來源覆寫：{'https://udn.com': 'http://127.0.0.1:8765'}，把請求改送到本地的 replay_server
+ORIGIN_OVERRIDES = {}
+
+def use_cassette(cassette):
+    """設定（或以 None 取消）錄製/重播用的 cassette"""
+    global active_cassette
+    active_cassette = cassette
+
+def request_url(url):
+    """套用來源覆寫後實際發送請求的網址"""
+    for origin, replacement in ORIGIN_OVERRIDES.items():
+        if url.startswith(origin):
+            return replacement + url[len(origin):]
+    return url
+
+def configure_from_env():
+    """
+    依環境變數設定錄製/重播與來源覆寫
+    CRAWL_CASSETTE: cassette 檔路徑；CRAWL_CASSETTE_MODE: replay（預設）或 record
+    CRAWL_ORIGIN_OVERRIDE: 例如 https://udn.com=http://127.0.0.1:8765，多組以逗號分隔
+    """
+    cassette_path = os.environ.get('CRAWL_CASSETTE')
+    if cassette_path:
+        use_cassette(Cassette(cassette_path, mode=os.environ.get('CRAWL_CASSETTE_MODE', REPLAY)))
+    for pair in filter(None, os.environ.get('CRAWL_ORIGIN_OVERRIDE', '').split(',')):
+        origin, replacement = pair.split('=', 1)
+        ORIGIN_OVERRIDES[origin.strip()] = replacement.strip()
+
+configure_from_env()
+
+def crawl_options():
+    """從環境變數讀取爬蟲參數（API 與爬蟲工作程序共用）"""
+    return {
+        'concurrency': int(os.environ.get('CRAWL_CONCURRENCY', DEFAULT_CONCURRENCY)),
+        'rate': float(os.environ.get('CRAWL_RATE', DEFAULT_RATE)),
+        'deadline': float(os.environ.get('CRAWL_DEADLINE', 0)) or None,
+        'incremental': os.environ.get('CRAWL_INCREMENTAL', '1') == '1',
+        'probe_images': os.environ.get('CRAWL_PROBE_IMAGES', '0') == '1',
+        'parse_workers': int(os.environ.get('CRAWL_PARSE_WORKERS', 0)),
+        'parse_chunk_size': int(os.environ.get('CRAWL_PARSE_CHUNK', DEFAULT_PARSE_CHUNK_SIZE)),
+        'dedupe': os.environ.get('CRAWL_DEDUPE', '1') == '1'
     }
-    
-    base_url = 'https://udn.com/search/word/2/空汙'
-    
-    # 創建會話以重用連接
-    session = requests.Session()
-    session.headers.update(headers)
-    
+
+async def _read_body(response, max_bytes=None):
+    """讀取回應本文；指定 max_bytes 時最多只讀取這麼多位元組"""
+    if max_bytes is None:
+        return await response.read()
+    chunks = []
+    remaining = max_bytes
+    while remaining > 0:
+        chunk = await response.content.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+def default_fetch_policy(concurrency=None):
+    """
+    依目前的 MAX_ATTEMPTS / RETRY_DELAY 建立請求策略，斷路器使用全域共用的 circuit_breakers
+    concurrency 有值時以自適應並發限制同時進行的請求數
+    """
+    return FetchPolicy(
+        retry=RetryPolicy(max_attempts=MAX_ATTEMPTS, base_delay=RETRY_DELAY),
+        breakers=circuit_breakers,
+        concurrency=AdaptiveConcurrency(concurrency) if concurrency else None
+    )
+
+async def _backoff(policy, attempt, reason, retry_after=None):
+    """等待重試；回傳 False 表示不應再重試（Retry-After 超過上限）"""
+    delay = policy.retry.delay(attempt, retry_after)
+    if delay is None:
+        return False
+    print(f"請求重試 {attempt + 1}/{policy.retry.max_attempts}（{delay:.1f}s 後）: {reason}")
+    metrics.inc('crawler_retries_total')
+    metrics.observe_stage('retry_backoff', delay)
+    await asyncio.sleep(delay)
+    return True
+
+async def fetch_with_retry(session, url, limiter, timeout=REQUEST_TIMEOUT, headers=None,
+                           max_bytes=None, policy=None):
+    """
+    經過限速器發送請求，網路錯誤、逾時或 429/5xx 回應時以指數退避重試（見 fetch_policy.py）
+    重試用盡時網路錯誤拋出例外，錯誤回應則回傳最後一次的結果
+    主機的斷路器開啟時立即拋出 CircuitOpenError，不送出請求
+    max_bytes: 最多讀取的本文位元組數（搭配 Range 請求探測圖片），None 表示讀取全部
+    policy: FetchPolicy，預設為 default_fetch_policy()
+    """
+    cassette = active_cassette
+    if cassette is not None and cassette.mode == REPLAY:
+        status, response_headers, body = cassette.lookup(url, headers)
+        metrics.inc('crawler_fetches_total', status=status)
+        return FetchResult(url, status, response_headers, body[:max_bytes])
+
+    policy = policy or default_fetch_policy()
+    host, breaker = policy.breakers.for_url(request_url(url))
+    concurrency = policy.concurrency or contextlib.nullcontext()
+    last_attempt = policy.retry.max_attempts - 1
+    for attempt in range(policy.retry.max_attempts):
+        started = time.perf_counter()
+        admitted = breaker.allow()
+        if not admitted:
+            metrics.inc('crawler_circuit_rejections_total')
+            raise CircuitOpenError(host, breaker.retry_in())
+        try:
+            async with concurrency:
+                wait = limiter.reserve(url)
+                metrics.observe_stage('rate_limit', wait)
+                await asyncio.sleep(wait)
+
+                started = time.perf_counter()
+                async with session.get(request_url(url), headers=headers,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    headers_at = time.perf_counter()
+                    body = await _read_body(response, max_bytes)
+                    metrics.observe_stage('request', headers_at - started)
+                    metrics.observe_stage('download', time.perf_counter() - headers_at)
+                    metrics.inc('crawler_fetches_total', status=response.status)
+                    metrics.inc('crawler_bytes_downloaded_total', len(body))
+                    result = FetchResult(url, response.status, response.headers, body)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            if policy.concurrency is not None:
+                policy.concurrency.record(time.perf_counter() - started, ok=False)
+            if breaker.record_failure():
+                print(f"{host} 連續失敗 {breaker.failures} 次，暫停請求 {breaker.retry_in():.0f} 秒")
+            if attempt == last_attempt or not await _backoff(policy, attempt, repr(e)):
+                metrics.inc('crawler_fetch_errors_total')
+                raise
+            continue
+        except BaseException:
+            # 被取消（爬取期限、工作取消、探測器關閉）時既非成功也非失敗，
+            # 這次請求持有試探名額時釋放，避免斷路器卡在 half_open；其他請求的試探名額不受影響
+            if admitted == HALF_OPEN:
+                breaker.release_probe()
+            raise
+
+        unhealthy = policy.retry.should_retry_status(result.status)
+        if policy.concurrency is not None:
+            policy.concurrency.record(headers_at - started, ok=not unhealthy)
+        if not unhealthy:
+            breaker.record_success()
+            if cassette is not None and max_bytes is None:
+                cassette.record(result)
+            return result
+        if breaker.record_failure():
+            print(f"{host} 連續失敗 {breaker.failures} 次，暫停請求 {breaker.retry_in():.0f} 秒")
+        retry_after = parse_retry_after(result.headers.get('Retry-After'))
+        if attempt == last_attempt or not await _backoff(policy, attempt, f"HTTP {result.status}", retry_after):
+            metrics.inc('crawler_fetch_errors_total')
+            return result
+
+_parser_local = threading.local()
+
+def _parse_html(html):
+    """以 lxml 解析頁面（強制 UTF-8），每個執行緒共用一個解析器"""
+    parser = getattr(_parser_local, 'parser', None)
+    if parser is None:
+        parser = _parser_local.parser = lxml_html.HTMLParser(encoding='utf-8')
+    if isinstance(html, str):
+        html = html.encode('utf-8')
     try:
-        print("開始爬取聯合新聞網...")
-        response = session.get(base_url, timeout=15)
-        response.encoding = 'utf-8'
-
-        if response.status_code != 200:
-            print(f"請求失敗，狀態碼: {response.status_code}")
-            return []
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # 找出所有<a>標籤，並篩選出符合條件的URL
-        links = soup.find_all('a')
-        story_urls = set()
-        for link in links:
-            href = link.get('href')
-            if href:
-                full_url = urljoin(base_url, href)
-                if full_url.startswith('https://udn.com/news/story/'):
-                    story_urls.add(full_url)
-
-        print(f"找到 {len(story_urls)} 個新聞連結")
-        
-        # 限制爬取數量
-        story_urls = list(story_urls)[:10]
-        news_data = []
+        return lxml_html.fromstring(html, parser=parser)
+    except etree.ParserError:
+        return None
+
+def _iter_strings(element):
+    """依文件順序產生元素內的文字，略過註解、script 與 style（同 BeautifulSoup 的 get_text）"""
+    if not isinstance(element.tag, str) or element.tag in ('script', 'style'):
+        return
+    if element.text:
+        yield element.text
+    for child in element:
+        yield from _iter_strings(child)
+        if child.tail:
+            yield child.tail
+
+def _get_text(element):
+    """等同 BeautifulSoup 的 get_text(strip=True)"""
+    return ''.join(text.strip() for text in _iter_strings(element))
+
+def extract_story_urls(html, base_url=BASE_URL):
+    """從搜尋結果頁找出所有新聞連結，保留頁面上出現的順序"""
+    root = _parse_html(html)
+    if root is None:
+        return []
+
+    # 找出所有<a>標籤，並篩選出符合條件的URL
+    story_urls = {}
+    for link in root.iter('a'):
+        href = link.get('href')
+        if href:
+            full_url = urljoin(base_url, href)
+            if full_url.startswith('https://udn.com/news/story/'):
+                story_urls.setdefault(normalize_story_url(full_url), None)
+    return list(story_urls)
+
+async def fetch_search_page(session, url, limiter, timeout=REQUEST_TIMEOUT, cache=None, policy=None):
+    """
+    取得搜尋頁的新聞連結；伺服器回應 304 時沿用上次的解析結果，失敗時回傳 None
+    主機異常（重試用盡、斷路中或 429/5xx）且有上次的結果時沿用上次的結果
+    """
+    cache = cache if cache is not None else search_page_cache
+    entry = cache.get(url)
+    with metrics.timed('search_page'):
+        try:
+            response = await fetch_with_retry(
+                session, url, limiter, timeout,
+                headers=cache.headers_for(url), policy=policy
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            if not entry:
+                raise
+            print(f"搜尋頁請求失敗（{e!r}），沿用上次的新聞連結")
+            return entry['parsed']
+
+        if response.status == 304 and entry:
+            conditional_stats.record_hit(entry['size'])
+            print("搜尋頁未變更 (304)，沿用上次的新聞連結")
+            return entry['parsed']
+
+        if response.status in RETRY_STATUSES and entry:
+            print(f"搜尋頁請求失敗，狀態碼: {response.status}，沿用上次的新聞連結")
+            return entry['parsed']
+
+        if response.status != 200:
+            print(f"請求失敗，狀態碼: {response.status}")
+            return None
+
+        conditional_stats.record_miss(len(response.body))
+        story_urls = extract_story_urls(response.body, url)
+        cache.put(url, response.headers, len(response.body), story_urls)
+        return story_urls
+
+# 單次走訪時要記錄的元素：(標籤, class) -> 欄位，每個欄位只取文件中第一個符合的元素
+STORY_FIELDS = {
+    'time': {'article-content__time': 'time'},
+    'div': {
+        'story_bady_info_author': 'time_legacy',
+        'story_content': 'content_legacy',
+        'article-head__figure': 'figure',
+    },
+    'span': {
+        'article-content__author': 'reporter',
+        'story_bady_info_author': 'reporter_legacy',
+    },
+    'section': {'article-content__editor': 'content'},
+}
+
+def parse_story(html, story_url):
+    """
+    解析單一新聞頁面為 records.Article，內容不完整時回傳 None
+    以 lxml 單次走訪整份文件找出所有欄位的元素，再只走訪內文區塊取段落與圖片
+    publish_time / reporter 為頁面上的原始文字，published_at（台北時間的 ISO 8601，無法辨識時為 None）
+    與 reporter_name（記者姓名）見 article_fields
+    """
+    root = _parse_html(html)
+    if root is None:
+        metrics.inc('crawler_articles_dropped_total', reason='unparsable')
+        return None
+
+    found = {}
+    for element in root.iter(etree.Element):
+        tag = element.tag
+        if tag == 'h1':
+            found.setdefault('title', element)
+            continue
+        fields = STORY_FIELDS.get(tag)
+        if fields:
+            for class_name in (element.get('class') or '').split():
+                field = fields.get(class_name)
+                if field and field not in found:
+                    found[field] = element
+
+    # 提取新聞資訊
+    title_tag = found.get('title')
+    title = _get_text(title_tag) if title_tag is not None else '標題不明'
+
+    time_tag = found.get('time', found.get('time_legacy'))
+    publish_time = _get_text(time_tag) if time_tag is not None else '時間不明'
+
+    reporter_tag = found.get('reporter', found.get('reporter_legacy'))
+    reporter = _get_text(reporter_tag) if reporter_tag is not None else '記者不明'
+
+    content_tag = found.get('content', found.get('content_legacy'))
+    if content_tag is not None:
+        paragraphs = (_get_text(p) for p in content_tag.iter('p'))
+        content = '\n'.join(text for text in paragraphs if text)
+    else:
+        content = '內容不明'
+
+    # 只有當有實際內容時才添加到結果中
+    if title == '標題不明' or content == '內容不明':
+        reason = 'missing_title' if title == '標題不明' else 'missing_content'
+        metrics.inc('crawler_articles_dropped_total', reason=reason)
+        return None
+
+    with metrics.timed('images'):
+        images = extract_images_from_tree(content_tag, found.get('figure'), story_url)
+
+    return Article(
+        title=title,
+        publish_time=publish_time,
+        published_at=format_timestamp(parse_publish_time(publish_time)),
+        reporter=reporter,
+        reporter_name=clean_reporter(reporter),
+        content=content,
+        url=story_url,
+        images=tuple(images)
+    )
+
+def parse_story_soup(html, story_url):
+    """以 BeautifulSoup (html.parser) 解析的舊版實作，保留作為 parse_story 的比對基準"""
+    story_soup = BeautifulSoup(html, 'html.parser')
+
+    # 提取新聞資訊
+    title_tag = story_soup.select_one('h1.article-head__title, h1.story_art_title, h1')
+    title = title_tag.get_text(strip=True) if title_tag else '標題不明'
+
+    time_tag = story_soup.find('time', class_='article-content__time')
+    if not time_tag:
+        time_tag = story_soup.find('div', class_='story_bady_info_author')
+    publish_time = time_tag.get_text(strip=True) if time_tag else '時間不明'
+
+    reporter_tag = story_soup.find('span', class_='article-content__author')
+    if not reporter_tag:
+        reporter_tag = story_soup.find('span', class_='story_bady_info_author')
+    reporter = reporter_tag.get_text(strip=True) if reporter_tag else '記者不明'
+
+    content_tag = story_soup.find('section', class_='article-content__editor')
+    if not content_tag:
+        content_tag = story_soup.find('div', class_='story_content')
+
+    if content_tag:
+        paragraphs = content_tag.find_all('p')
+        content = '\n'.join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
+    else:
+        content = '內容不明'
+
+    # 抓取圖片
+    images = extract_images(story_soup, story_url)
+
+    # 只有當有實際內容時才添加到結果中
+    if title == '標題不明' or content == '內容不明':
+        return None
+
+    return Article(
+        title=title,
+        publish_time=publish_time,
+        published_at=format_timestamp(parse_publish_time(publish_time)),
+        reporter=reporter,
+        reporter_name=clean_reporter(reporter),
+        content=content,
+        url=story_url,
+        images=images
+    )
+
+async def fetch_story(session, story_url, limiter, store, timeout=REQUEST_TIMEOUT,
+                      revalidate_after=REVALIDATE_AFTER, prober=None, parser=None, policy=None):
+    """
+    爬取並解析單一新聞，失敗時回傳 None
+    已儲存且在 revalidate_after 秒內驗證過的新聞直接從本地儲存讀取；較舊的新聞以條件請求重新驗證
+    prober 為 ImageProber 時，新下載的新聞會先探測圖片資訊再儲存
+    parser 為 ParsePool 時在子程序中解析頁面，否則在目前的執行緒解析
+    主機異常（重試用盡、斷路中或 429/5xx）時若本地已有這則新聞，回傳儲存的版本（source 為 'stale'）
+    回傳 (news_item, source)，source 為 'store'、'revalidated'、'fetched'、'stale' 或 'failed'
+    """
+    with metrics.timed('story'):
+        try:
+            with metrics.timed('store'):
+                record = store.get(story_url)
+            if record and time.time() - record['checked_at'] < revalidate_after:
+                return store.to_news_item(record, story_url), 'store'
 
-        # 爬取每個新聞的內容
-        for index, story_url in enumerate(story_urls, 1):
             try:
-                print(f"正在爬取第 {index}/{len(story_urls)} 個新聞...")
-                
-                # 使用會話進行請求，增加重試機制
-                for attempt in range(3):
-                    try:
-                        story_response = session.get(story_url, timeout=15)
-                        story_response.encoding = 'utf-8'
-                        break
-                    except (requests.RequestException, OSError) as e:
-                        if attempt == 2:
-                            raise
-                        print(f"請求重試 {attempt + 1}/3: {e}")
-                        time.sleep(2)
-                
-                if story_response.status_code == 200:
-                    story_soup = BeautifulSoup(story_response.text, 'html.parser')
-                    
-                    # 提取新聞資訊
-                    title_tag = story_soup.select_one('h1.article-head__title, h1.story_art_title, h1')
-                    title = title_tag.get_text(strip=True) if title_tag else '標題不明'
-                    
-                    time_tag = story_soup.find('time', class_='article-content__time')
-                    if not time_tag:
-                        time_tag = story_soup.find('div', class_='story_bady_info_author')
-                    publish_time = time_tag.get_text(strip=True) if time_tag else '時間不明'
-                    
-                    reporter_tag = story_soup.find('span', class_='article-content__author')
-                    if not reporter_tag:
-                        reporter_tag = story_soup.find('span', class_='story_bady_info_author')
-                    reporter = reporter_tag.get_text(strip=True) if reporter_tag else '記者不明'
-                    
-                    content_tag = story_soup.find('section', class_='article-content__editor')
-                    if not content_tag:
-                        content_tag = story_soup.find('div', class_='story_content')
-                    
-                    if content_tag:
-                        paragraphs = content_tag.find_all('p')
-                        content = '\n'.join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
-                    else:
-                        content = '內容不明'
-                    
-                    # 抓取圖片
-                    images = extract_images(story_soup, story_url)
-                    
-                    # 只有當有實際內容時才添加到結果中
-                    if title != '標題不明' and content != '內容不明':
-                        news_item = {
-                            'title': title,
-                            'publish_time': publish_time,
-                            'reporter': reporter,
-                            'content': content,
-                            'url': story_url,
-                            'images': images  # 新增圖片字段
-                        }
-                        news_data.append(news_item)
-                        print(f"成功爬取: {title[:50]}... (圖片: {len(images)}張)")
+                story_response = await fetch_with_retry(
+                    session, story_url, limiter, timeout,
+                    headers=store.conditional_headers(record), policy=policy
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                if not record:
+                    raise
+                print(f"請求失敗（{e!r}），使用已儲存的版本")
+                return store.to_news_item(record, story_url), 'stale'
+
+            if story_response.status == 304 and record:
+                conditional_stats.record_hit(record['size'])
+                with metrics.timed('store'):
+                    store.touch(story_url)
+                return store.to_news_item(record, story_url), 'revalidated'
+
+            if story_response.status in RETRY_STATUSES and record:
+                print(f"爬取失敗，狀態碼: {story_response.status}，使用已儲存的版本")
+                return store.to_news_item(record, story_url), 'stale'
+
+            if story_response.status != 200:
+                print(f"爬取失敗，狀態碼: {story_response.status}")
+                return None, 'failed'
+
+            conditional_stats.record_miss(len(story_response.body))
+            with metrics.timed('parse'):
+                if parser is not None:
+                    news_item = await parser.parse(story_response.body, story_url)
                 else:
-                    print(f"爬取失敗，狀態碼: {story_response.status_code}")
-                    
-                # 在請求之間添加延遲
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"爬取單個新聞時發生錯誤: {e}")
-                continue
-        
-        print(f"爬取完成，共獲取 {len(news_data)} 條新聞")
-        return news_data
-        
-    except requests.RequestException as e:
-        print(f"網路請求錯誤: {e}")
-        return []
-    except Exception as e:
-        print(f"爬取過程中發生未知錯誤: {e}")
-        return []
-    finally:
-        session.close()
+                    news_item = parse_story(story_response.body, story_url)
+            if news_item and prober is not None:
+                news_item = news_item.with_images(await prober.annotate(news_item.images))
+            with metrics.timed('store'):
+                changed = store.save(
+                    story_url, news_item,
+                    etag=story_response.headers.get('ETag'),
+                    last_modified=story_response.headers.get('Last-Modified'),
+                    size=len(story_response.body)
+                )
+            if news_item and not changed:
+                metrics.inc('crawler_content_unchanged_total')
+                print(f"頁面已更新但內文未變更: {news_item['title'][:50]}...")
+            elif news_item:
+                print(f"成功爬取: {news_item['title'][:50]}... (圖片: {len(news_item['images'])}張)")
+            return news_item, 'fetched'
+
+        except Exception as e:
+            print(f"爬取單個新聞時發生錯誤: {e!r}")
+            return None, 'failed'
+
+async def _crawl(select_urls, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                 timeout=REQUEST_TIMEOUT, deadline=None, store=None,
+                 revalidate_after=REVALIDATE_AFTER, summary=None, probe_images=False,
+                 parse_workers=0, parse_chunk_size=DEFAULT_PARSE_CHUNK_SIZE):
+    """
+    共用的爬取流程：先由 select_urls(fetch_page, store) 決定要爬的新聞URL，再並發爬取
+    每完成一則新聞就產出 (index, news_item, source)，index 為新聞在 select_urls 結果中的位置
+    revalidate_after: 已儲存的新聞超過此秒數才重新驗證（見 fetch_story），float('inf') 表示一律直接讀取
+    probe_images 為 True 時以 Range 請求探測新下載新聞的圖片尺寸與大小（見 image_probe.py）
+    parse_workers 大於 0 時以共用的程序池解析新下載的頁面，每批 parse_chunk_size 則（見 parse_pool.py）
+    summary: metrics.CrawlSummary，記錄本次爬取的計數與各階段耗時
+    """
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline if deadline else None
+
+    def remaining():
+        return None if deadline_at is None else max(0, deadline_at - loop.time())
+
+    limiter = HostRateLimiter.shared(rate)
+    store = store or ArticleStore.default()
+    summary = summary or metrics.CrawlSummary()
+    tasks = []
+    prober = None
+    parser = ParsePool.shared(parse_workers, parse_chunk_size) if parse_workers > 0 else None
+    policy = default_fetch_policy(concurrency)
+
+    async with create_client_session(concurrency) as session:
+        try:
+            print("開始爬取聯合新聞網...")
+
+            async def fetch_page(page_url):
+                with metrics.collect(summary):
+                    return await fetch_search_page(session, page_url, limiter, timeout, policy=policy)
+
+            story_urls = await asyncio.wait_for(select_urls(fetch_page, store), remaining())
+            if not story_urls:
+                return
+
+            print(f"以 {concurrency} 個並發、每秒 {rate} 個請求爬取 {len(story_urls)} 個新聞...")
+
+            semaphore = asyncio.Semaphore(concurrency)
+            if probe_images:
+                async def fetch_image(url, headers, max_bytes):
+                    return await fetch_with_retry(session, url, limiter, timeout,
+                                                  headers=headers, max_bytes=max_bytes, policy=policy)
+                prober = ImageProber(fetch_image, store)
+
+            async def worker(index, story_url):
+                async with semaphore:
+                    with metrics.collect(summary):
+                        news_item, source = await fetch_story(session, story_url, limiter, store,
+                                                              timeout, revalidate_after, prober, parser, policy)
+                        metrics.inc('crawler_stories_total', source=source)
+                    return index, news_item, source
+
+            tasks = [asyncio.create_task(worker(i, url)) for i, url in enumerate(story_urls)]
+            for next_done in asyncio.as_completed(tasks, timeout=remaining()):
+                yield await next_done
+
+        except asyncio.TimeoutError:
+            pending = sum(1 for task in tasks if not task.done())
+            if tasks:
+                print(f"已達時間上限，取消 {pending} 個未完成的新聞請求")
+            else:
+                print("已達時間上限，搜尋頁尚未取得")
+        except aiohttp.ClientError as e:
+            print(f"網路請求錯誤: {e!r}")
+        except asyncio.CancelledError:
+            print("爬取已被取消")
+            raise
+        except Exception as e:
+            print(f"爬取過程中發生未知錯誤: {e!r}")
+        finally:
+            # 逾時、被取消或呼叫端提前停止時，確保所有子任務都被取消並回收
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if prober is not None:
+                await prober.close()
+            with metrics.collect(summary):
+                metrics.inc('crawler_crawls_total')
+            summary.finish()
+
+def incremental_state_key(base_url, limit):
+    """增量爬取的狀態依搜尋網址與結果數分開記錄，不同 limit 的呼叫端不會互相覆寫高水位"""
+    return f'{base_url}#limit={limit}'
+
+async def select_incremental(frontier, store, limit):
+    """
+    增量選取：只載入比上次高水位更新的新聞，遇到已知新聞即停止，
+    再與上次的結果合併（由新到舊取前 limit 則）並更新高水位
+    第一次執行（沒有記錄）時等同完整選取；合併後不足 limit 則時再從搜尋結果補足，
+    上次已確認搜尋結果用盡時不再補足，省下載入搜尋頁的請求
+    """
+    key = incremental_state_key(frontier.base_url, limit)
+    state = store.get_crawl_state(key)
+    if state is None:
+        story_urls = await frontier.window(limit)
+        new_count = len(story_urls)
+        exhausted = frontier.exhausted and not frontier.failed
+    else:
+        new_urls = await frontier.newer_than(state['high_water'], limit)
+        merged = dict.fromkeys(new_urls + state['urls'])
+        exhausted = state['exhausted']
+        if len(merged) < limit and not exhausted:
+            # 上次的結果較少（例如搜尋頁載入失敗）時，從搜尋結果補足到 limit 則
+            merged.update(dict.fromkeys(await frontier.window(limit)))
+            exhausted = frontier.exhausted and not frontier.failed
+        story_urls = sorted(merged, key=story_id, reverse=True)[:limit]
+        new_count = len(new_urls)
+
+    if story_urls:
+        high_water = max(story_id(story_urls[0]), state['high_water'] if state else 0)
+        store.save_crawl_state(key, high_water, story_urls, exhausted=exhausted and len(story_urls) < limit)
+    print(f"增量爬取：載入 {frontier.pages_loaded} 頁搜尋結果，新增 {new_count} 則新聞")
+    return story_urls
+
+async def crawl_stories(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                        timeout=REQUEST_TIMEOUT, deadline=None, base_url=BASE_URL,
+                        store=None, limit=MAX_STORIES, offset=0, cursor=None,
+                        max_pages=MAX_SEARCH_PAGES, incremental=False, summary=None,
+                        probe_images=False, parse_workers=0, parse_chunk_size=DEFAULT_PARSE_CHUNK_SIZE,
+                        selected=None):
+    """
+    非同步爬蟲引擎核心：每完成一則新聞就產出 (index, news_item, source)
+    index 為新聞在搜尋結果中的順序，news_item 為 None 表示該則失敗或內容不完整
+    concurrency: 同時爬取的新聞數
+    rate: 每個主機每秒最多發送的請求數
+    timeout: 單一請求的逾時秒數
+    deadline: 整次爬取的時間上限（秒），到期時停止並取消其餘請求
+    base_url: 搜尋結果頁網址
+    store: 新聞儲存（ArticleStore），預設使用 ArticleStore.default()
+    limit / offset: 取搜尋結果（由新到舊）中的第 offset 則起共 limit 則
+    cursor: 上一段最後一則新聞的游標，有值時忽略 offset，從游標之後開始取
+    max_pages: 最多載入的搜尋結果頁數；只會載入取得該區段所需的頁數
+    incremental: 增量模式，只載入比上次更新的搜尋結果並與上次結果合併（僅適用於 offset=0 且沒有 cursor）；
+                 已儲存的新聞仍依 REVALIDATE_AFTER 重新驗證
+    summary: metrics.CrawlSummary，記錄本次爬取的計數與各階段耗時
+    probe_images: 探測新下載新聞的圖片，為每張圖片加上 width/height/bytes/mime 並移除追蹤像素與縮圖
+    parse_workers / parse_chunk_size: 解析頁面的子程序數（0 表示在事件迴圈中解析）與每批送出的頁面數
+    selected: list，有值時附加本次選取的新聞URL（依 index 順序）
+    """
+    incremental = incremental and offset == 0 and cursor is None
+
+    async def select_urls(fetch_page, store):
+        frontier = SearchFrontier(base_url, fetch_page, max_pages=max_pages)
+        if incremental:
+            story_urls = await select_incremental(frontier, store, limit)
+        else:
+            story_urls = await frontier.window(limit, offset=offset, cursor=cursor)
+            print(f"載入 {frontier.pages_loaded} 頁搜尋結果，找到 {len(frontier.urls)} 個新聞連結，"
+                  f"本次取 {len(story_urls)} 個")
+        if selected is not None:
+            selected.extend(story_urls)
+        return story_urls
+
+    async with contextlib.aclosing(_crawl(select_urls, concurrency=concurrency, rate=rate,
+                                          timeout=timeout, deadline=deadline, store=store,
+                                          summary=summary, probe_images=probe_images,
+                                          parse_workers=parse_workers,
+                                          parse_chunk_size=parse_chunk_size)) as results:
+        async for result in results:
+            yield result
+
+async def scrape_news_async(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                            timeout=REQUEST_TIMEOUT, deadline=None, base_url=BASE_URL,
+                            store=None, limit=MAX_STORIES, offset=0, cursor=None,
+                            max_pages=MAX_SEARCH_PAGES, incremental=False, with_summary=False,
+                            probe_images=False, parse_workers=0,
+                            parse_chunk_size=DEFAULT_PARSE_CHUNK_SIZE, dedupe=True, progress=None):
+    """
+    非同步爬蟲引擎，回傳依搜尋結果順序排列的新聞列表，參數同 crawl_stories
+    deadline 到期時回傳已完成的新聞
+    dedupe 為 True 時合併內容近似的新聞（見 dedupe.py）：每群只保留最前面的一則，其他成員的URL列在 alternate_urls，
+    之前爬取過、已儲存的相同新聞也列在 alternate_urls；合併後不足 limit 則時從搜尋結果中接著選取，直到湊滿 limit 則不重複的新聞或搜尋結果用盡
+    with_summary 為 True 時回傳 (新聞列表, 爬取摘要)，摘要格式見 metrics.CrawlSummary.as_dict
+    progress: 每完成一則新聞就依完成順序以該則新聞呼叫（dedupe 時略過與已回報的新聞近似者）
+    """
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline if deadline else None
+    store = store or ArticleStore.default()
+    summary = metrics.CrawlSummary()
+    results = []
+    selected = []
+    reported = DuplicateIndex() if progress and dedupe else None
+
+    async def crawl_window(limit, **window):
+        """爬取一段搜尋結果，index 接在之前選取的新聞之後；回傳這段選取的新聞數"""
+        start = len(selected)
+        remaining = None if deadline_at is None else deadline_at - loop.time()
+        async for index, news_item, source in crawl_stories(
+                concurrency=concurrency, rate=rate, timeout=timeout, deadline=remaining,
+                base_url=base_url, store=store, limit=limit, max_pages=max_pages, summary=summary,
+                probe_images=probe_images, parse_workers=parse_workers,
+                parse_chunk_size=parse_chunk_size, selected=selected, **window):
+            results.append((start + index, news_item, source))
+            if progress and news_item and (
+                    reported is None or reported.add(news_item['url'], news_item['content']) == news_item['url']):
+                progress(news_item)
+        return len(selected) - start
+
+    exhausted = await crawl_window(limit, offset=offset, cursor=cursor, incremental=incremental) < limit
+    topped_up = 0
+    while True:
+        # 依發現順序排列已完成的結果
+        results.sort(key=lambda result: result[0])
+        news_data = [news_item for _, news_item, _ in results if news_item]
+        if not dedupe:
+            break
+        with metrics.collect(summary), metrics.timed('dedupe'):
+            unique = collapse(news_data, store=store)
+        # 合併掉的重複新聞佔用了名額，從目前選取範圍之後補足（失敗的新聞不補）
+        shortfall = min(limit - len(unique), len(news_data) - len(unique) - topped_up)
+        if shortfall <= 0 or exhausted or (deadline_at is not None and loop.time() >= deadline_at):
+            break
+        print(f"合併 {len(news_data) - len(unique)} 則重複的新聞，再選取 {shortfall} 則")
+        window = {'cursor': encode_cursor(selected[-1])} if cursor is not None else {'offset': offset + len(selected)}
+        exhausted = await crawl_window(shortfall, **window) < shortfall
+        topped_up += shortfall
+
+    if dedupe:
+        if len(unique) < len(news_data):
+            with metrics.collect(summary):
+                metrics.inc('crawler_duplicates_total', len(news_data) - len(unique))
+        news_data = unique
+    sources = [source for _, _, source in results]
+    print(f"爬取完成，共獲取 {len(news_data)} 條新聞 "
+          f"(本地儲存: {sources.count('store')}, 重新驗證: {sources.count('revalidated')}, "
+          f"新下載: {sources.count('fetched')}, 沿用舊版: {sources.count('stale')}, 失敗: {sources.count('failed')})")
+    if with_summary:
+        summary.elapsed = None  # _crawl 每段結束時都會結算摘要，改為整次爬取的耗時
+        return news_data, summary.finish().as_dict()
+    return news_data
+
+def scrape_news(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                timeout=REQUEST_TIMEOUT, deadline=None, base_url=BASE_URL, store=None,
+                limit=MAX_STORIES, offset=0, cursor=None, max_pages=MAX_SEARCH_PAGES,
+                incremental=False, with_summary=False, probe_images=False, parse_workers=0,
+                parse_chunk_size=DEFAULT_PARSE_CHUNK_SIZE, dedupe=True, progress=None):
+    """改進的爬蟲函數，增加更好的錯誤處理和圖片抓取（scrape_news_async 的同步包裝）"""
+    return asyncio.run(scrape_news_async(
+        concurrency=concurrency, rate=rate, timeout=timeout,
+        deadline=deadline, base_url=base_url, store=store,
+        limit=limit, offset=offset, cursor=cursor, max_pages=max_pages,
+        incremental=incremental, with_summary=with_summary, probe_images=probe_images,
+        parse_workers=parse_workers, parse_chunk_size=parse_chunk_size, dedupe=dedupe,
+        progress=progress
+    ))
+
+async def crawl_job_async(job, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                          timeout=REQUEST_TIMEOUT, deadline=None, store=None, incremental=False,
+                          probe_images=False, parse_workers=0, parse_chunk_size=DEFAULT_PARSE_CHUNK_SIZE,
+                          dedupe=True):
+    """
+    執行多主題爬取工作（CrawlJob）
+    各主題的搜尋頁並發載入後合併成一個去重的新聞邊界，每則新聞只爬取一次，
+    回傳 CrawlJob.build_result 的結果：{'topics': {主題key: [新聞...]}, 'article_count': n}，
+    並在 'summary' 附上爬取摘要
+    incremental 為 True 時每個主題各自以增量模式選取新聞
+    dedupe 為 True 時合併所有主題中內容近似的新聞，每個主題的列表中每群只保留一則
+    """
+    store = store or ArticleStore.default()
+    topic_urls = {}
+    merged_urls = []
+
+    async def select_urls(fetch_page, store):
+        async def load_topic(topic):
+            frontier = SearchFrontier(topic.url, fetch_page, max_pages=job.max_pages)
+            if incremental:
+                topic_urls[topic.key] = await select_incremental(frontier, store, job.limit)
+            else:
+                topic_urls[topic.key] = await frontier.window(job.limit)
+
+        await asyncio.gather(*(load_topic(topic) for topic in job.topics()))
+        merged_urls.extend(job.merge_frontiers(topic_urls))
+        total = sum(len(urls) for urls in topic_urls.values())
+        print(f"{len(topic_urls)} 個主題共 {total} 個新聞連結，去重後 {len(merged_urls)} 個")
+        return merged_urls
+
+    articles = {}
+    summary = metrics.CrawlSummary()
+    async with contextlib.aclosing(_crawl(select_urls, concurrency=concurrency, rate=rate,
+                                          timeout=timeout, deadline=deadline, store=store,
+                                          summary=summary, probe_images=probe_images,
+                                          parse_workers=parse_workers,
+                                          parse_chunk_size=parse_chunk_size)) as results:
+        async for index, news_item, _ in results:
+            if news_item:
+                articles[merged_urls[index]] = news_item
+
+    with metrics.collect(summary), metrics.timed('dedupe'):
+        result = job.build_result(topic_urls, articles, dedupe=dedupe, store=store)
+    result['summary'] = summary.finish().as_dict()
+    print(f"爬取工作完成，共 {result['article_count']} 則新聞分配到 {len(result['topics'])} 個主題")
+    return result
+
+def crawl_job(job, **kwargs):
+    """crawl_job_async 的同步包裝"""
+    return asyncio.run(crawl_job_async(job, **kwargs))
+
+async def backfill_async(frontier, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                         timeout=REQUEST_TIMEOUT, store=None, batch_size=BACKFILL_BATCH_SIZE,
+                         max_articles=None, stop=None, probe_images=False, parse_workers=0,
+                         parse_chunk_size=DEFAULT_PARSE_CHUNK_SIZE):
+    """
+    依可續傳的回填邊界（backfill.BackfillFrontier）爬取歷史新聞
+    每批從邊界取出最多 batch_size 則 pending 的新聞，沒有 pending 時先載入下一頁搜尋結果；
+    已儲存的新聞一律直接從本地讀取，不重新驗證，因此續傳時不會重新下載
+    max_articles 限制本次處理的新聞數；stop（threading.Event）被設定時在目前這批完成後停止
+    回傳 (本次處理的新聞數, 爬取摘要)
+    """
+    summary = metrics.CrawlSummary()
+    processed = 0
+    while not (stop and stop.is_set()):
+        limit = batch_size if max_articles is None else min(batch_size, max_articles - processed)
+        if limit <= 0:
+            break
+        batch, news_items = [], []
+
+        async def select_urls(fetch_page, store):
+            while not frontier.pending_count() and await frontier.load_next_page(fetch_page):
+                pass
+            batch.extend(frontier.take(limit))
+            return batch
+
+        try:
+            async with contextlib.aclosing(_crawl(select_urls, concurrency=concurrency, rate=rate,
+                                                  timeout=timeout, store=store,
+                                                  revalidate_after=float('inf'), summary=summary,
+                                                  probe_images=probe_images,
+                                                  parse_workers=parse_workers,
+                                                  parse_chunk_size=parse_chunk_size)) as results:
+                async for index, news_item, source in results:
+                    frontier.finish(batch[index], news_item, source)
+                    news_items.append(news_item)
+                    processed += 1
+        finally:
+            frontier.release(batch)
+        if not batch:
+            # 寫入失敗次數後，未達重試上限的新聞會回到 pending
+            frontier.checkpoint()
+            if not frontier.pending_count():
+                break
+            continue
+        frontier.end_batch(news_items)
+    frontier.checkpoint()
+    summary.elapsed = None  # _crawl 每批結束時都會結算摘要，改為整次回填的耗時
+    return processed, summary.finish().as_dict()
 
 def extract_images(soup, story_url):
     """從新聞頁面提取圖片URL"""
@@ -147,13 +891,7 @@ def extract_images(soup, story_url):
             img_url = img.get('src') or img.get('data-src') or img.get('data-original')
             
             if img_url:
-                # 處理相對URL
-                if img_url.startswith('//'):
-                    img_url = 'https:' + img_url
-                elif img_url.startswith('/'):
-                    img_url = urljoin('https://udn.com', img_url)
-                elif not img_url.startswith('http'):
-                    img_url = urljoin(story_url, img_url)
+                img_url = normalize_image_url(img_url, story_url)
                 
                 # 過濾掉小圖片和廣告圖片
                 if is_valid_news_image(img_url, img):
@@ -187,8 +925,48 @@ def extract_images(soup, story_url):
     
     return images
 
-def is_valid_news_image(img_url, img_tag):
-    """判斷是否為有效的新聞圖片"""
+def normalize_image_url(img_url, story_url):
+    """處理相對URL"""
+    if img_url.startswith('//'):
+        return 'https:' + img_url
+    if img_url.startswith('/'):
+        return urljoin('https://udn.com', img_url)
+    if not img_url.startswith('http'):
+        return urljoin(story_url, img_url)
+    return img_url
+
+def extract_images_from_tree(content_section, figure, story_url):
+    """extract_images 的 lxml 版本，直接使用 parse_story 已找到的內文與主圖區塊，回傳 Image 列表"""
+    images = []
+
+    if content_section is not None:
+        for img in content_section.iter('img'):
+            img_url = img.get('src') or img.get('data-src') or img.get('data-original')
+            if img_url:
+                img_url = normalize_image_url(img_url, story_url)
+                # 過濾掉小圖片和廣告圖片
+                if is_valid_news_image(img_url, img):
+                    images.append(Image.create(img_url, img.get('alt', ''), img.get('title', '')))
+
+    # 也檢查文章頭部的主圖
+    if figure is not None:
+        img_tag = next(figure.iter('img'), None)
+        if img_tag is not None:
+            img_url = img_tag.get('src') or img_tag.get('data-src')
+            if img_url and is_valid_news_image(img_url, img_tag):
+                if img_url.startswith('//'):
+                    img_url = 'https:' + img_url
+                elif img_url.startswith('/'):
+                    img_url = urljoin('https://udn.com', img_url)
+
+                # 將主圖插入到列表開頭
+                images.insert(0, Image.create(img_url, img_tag.get('alt', ''), img_tag.get('title', ''),
+                                              is_main=True))
+
+    return images
+
+def is_valid_news_image(img_url, img_tag, rules=DEFAULT_IMAGE_RULES):
+    """判斷是否為有效的新聞圖片（URL 規則見 image_filter.py）"""
     # 排除小尺寸圖片
     width = img_tag.get('width')
     height = img_tag.get('height')
@@ -198,27 +976,11 @@ def is_valid_news_image(img_url, img_tag):
             w, h = int(width), int(height)
             if w < 100 or h < 100:  # 排除太小的圖片
                 return False
-        except:
+        except ValueError:
             pass
     
-    # 排除廣告和社交媒體圖片
-    exclude_keywords = [
-        'ad', 'ads', 'advertisement', 'banner', 'logo', 
-        'facebook', 'twitter', 'line', 'weibo',
-        'pixel', 'tracking', 'beacon'
-    ]
-    
-    img_url_lower = img_url.lower()
-    for keyword in exclude_keywords:
-        if keyword in img_url_lower:
-            return False
-    
-    # 檢查圖片格式
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif']
-    if not any(ext in img_url_lower for ext in valid_extensions):
-        return False
-    
-    return True
+    # 排除廣告和社交媒體圖片，並檢查圖片格式
+    return rules.is_valid(img_url)
 
 if __name__ == "__main__":
     # 測試爬蟲功能
@@ -0,0 +1,197 @@
+"""
+新聞內容指紋與近似重複分群
+聯合新聞網常把同一則通訊社稿件以不同的新聞URL刊在多個分類，只以URL去重時會重複出現
+- content_hash：正規化內文（移除空白與標點）後的 SHA-1，內容完全相同時一致，用於判斷重新下載的頁面是否真的改變
+- minhash：以 search_index.tokenize 的二字詞組成相鄰兩詞的 shingle，計算 NUM_PERM 個 MinHash 值
+- DuplicateIndex：MinHash 分成 BANDS 段做 LSH，每則新聞只查 BANDS 個桶，候選再以估計的 Jaccard 相似度確認；
+  內文少於 MIN_SHINGLES 個 shingle（只有標題的影音頁、圖說）時不分群，避免無關的新聞因內文都是空的而合併
+- annotate_clusters / representatives：同一群的新聞互相附上 alternate_urls，列表中每群只保留第一則；
+  傳入 store 時再以 ArticleStore 保存的簽章（見 band_keys）找出之前爬取過的相同新聞，一併列入 alternate_urls
+"""
+
+import hashlib
+import random
+import re
+import struct
+
+from search_index import tokenize
+
+NUM_PERM = 64            # MinHash 值的數量
+BANDS = 16               # LSH 分段數（每段 NUM_PERM // BANDS 個值）
+SIMILARITY_THRESHOLD = 0.7  # 估計的 Jaccard 相似度達此值視為同一則新聞
+MIN_SHINGLES = 8         # 內文的 shingle 少於此數時不參與分群
+
+# 以固定種子產生的遮罩模擬 NUM_PERM 個排列（雜湊值 XOR 遮罩後取最小值），跨程序與重新啟動結果一致
+_PERMUTATIONS = [random.Random(seed).getrandbits(64) for seed in range(NUM_PERM)]
+_NOISE_RE = re.compile(r'[\W_]+')
+
+
+def normalize_content(text):
+    """移除空白與標點，只比較文字本身"""
+    return _NOISE_RE.sub('', (text or '').lower())
+
+
+def content_hash(text):
+    """正規化內文的 SHA-1（十六進位）"""
+    return hashlib.sha1(normalize_content(text).encode('utf-8')).hexdigest()
+
+
+def shingles(text):
+    """相鄰兩個詞組成的 shingle 集合（中文約等於三字片段）"""
+    tokens = tokenize(text)
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f'{a} {b}' for a, b in zip(tokens, tokens[1:])}
+
+
+def _hash64(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _signature(shingle_set):
+    hashes = [_hash64(shingle) for shingle in shingle_set]
+    if not hashes:
+        return None
+    return tuple(min(map(mask.__xor__, hashes)) for mask in _PERMUTATIONS)
+
+
+def minhash(text):
+    """內文的 MinHash 簽章（NUM_PERM 個整數的 tuple），沒有內容時回傳 None"""
+    return _signature(shingles(text))
+
+
+def fingerprint(text, min_shingles=MIN_SHINGLES):
+    """可比對的內文回傳 MinHash 簽章；內文太短（少於 min_shingles 個 shingle）時回傳 None"""
+    shingle_set = shingles(text)
+    return _signature(shingle_set) if len(shingle_set) >= min_shingles else None
+
+
+def pack_signature(signature):
+    """簽章轉為位元組（存入 SQLite）"""
+    return struct.pack(f'>{NUM_PERM}Q', *signature)
+
+
+def unpack_signature(data):
+    return struct.unpack(f'>{NUM_PERM}Q', data)
+
+
+def band_keys(signature, bands=BANDS):
+    """LSH 各段的 (段, 段雜湊) 列表，段雜湊為 64 位元有號整數（SQLite INTEGER）"""
+    width = NUM_PERM // bands * 8
+    packed = pack_signature(signature)
+    return [
+        (band, int.from_bytes(hashlib.blake2b(packed[band * width:(band + 1) * width], digest_size=8).digest(),
+                              'big', signed=True))
+        for band in range(bands)
+    ]
+
+
+def similarity(a, b):
+    """由兩個簽章估計 Jaccard 相似度"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+class DuplicateIndex:
+    """
+    近似重複新聞的 LSH 索引
+    add(key, text) 回傳新聞所屬群的代表 key（第一則加入的新聞）；內容完全相同時直接以 content_hash 比對
+    內文太短（少於 MIN_SHINGLES 個 shingle）的新聞自成一群，不加入索引也不與其他新聞比對
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, bands=BANDS, min_shingles=MIN_SHINGLES):
+        self.threshold = threshold
+        self.min_shingles = min_shingles
+        self.bands = bands
+        self._rows = NUM_PERM // bands
+        self._exact = {}       # content_hash -> 代表 key
+        self._buckets = {}     # (段, 段內的值) -> [代表 key, ...]
+        self._signatures = {}  # 代表 key -> 簽章
+        self.clusters = {}     # 代表 key -> [key, ...]
+
+    def _bands(self, signature):
+        rows = self._rows
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def _comparable(self, text):
+        """內文足夠比對時回傳 shingle 集合，否則回傳 None"""
+        shingle_set = shingles(text)
+        return shingle_set if len(shingle_set) >= self.min_shingles else None
+
+    def find(self, text):
+        """回傳與 text 重複的代表 key，沒有時回傳 None（不加入索引）"""
+        shingle_set = self._comparable(text)
+        if shingle_set is None:
+            return None
+        representative = self._exact.get(content_hash(text))
+        if representative is not None:
+            return representative
+        return self._match(_signature(shingle_set))
+
+    def _match(self, signature):
+        seen = set()
+        for bucket in self._bands(signature):
+            for candidate in self._buckets.get(bucket, ()):
+                if candidate not in seen:
+                    seen.add(candidate)
+                    if similarity(signature, self._signatures[candidate]) >= self.threshold:
+                        return candidate
+        return None
+
+    def add(self, key, text):
+        shingle_set = self._comparable(text)
+        if shingle_set is None:
+            self.clusters[key] = [key]
+            return key
+        digest = content_hash(text)
+        representative = self._exact.get(digest)
+        signature = None
+        if representative is None:
+            signature = _signature(shingle_set)
+            representative = self._match(signature)
+        if representative is None:
+            representative = key
+            self._signatures[key] = signature
+            for bucket in self._bands(signature):
+                self._buckets.setdefault(bucket, []).append(key)
+            self.clusters[key] = []
+        self._exact.setdefault(digest, representative)
+        self.clusters[representative].append(key)
+        return representative
+
+
+def annotate_clusters(news_items, store=None):
+    """
+    依內文分群，同一群的每則新聞以 alternate_urls 列出其他成員的URL（依列表順序）
+    store（ArticleStore）有值時，列表外已儲存的相同新聞（見 ArticleStore.find_duplicates）接在後面
+    沒有重複的新聞不加上 alternate_urls；回傳 DuplicateIndex
+    """
+    index = DuplicateIndex()
+    by_url = {}
+    for news_item in news_items:
+        if news_item['url'] not in by_url:
+            index.add(news_item['url'], news_item['content'])
+            by_url[news_item['url']] = news_item
+    for representative, members in index.clusters.items():
+        stored = store.find_duplicates(by_url[representative]['content'], exclude=by_url) if store else []
+        if len(members) > 1 or stored:
+            for url in members:
+                by_url[url]['alternate_urls'] = [other for other in members if other != url] + stored
+    return index
+
+
+def representatives(news_items):
+    """每群只保留列表中的第一則新聞（依 annotate_clusters 加上的 alternate_urls 判斷）"""
+    kept, seen = [], set()
+    for news_item in news_items:
+        if news_item['url'] in seen:
+            continue
+        seen.add(news_item['url'])
+        seen.update(news_item.get('alternate_urls') or ())
+        kept.append(news_item)
+    return kept
+
+
+def collapse(news_items, store=None):
+    """合併近似重複的新聞：每群保留第一則，並附上其他成員的URL（store 見 annotate_clusters）"""
+    annotate_clusters(news_items, store)
+    return representatives(news_items)
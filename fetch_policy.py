@@ -0,0 +1,240 @@
+"""
+請求的重試、退避、斷路器與自適應並發
+- RetryPolicy：網路錯誤、逾時與 429/5xx 回應時重試，等待時間為指數退避加上隨機抖動（full jitter），
+  伺服器回應 Retry-After 時至少等待該秒數（超過上限則不再重試）
+- CircuitBreaker：同一主機連續失敗達門檻後進入 open 狀態，期間的請求立即失敗（CircuitOpenError），
+  不再等待逾時；冷卻時間過後放行一個試探請求（half-open），成功即恢復，失敗則加倍冷卻時間
+- AdaptiveConcurrency：以 AIMD 調整同時進行的請求數，請求失敗或延遲明顯上升時減半，
+  持續成功時每輪增加一個，最多為設定的並發數
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+MAX_RETRY_DELAY = 30.0     # 指數退避的上限（秒）
+MAX_RETRY_AFTER = 60.0     # 願意依 Retry-After 等待的上限（秒）
+
+FAILURE_THRESHOLD = 5      # 連續失敗幾次後斷路
+RESET_TIMEOUT = 30.0       # 斷路後多久放行試探請求（秒）
+MAX_RESET_TIMEOUT = 300.0  # 試探連續失敗時冷卻時間加倍的上限
+
+LATENCY_TOLERANCE = 2.0    # 平滑延遲超過基準的幾倍視為延遲上升
+LATENCY_FLOOR = 0.25       # 平滑延遲低於此秒數時不因延遲而降低並發
+DECREASE_INTERVAL = 1.0    # 兩次降低並發之間至少間隔的秒數，避免同一波失敗連續減半
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(ConnectionError):
+    """主機處於斷路狀態，請求未送出"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"{host} 暫時停止請求（斷路中，{retry_in:.0f} 秒後重試）")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value, now=None):
+    """解析 Retry-After（秒數或 HTTP 日期），回傳需等待的秒數；沒有或格式錯誤時回傳 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+class RetryPolicy:
+    """重試次數、可重試的狀態碼與退避時間"""
+
+    def __init__(self, max_attempts=3, base_delay=2.0, max_delay=MAX_RETRY_DELAY,
+                 max_retry_after=MAX_RETRY_AFTER, retry_statuses=RETRY_STATUSES, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses
+        self._rng = rng or random.Random()
+
+    def should_retry_status(self, status):
+        return status in self.retry_statuses
+
+    def delay(self, attempt, retry_after=None):
+        """
+        第 attempt 次（從 0 開始）失敗後的等待秒數：0 到 base_delay × 2^attempt 之間的隨機值；
+        有 Retry-After 時取兩者較大者，Retry-After 超過 max_retry_after 時回傳 None 表示不重試
+        """
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        backoff = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """單一主機的斷路器，執行緒安全"""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self._cooldown = reset_timeout
+        self._opened_at = None
+        self._probing = False
+
+    def allow(self):
+        """
+        是否可以送出請求；冷卻結束後只放行一個試探請求
+        拒絕時回傳 False，放行時回傳放行當下的狀態：HALF_OPEN 表示這次呼叫取得了試探名額
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return CLOSED
+            if self.state == OPEN and self._clock() - self._opened_at >= self._cooldown:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return HALF_OPEN
+            return False
+
+    def retry_in(self):
+        """距離放行試探請求的秒數"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._cooldown - (self._clock() - self._opened_at))
+
+    def release_probe(self):
+        """試探請求未完成即被取消時釋放名額，讓下一個請求可以再試探；只由取得名額（allow() 回傳 HALF_OPEN）的請求呼叫"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._cooldown = self.reset_timeout
+            self._probing = False
+
+    def record_failure(self):
+        """記錄一次失敗，回傳是否因此進入斷路狀態"""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self._cooldown = min(self.max_reset_timeout, self._cooldown * 2)
+            elif self.state == OPEN or self.failures < self.failure_threshold:
+                return False
+            self.state = OPEN
+            self._opened_at = self._clock()
+            self._probing = False
+            return True
+
+
+class HostCircuitBreakers:
+    """依主機名稱分配獨立的斷路器，跨爬取與執行緒共用"""
+
+    def __init__(self, **breaker_options):
+        self._options = breaker_options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(**self._options)
+            return host, breaker
+
+    def unhealthy(self):
+        """不在 closed 狀態的主機 {主機: {'state', 'failures', 'retry_in'}}"""
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return {
+            host: {'state': breaker.state, 'failures': breaker.failures, 'retry_in': round(breaker.retry_in(), 1)}
+            for host, breaker in breakers if breaker.state != CLOSED
+        }
+
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+class AdaptiveConcurrency:
+    """
+    以 AIMD 限制同時進行的請求數（在單一事件迴圈中使用）
+    以 async with 取得名額，請求完成後呼叫 record(latency, ok)
+    """
+
+    def __init__(self, max_limit, min_limit=1, latency_tolerance=LATENCY_TOLERANCE,
+                 latency_floor=LATENCY_FLOOR, decrease_interval=DECREASE_INTERVAL, clock=time.monotonic):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.latency_floor = latency_floor
+        self.decrease_interval = decrease_interval
+        self.decreases = 0
+        self._clock = clock
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._smoothed = None
+        self._baseline = None
+        self._last_decrease = None
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def record(self, latency, ok):
+        """記錄一個請求的結果；失敗或平滑延遲超過基準的 latency_tolerance 倍時減半，否則緩慢增加"""
+        if ok:
+            self._smoothed = latency if self._smoothed is None else 0.8 * self._smoothed + 0.2 * latency
+            self._baseline = self._smoothed if self._baseline is None else min(self._baseline, self._smoothed)
+            slow = (self._smoothed > self.latency_floor
+                    and self._smoothed > self._baseline * self.latency_tolerance)
+            if not slow:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                return
+        now = self._clock()
+        if self._last_decrease is not None and now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit / 2)
+        self.decreases += 1
+
+
+class FetchPolicy:
+    """
+    單次爬取使用的請求策略
+    retry 為 RetryPolicy；breakers 為 HostCircuitBreakers（應跨爬取共用才能記住主機狀態）；
+    concurrency 為 AdaptiveConcurrency，None 表示不限制
+    """
+
+    def __init__(self, retry=None, breakers=None, concurrency=None):
+        self.retry = retry or RetryPolicy()
+        self.breakers = breakers if breakers is not None else HostCircuitBreakers()
+        self.concurrency = concurrency
@@ -0,0 +1,108 @@
+"""
+搜尋結果的爬取邊界（frontier）
+逐頁延遲載入搜尋結果，維持確定且由新到舊排序的新聞URL列表，
+並依 limit/offset/cursor 取出所需的區段，只載入該區段需要的頁數
+"""
+
+import re
+
+MAX_SEARCH_PAGES = 50  # 最多載入的搜尋結果頁數
+
+STORY_ID_RE = re.compile(r'/news/story/\d+/(\d+)')
+
+
+def story_id(url):
+    """取出新聞URL中的數字ID，ID 越大表示越新；無法辨識時回傳 0"""
+    match = STORY_ID_RE.search(url)
+    return int(match.group(1)) if match else 0
+
+
+def search_page_url(base_url, page):
+    """第 page 頁搜尋結果的網址（第 1 頁即 base_url）"""
+    if page <= 1:
+        return base_url
+    return f"{base_url.rstrip('/')}/{page}"
+
+
+def encode_cursor(url):
+    """以新聞ID作為下一頁的游標，新新聞插入時不會讓後續分頁位移"""
+    return str(story_id(url))
+
+
+def decode_cursor(cursor):
+    """解析游標，格式錯誤時拋出 ValueError"""
+    value = int(cursor)
+    if value <= 0:
+        raise ValueError("cursor 必須為正整數")
+    return value
+
+
+class SearchFrontier:
+    """
+    延遲載入的搜尋結果邊界
+    每頁的連結依新聞ID由新到舊排序後接在已載入的結果之後，
+    因此載入更多頁不會改變前面的順序，同一區段每次取得的新聞都相同
+    """
+
+    def __init__(self, base_url, fetch_page, max_pages=MAX_SEARCH_PAGES):
+        """
+        fetch_page: async 函數，傳入搜尋頁網址，回傳新聞URL列表，失敗時回傳 None
+        """
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self._fetch_page = fetch_page
+        self._seen = set()
+        self.urls = []
+        self.pages_loaded = 0
+        self.exhausted = False
+        self.failed = False  # 因請求失敗而結束（搜尋結果不一定已用盡）
+
+    async def load_next_page(self):
+        """載入下一頁，沒有新連結、請求失敗或超過頁數上限時標記為已結束"""
+        if self.exhausted:
+            return False
+        page = self.pages_loaded + 1
+        if page > self.max_pages:
+            self.exhausted = True
+            return False
+
+        page_urls = await self._fetch_page(search_page_url(self.base_url, page))
+        self.pages_loaded = page
+        self.failed = page_urls is None
+
+        new_urls = [url for url in sorted(page_urls or [], key=story_id, reverse=True)
+                    if url not in self._seen]
+        if not new_urls:
+            self.exhausted = True
+            return False
+
+        self._seen.update(new_urls)
+        self.urls.extend(new_urls)
+        return True
+
+    async def newer_than(self, high_water, limit):
+        """
+        由新到舊載入，回傳ID大於 high_water 的前 limit 則
+        一旦載入的頁面出現已知的新聞（ID 不大於 high_water）就停止，不再載入更舊的頁面
+        """
+        while True:
+            newer = [url for url in self.urls if story_id(url) > high_water]
+            reached_known = len(newer) < len(self.urls)
+            if reached_known or len(newer) >= limit or not await self.load_next_page():
+                return newer[:limit]
+
+    async def window(self, limit, offset=0, cursor=None):
+        """
+        取得一段新聞URL
+        cursor 有值時回傳ID小於游標的前 limit 則，否則回傳 [offset, offset + limit) 區段
+        """
+        if cursor is not None:
+            cursor_id = decode_cursor(cursor)
+            while True:
+                after = [url for url in self.urls if story_id(url) < cursor_id]
+                if len(after) >= limit or not await self.load_next_page():
+                    return after[:limit]
+
+        while len(self.urls) < offset + limit and await self.load_next_page():
+            pass
+        return self.urls[offset:offset + limit]
@@ -0,0 +1,47 @@
+"""
+gunicorn 設定：以多程序（prefork）部署 API
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+所有參數都可用環境變數調整：
+API_BIND（預設 0.0.0.0:5000）、API_WORKERS（預設 CPU 數 × 2 + 1）、API_THREADS（每個 worker 的執行緒數，預設 4）、
+API_TIMEOUT（worker 無回應多久後重啟，預設 60）、API_GRACEFUL_TIMEOUT（關閉時等待進行中請求的秒數，預設 30）、
+API_KEEPALIVE（閒置 keep-alive 連線保留秒數，預設 5）、API_MAX_REQUESTS（worker 處理多少請求後重啟，預設 2000）
+"""
+
+import multiprocessing
+import os
+
+# 多個 API 程序各自爬取會重複消耗聯合新聞網的限速，正式環境預設只讀取 crawl_worker.py 寫入的快照
+os.environ.setdefault('NEWS_SOURCE', 'store')
+
+bind = os.environ.get('API_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('API_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# gthread worker 支援 keep-alive，並讓串流回應與慢速客戶端不會佔住整個程序
+worker_class = 'gthread'
+threads = int(os.environ.get('API_THREADS', 4))
+keepalive = int(os.environ.get('API_KEEPALIVE', 5))
+
+# worker 超過 timeout 秒沒有回報心跳時由 master 重啟；收到 SIGTERM 後最多等待 graceful_timeout 秒讓請求完成
+# 單一請求等待爬取的上限由 NEWS_CACHE_WAIT 控制（store 模式下只讀取資料庫，不會等待爬取）
+timeout = int(os.environ.get('API_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('API_GRACEFUL_TIMEOUT', 30))
+
+# 定期重啟 worker，避免長時間執行累積記憶體；jitter 避免所有 worker 同時重啟
+max_requests = int(os.environ.get('API_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+# 每個 worker 在 fork 之後才匯入 app，不共用 SQLite 連線與背景執行緒
+preload_app = False
+
+accesslog = os.environ.get('API_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('API_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """worker 結束時關閉該程序的資料庫連線"""
+    from article_store import ArticleStore
+    if ArticleStore._default is not None:
+        ArticleStore._default.close()
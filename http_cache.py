@@ -0,0 +1,96 @@
+"""
+HTTP 條件請求快取
+記錄每個URL的 ETag/Last-Modified 與解析結果，下次請求時帶上
+If-None-Match/If-Modified-Since；伺服器回應 304 時直接沿用解析結果，不必再跑 BeautifulSoup
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def conditional_headers(etag=None, last_modified=None):
+    """依驗證資訊產生條件請求標頭"""
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+class ConditionalStats:
+    """條件請求命中統計，用來觀察節省的頻寬"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0              # 伺服器回應 304
+            self.misses = 0            # 完整下載 (200)
+            self.bytes_downloaded = 0  # 完整下載的位元組數
+            self.bytes_saved = 0       # 因 304 省下的位元組數（以上次下載大小估算）
+
+    def record_hit(self, saved_bytes=0):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += saved_bytes or 0
+
+    def record_miss(self, downloaded_bytes):
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += downloaded_bytes
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 1) if total else 0,
+                'bytes_downloaded': self.bytes_downloaded,
+                'bytes_saved': self.bytes_saved
+            }
+
+
+class ValidatorCache:
+    """以URL為鍵、有容量上限的驗證資訊與解析結果快取（LRU）"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url, headers, body_size, parsed):
+        """記錄一次完整下載；回應沒有任何驗證資訊時不快取"""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._entries[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': body_size,
+                'parsed': parsed
+            }
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def headers_for(self, url):
+        entry = self.get(url)
+        if not entry:
+            return {}
+        return conditional_headers(entry['etag'], entry['last_modified'])
+
+    def __len__(self):
+        return len(self._entries)
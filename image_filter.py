@@ -0,0 +1,53 @@
+"""
+新聞圖片URL過濾規則
+把排除的關鍵字、主機與允許的副檔名預先編譯成正規表示式，每個URL只需幾次比對：
+- 關鍵字以完整的URL片段比對（以非英數字元分隔），'ad' 不會誤判 upload、header，'line' 不會誤判 online
+- 主機比對完整的網域或其子網域
+- 副檔名必須出現在路徑片段或查詢參數值的結尾，例如 photo.php?u=.../a.jpg
+"""
+
+import functools
+import re
+
+EXCLUDE_KEYWORDS = (
+    'ad', 'ads', 'advertisement', 'banner', 'logo',
+    'facebook', 'twitter', 'line', 'weibo',
+    'pixel', 'tracking', 'beacon',
+)
+EXCLUDE_HOSTS = (
+    'doubleclick.net', 'googlesyndication.com', 'google-analytics.com',
+    'facebook.com', 'facebook.net', 'scorecardresearch.com',
+)
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp', 'gif')
+
+
+def _alternation(words):
+    # 較長的詞放前面，避免前綴先被比對成功
+    return '|'.join(re.escape(word.lower()) for word in sorted(set(words), key=len, reverse=True))
+
+
+class ImageUrlRules:
+    """
+    編譯後的圖片URL規則，is_valid(url) 回傳URL是否可能是新聞圖片
+    同一個URL（例如每頁都有的分享圖示）的結果會保留在容量 cache_size 的 LRU 中
+    """
+
+    def __init__(self, exclude_keywords=EXCLUDE_KEYWORDS, exclude_hosts=EXCLUDE_HOSTS,
+                 extensions=IMAGE_EXTENSIONS, cache_size=4096):
+        # 以分隔字元開頭的樣式可讓 re 先快速找到候選位置，比逐字元的 lookbehind 快
+        self._keyword_re = re.compile(rf'[^a-z0-9](?:{_alternation(exclude_keywords)})(?![a-z0-9])')
+        self._host_re = re.compile(
+            rf'^(?:[a-z][a-z0-9+.-]*:)?//(?:[^/?#@]*@)?(?:[^/?#:]*\.)?(?:{_alternation(exclude_hosts)})(?=[:/?#]|$)'
+        )
+        self._extension_re = re.compile(rf'\.(?:{_alternation(extensions)})(?=$|[?&#/])')
+        self.is_valid = functools.lru_cache(maxsize=cache_size)(self.check) if cache_size else self.check
+
+    def check(self, url):
+        """不經快取直接比對規則"""
+        url = url.lower()
+        if self._host_re.match(url) or self._keyword_re.search('/' + url):
+            return False
+        return self._extension_re.search(url) is not None
+
+
+DEFAULT_RULES = ImageUrlRules()
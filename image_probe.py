@@ -0,0 +1,172 @@
+"""
+圖片資訊探測
+以 Range 請求只下載圖片開頭幾 KB，從檔頭讀出實際的尺寸與格式，並由 Content-Range 取得檔案大小。
+延遲載入的圖片常沒有 width/height 屬性，探測後才能排除追蹤像素與縮圖；
+結果以圖片URL為鍵存入 ArticleStore，每張圖片只探測一次
+"""
+
+import asyncio
+import re
+import struct
+
+import metrics
+
+PROBE_BYTES = 16 * 1024   # 每張圖片最多下載的位元組數
+MIN_DIMENSION = 100       # 寬或高小於此值視為追蹤像素或縮圖（與 is_valid_news_image 相同）
+PROBE_CONCURRENCY = 8     # 同時探測的圖片數
+
+CONTENT_RANGE_RE = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+# JPEG 的 SOF 標記（C4/C8/CC 不是影格標頭）
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(data):
+    """依序走訪 JPEG 區段找出 SOF，回傳 (寬, 高)；SOF 不在已下載的範圍內時回傳 (None, None)"""
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            break
+        marker = data[i + 1]
+        if marker == 0xFF:  # 填充位元組
+            i += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:  # 沒有長度欄位的標記
+            i += 2
+            continue
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None, None
+
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return width, height
+    return None, None
+
+
+def sniff_image(data):
+    """從檔頭判斷圖片格式與尺寸，回傳 (mime, 寬, 高)；無法辨識時回傳 (None, None, None)"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return 'image/png', width, height
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        width, height = struct.unpack('<HH', data[6:10])
+        return 'image/gif', width, height
+    if data.startswith(b'\xff\xd8'):
+        return ('image/jpeg',) + _jpeg_size(data)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return ('image/webp',) + _webp_size(data)
+    return None, None, None
+
+
+def total_size(status, headers, body, probe_bytes=PROBE_BYTES):
+    """圖片的完整大小：206 取 Content-Range 的總長度，200 取 Content-Length 或已下載完整的本文長度"""
+    if status == 206:
+        match = CONTENT_RANGE_RE.match(headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
+    length = headers.get('Content-Length')
+    if length and length.isdigit():
+        return int(length)
+    return len(body) if len(body) < probe_bytes else None
+
+
+def is_displayable(meta):
+    """探測結果是否為值得顯示的新聞圖片：可辨識的圖片格式，且尺寸不是追蹤像素或縮圖"""
+    if not meta['mime']:
+        return False
+    if meta['width'] is not None and meta['height'] is not None:
+        return meta['width'] >= MIN_DIMENSION and meta['height'] >= MIN_DIMENSION
+    return True
+
+
+class ImageProber:
+    """
+    並發探測圖片資訊
+    fetch: async 函數 fetch(url, headers, max_bytes)，回傳 crawler.FetchResult
+    store: ArticleStore，保存探測結果；同一次爬取中重複出現的圖片只探測一次
+    """
+
+    def __init__(self, fetch, store, concurrency=PROBE_CONCURRENCY, probe_bytes=PROBE_BYTES):
+        self._fetch = fetch
+        self.store = store
+        self.probe_bytes = probe_bytes
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._inflight = {}
+
+    async def probe(self, url):
+        """
+        取得圖片資訊 {'width', 'height', 'bytes', 'mime'}，已探測過的直接讀取儲存的結果
+        網路錯誤或伺服器錯誤時回傳 None，不記錄，下次再試
+        """
+        meta = self.store.get_image_meta(url)
+        if meta is not None:
+            return meta
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.ensure_future(self._probe(url))
+        return await asyncio.shield(task)
+
+    async def _probe(self, url):
+        async with self._semaphore:
+            try:
+                with metrics.timed('image_probe'):
+                    response = await self._fetch(
+                        url, {'Range': f'bytes=0-{self.probe_bytes - 1}'}, self.probe_bytes
+                    )
+            except Exception as e:
+                print(f"探測圖片失敗: {e!r}")
+                return None
+
+        if response.status >= 500 or response.status == 429:
+            return None
+        if response.status in (200, 206):
+            mime, width, height = sniff_image(response.body)
+            meta = {
+                'width': width,
+                'height': height,
+                'bytes': total_size(response.status, response.headers, response.body, self.probe_bytes),
+                'mime': mime,
+            }
+        else:
+            meta = {'width': None, 'height': None, 'bytes': None, 'mime': None}
+
+        self.store.save_image_meta(url, meta)
+        metrics.inc('crawler_images_probed_total', result='image' if meta['mime'] else 'invalid')
+        return meta
+
+    async def close(self):
+        """取消未完成的探測（爬取逾時或提前結束時）"""
+        pending = [task for task in self._inflight.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def annotate(self, images):
+        """
+        並發探測新聞的圖片，為每張圖片加上 width/height/bytes/mime，
+        並移除探測後確認不是圖片或尺寸過小的項目；探測失敗的圖片保留原樣
+        """
+        metas = await asyncio.gather(*(self.probe(image['url']) for image in images))
+        annotated = []
+        for image, meta in zip(images, metas):
+            if meta is None:
+                annotated.append(image)
+            elif is_displayable(meta):
+                annotated.append(dict(image, **meta))
+            else:
+                metrics.inc('crawler_images_dropped_total',
+                            reason='too_small' if meta['mime'] else 'not_image')
+        return annotated
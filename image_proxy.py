@@ -0,0 +1,293 @@
+"""
+圖片代理
+原圖只從來源下載一次，連同縮圖與 WebP 等衍生版本存入有容量上限的磁碟 LRU 快取；
+每個版本以內容雜湊作為強 ETag，可長期快取，重複的請求直接由本地磁碟回應
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from PIL import Image
+
+from image_probe import sniff_image
+
+DEFAULT_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', 'image_cache')
+DEFAULT_CACHE_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_MB', 512)) * 1024 * 1024
+ALLOWED_HOSTS = tuple(
+    host.strip() for host in os.environ.get('IMAGE_PROXY_HOSTS', 'udn.com,udn.com.tw').split(',')
+    if host.strip()
+)
+
+MAX_ORIGINAL_BYTES = 15 * 1024 * 1024  # 來源圖片大小上限
+MAX_DIMENSION = 2048                   # 縮圖寬高上限
+DEFAULT_QUALITY = 80
+FETCH_TIMEOUT = 15
+MAX_REDIRECTS = 3                      # 來源轉址次數上限，每一跳都需通過 check_image_url
+
+FORMATS = {
+    'jpeg': ('image/jpeg', 'JPEG'),
+    'png': ('image/png', 'PNG'),
+    'webp': ('image/webp', 'WEBP'),
+}
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp', 'image/gif': 'gif'}
+MIME_BY_EXTENSION = {ext: mime for mime, ext in EXTENSIONS.items()}
+STALE_TMP_SECONDS = 60  # 超過這個時間的暫存檔視為中斷的寫入（較新的可能是其他程序正在寫入）
+
+# 快取中的一個檔案：path 為磁碟路徑，etag 為內容雜湊（已加引號），mime 為內容類型
+CachedImage = namedtuple('CachedImage', ['path', 'etag', 'mime', 'size'])
+
+
+class ImageFetchError(Exception):
+    """來源圖片下載失敗或不是可辨識的圖片"""
+
+
+class DiskLRUCache:
+    """
+    以磁碟檔案保存的 LRU 快取，總大小超過 max_bytes 時淘汰最久未使用的檔案
+    檔名為 <鍵雜湊>-<內容雜湊>.<副檔名>，重新啟動時依檔案修改時間還原使用順序，
+    並刪除寫入中斷而留下的暫存檔（*.tmp）
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 鍵雜湊 -> CachedImage，由舊到新
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            stem, _, ext = name.partition('.')
+            key_hash, _, content_hash = stem.partition('-')
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp'):
+                try:
+                    if now - os.stat(path).st_mtime > STALE_TMP_SECONDS:
+                        os.remove(path)
+                except OSError:  # 其他程序已改名或刪除
+                    pass
+                continue
+            if not content_hash or ext not in MIME_BY_EXTENSION:
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, key_hash,
+                          CachedImage(path, f'"{content_hash}"', MIME_BY_EXTENSION[ext], stat.st_size)))
+        for _, key_hash, entry in sorted(files, key=lambda item: item[0]):
+            self._entries[key_hash] = entry
+            self.total_bytes += entry.size
+
+    @staticmethod
+    def _key_hash(key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key):
+        """取得快取的檔案並標記為最近使用，沒有時回傳 None"""
+        key_hash = self._key_hash(key)
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return None
+            if not os.path.exists(entry.path):  # 被外部刪除
+                del self._entries[key_hash]
+                self.total_bytes -= entry.size
+                return None
+            self._entries.move_to_end(key_hash)
+        try:
+            os.utime(entry.path)  # 讓重新啟動後也能還原使用順序
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, data, mime):
+        """寫入檔案（先寫暫存檔再改名），必要時淘汰舊檔案，回傳 CachedImage"""
+        key_hash = self._key_hash(key)
+        content_hash = hashlib.sha256(data).hexdigest()[:32]
+        path = os.path.join(self.directory, f'{key_hash}-{content_hash}.{EXTENSIONS[mime]}')
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        entry = CachedImage(path, f'"{content_hash}"', mime, len(data))
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key_hash, None)
+            if old is not None:
+                self.total_bytes -= old.size
+                if old.path != path:
+                    evicted.append(old)
+            self._entries[key_hash] = entry
+            self.total_bytes += entry.size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, oldest = self._entries.popitem(last=False)
+                self.total_bytes -= oldest.size
+                evicted.append(oldest)
+        for old_entry in evicted:
+            try:
+                os.remove(old_entry.path)
+            except OSError:
+                pass
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def parse_variant(args):
+    """
+    解析衍生版本參數 w、h、format、q，格式錯誤時拋出 ValueError
+    回傳 (width, height, fmt, quality)；fmt 為 None 表示原圖
+    """
+    def dimension(name):
+        value = args.get(name)
+        if not value:
+            return None
+        value = int(value)
+        if not 1 <= value <= MAX_DIMENSION:
+            raise ValueError(f"{name} 必須介於 1 到 {MAX_DIMENSION} 之間")
+        return value
+
+    width, height = dimension('w'), dimension('h')
+    fmt = args.get('format') or None
+    if fmt == 'original':
+        fmt = None
+    if fmt is not None and fmt not in FORMATS:
+        raise ValueError(f"format 只支援 {', '.join(FORMATS)} 或 original")
+    quality = int(args.get('q') or DEFAULT_QUALITY)
+    if not 1 <= quality <= 100:
+        raise ValueError("q 必須介於 1 到 100 之間")
+    return width, height, fmt, quality
+
+
+def check_image_url(url):
+    """只代理允許的主機上的 http(s) 圖片，避免成為開放代理"""
+    parts = urlsplit(url or '')
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        raise ValueError("url 必須是 http(s) 網址")
+    if not any(host == allowed or host.endswith('.' + allowed) for allowed in ALLOWED_HOSTS):
+        raise ValueError(f"不允許代理的主機: {host}")
+    return url
+
+
+class ImageProxy:
+    """
+    下載、快取並轉換圖片
+    fetch: 下載函數 fetch(url) -> bytes，預設以 requests 下載；同一個鍵同時只有一個請求在處理
+    """
+
+    def __init__(self, cache=None, fetch=None, request_url=None, headers=None):
+        self.cache = cache if cache is not None else DiskLRUCache()
+        self._fetch = fetch or self._fetch_with_requests
+        self._request_url = request_url or (lambda url: url)
+        self._headers = headers or {}
+        self._session = requests.Session()
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self.origin_fetches = 0
+
+    def _fetch_with_requests(self, url):
+        """自行處理轉址，每一跳的網址都需通過 check_image_url，避免允許的主機把代理轉到其他地方"""
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._session.get(self._request_url(url), headers=self._headers,
+                                         timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False)
+            with response:
+                if response.is_redirect:
+                    try:
+                        url = check_image_url(urljoin(url, response.headers['Location']))
+                    except ValueError as e:
+                        raise ImageFetchError(f"來源轉址到不允許的網址: {e}") from e
+                    continue
+                if response.status_code != 200:
+                    raise ImageFetchError(f"來源回應狀態碼 {response.status_code}")
+                body = response.raw.read(MAX_ORIGINAL_BYTES + 1, decode_content=True)
+            if len(body) > MAX_ORIGINAL_BYTES:
+                raise ImageFetchError("來源圖片過大")
+            return body
+        raise ImageFetchError("來源轉址次數過多")
+
+    def _lock_for(self, key):
+        """取得鍵的鎖並登記使用者數，使用完畢後呼叫 _release_lock"""
+        with self._locks_lock:
+            holder = self._locks.setdefault(key, [threading.Lock(), 0])
+            holder[1] += 1
+            return holder[0]
+
+    def _release_lock(self, key):
+        """最後一個使用者離開時才移除鎖，仍在等待的請求與之後到達的請求共用同一把鎖"""
+        with self._locks_lock:
+            holder = self._locks[key]
+            holder[1] -= 1
+            if not holder[1]:
+                del self._locks[key]
+
+    def _single_flight(self, key, build):
+        """快取未命中時由第一個請求產生內容，其他同時到達的請求等待後直接讀取快取"""
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+        lock = self._lock_for(key)
+        try:
+            with lock:
+                entry = self.cache.get(key)
+                if entry is None:
+                    data, mime = build()
+                    entry = self.cache.put(key, data, mime)
+        finally:
+            self._release_lock(key)
+        return entry
+
+    def original(self, url):
+        """取得原圖（只從來源下載一次）"""
+        def build():
+            try:
+                data = self._fetch(url)
+            except requests.RequestException as e:
+                raise ImageFetchError(f"下載來源圖片失敗: {e}") from e
+            self.origin_fetches += 1
+            mime = sniff_image(data)[0]
+            if mime not in EXTENSIONS:
+                raise ImageFetchError("來源內容不是支援的圖片格式")
+            return data, mime
+
+        return self._single_flight(f'original|{url}', build)
+
+    def get(self, url, width=None, height=None, fmt=None, quality=DEFAULT_QUALITY):
+        """
+        取得原圖或衍生版本，回傳 CachedImage
+        width/height 為縮圖的最大寬高（維持比例、不放大），fmt 為輸出格式
+        """
+        check_image_url(url)
+        if width is None and height is None and fmt is None:
+            return self.original(url)
+
+        key = f'{url}|w={width}|h={height}|fmt={fmt}|q={quality}'
+
+        def build():
+            source = self.original(url)
+            try:
+                with Image.open(source.path) as image:
+                    image.load()
+                    if width or height:
+                        image.thumbnail((width or MAX_DIMENSION, height or MAX_DIMENSION))
+                    out_format = fmt or {'image/png': 'png', 'image/webp': 'webp'}.get(source.mime, 'jpeg')
+                    mime, pil_format = FORMATS[out_format]
+                    if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                        image = image.convert('RGB')
+                    buffer = io.BytesIO()
+                    image.save(buffer, pil_format, quality=quality, optimize=True)
+            except (OSError, Image.DecompressionBombError) as e:  # 含 UnidentifiedImageError 與截斷的檔案
+                raise ImageFetchError(f"無法解碼來源圖片: {e}") from e
+            return buffer.getvalue(), mime
+
+        return self._single_flight(key, build)
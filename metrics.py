@@ -0,0 +1,260 @@
+"""
+爬蟲與 API 的效能指標
+計數器與各階段耗時的直方圖累計在全域的 registry，以 Prometheus 文字格式輸出（/api/metrics）；
+爬取期間同時記錄到當下的 CrawlSummary，作為單次爬取的結構化摘要
+"""
+
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+# 名稱: (類型, 說明)
+METRICS = {
+    'crawler_stage_seconds': ('histogram', '爬取各階段的耗時（秒）'),
+    'crawler_fetches_total': ('counter', '完成的 HTTP 請求數（依狀態碼）'),
+    'crawler_fetch_errors_total': ('counter', '重試用盡後仍失敗的請求數'),
+    'crawler_retries_total': ('counter', '請求重試次數'),
+    'crawler_circuit_rejections_total': ('counter', '主機斷路中而未送出的請求數'),
+    'crawler_content_unchanged_total': ('counter', '重新下載但內文雜湊與上次相同的新聞數'),
+    'crawler_duplicates_total': ('counter', '與其他新聞內容近似而合併的新聞數'),
+    'crawler_bytes_downloaded_total': ('counter', '下載的回應本文位元組數'),
+    'crawler_connections_total': ('counter', '建立或重用的連接數（依種類：new/reused）'),
+    'crawler_stories_total': ('counter', '處理完成的新聞數（依來源：store/revalidated/fetched/stale/failed）'),
+    'crawler_articles_dropped_total': ('counter', '因標題或內文不完整而捨棄的新聞數（依原因）'),
+    'crawler_images_probed_total': ('counter', '探測的圖片數（依結果：image/invalid）'),
+    'crawler_images_dropped_total': ('counter', '探測後移除的圖片數（依原因：too_small/not_image）'),
+    'crawler_crawls_total': ('counter', '完成的爬取次數'),
+    'api_request_seconds': ('histogram', 'API 請求的處理時間（秒，依端點）'),
+    'api_requests_total': ('counter', 'API 請求數（依端點與狀態碼）'),
+}
+
+# 爬取階段：
+# dns / connect   DNS 查詢、建立連接（含 TLS），只在沒有可重用的連接時發生
+# rate_limit      限速器的等待時間
+# request         送出請求到收到回應標頭（包含 dns/connect）
+# download        讀取回應本文
+# retry_backoff   重試前的等待
+# search_page     取得並解析一頁搜尋結果
+# story           處理一則新聞的總時間
+# parse           解析新聞頁面（包含 images）
+# images          從內文擷取圖片
+# image_probe     以 Range 請求探測一張圖片的尺寸與大小
+# store           讀寫本地新聞儲存
+# dedupe          以內文指紋合併近似重複的新聞（含比對已儲存的新聞，見 dedupe.py）
+STAGES = ('dns', 'connect', 'rate_limit', 'request', 'download', 'retry_backoff',
+          'search_page', 'story', 'parse', 'images', 'image_probe', 'store', 'dedupe')
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def percentile(values, fraction):
+    """最近秩法的百分位數，沒有資料時為 0.0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """累積分組的直方圖（Prometheus 的 le 分組）"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """全域的計數器與直方圖，可在多個執行緒中同時更新"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        if METRICS[name][0] != 'counter':
+            raise ValueError(f"{name} 不是計數器")
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        if METRICS[name][0] != 'histogram':
+            raise ValueError(f"{name} 不是直方圖")
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def value(self, name, **labels):
+        """目前的計數器值，或直方圖的觀察次數"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            histogram = self._histograms.get(key)
+            return histogram.count if histogram else 0
+
+    def render(self):
+        """以 Prometheus 文字格式輸出所有指標"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            lines = []
+            for name, (kind, help_text) in METRICS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    for (metric, labels), value in counters:
+                        if metric == name:
+                            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                for (metric, labels), histogram in histograms:
+                    if metric != name:
+                        continue
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram.count}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class CrawlSummary:
+    """單次爬取的計數與各階段耗時，由 scrape_news(with_summary=True) 回傳"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.elapsed = None
+        self.counters = {}
+        self.stages = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe_stage(self, stage, seconds):
+        self.stages.setdefault(stage, []).append(seconds)
+
+    def finish(self):
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self._start
+        return self
+
+    def as_dict(self):
+        """
+        計數器去掉 crawler_ 前綴與 _total 後綴；有標籤的計數器以標籤值為鍵，
+        各階段回報次數、總耗時、最大值與 p50/p95（秒）
+        """
+        counters = {}
+        for (name, labels), value in sorted(self.counters.items()):
+            short_name = name.replace('crawler_', '', 1).replace('_total', '')
+            if labels:
+                counters.setdefault(short_name, {})[','.join(label for _, label in labels)] = value
+            else:
+                counters[short_name] = value
+
+        stages = {}
+        for stage in STAGES:
+            samples = sorted(self.stages.get(stage, ()))
+            if not samples:
+                continue
+            stages[stage] = {
+                'count': len(samples),
+                'total': round(sum(samples), 6),
+                'max': round(samples[-1], 6),
+                'p50': round(percentile(samples, 0.50), 6),
+                'p95': round(percentile(samples, 0.95), 6),
+            }
+
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._start
+        return {
+            'started_at': self.started_at,
+            'elapsed': round(elapsed, 6),
+            'counters': counters,
+            'stages': stages,
+        }
+
+
+# 目前任務所屬的爬取摘要；asyncio 任務建立時會複製當下的值
+_current_summary = contextvars.ContextVar('crawl_summary', default=None)
+
+
+@contextlib.contextmanager
+def collect(summary):
+    """在此區塊內（含其中建立的任務）記錄的指標也會計入 summary"""
+    token = _current_summary.set(summary)
+    try:
+        yield summary
+    finally:
+        _current_summary.reset(token)
+
+
+def inc(name, amount=1, **labels):
+    """增加計數器，同時計入目前的爬取摘要"""
+    registry.inc(name, amount, **labels)
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.inc(name, amount, **labels)
+
+
+def observe_stage(stage, seconds):
+    """記錄一個爬取階段的耗時，同時計入目前的爬取摘要"""
+    registry.observe('crawler_stage_seconds', seconds, stage=stage)
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.observe_stage(stage, seconds)
+
+
+@contextlib.contextmanager
+def timed(stage):
+    """記錄區塊的耗時（可跨越 await）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
@@ -0,0 +1,187 @@
+"""
+新聞快取層
+在 scrape_news() 前加上一層 stale-while-revalidate 快取：
+- 在 TTL 內直接回傳快取資料
+- 過期時立即回傳舊資料，並在背景執行緒重新爬取
+- 同一時間只會有一個爬取在進行（single-flight），其他請求共用結果
+- 更新後內容沒變時沿用原本的資料物件與版本，預先編碼的回應與 ETag 不需重建
+- stream() 加入進行中的更新（沒有時啟動一次），邊爬取邊取得新聞，所有串流與 get() 共用同一次爬取
+"""
+
+import itertools
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 所有快取共用的版本序號：資料內容改變時取下一個值，淘汰後重建的快取也不會與舊版本重複
+_versions = itertools.count(1)
+
+
+class RefreshProgress:
+    """一次背景更新的進度：loader 每取得一則新聞就 publish，follow() 的讀取端依序取得"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.items = []
+        self.done = False
+        self.error = None
+
+    def publish(self, item):
+        with self._cond:
+            self.items.append(item)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def follow(self):
+        """依序產出已發佈與之後發佈的新聞，更新結束時停止；更新失敗時拋出 RuntimeError"""
+        sent = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self.items) > sent or self.done)
+                new_items, done, error = self.items[sent:], self.done, self.error
+            yield from new_items
+            sent += len(new_items)
+            if done:
+                if error:
+                    raise RuntimeError(error)
+                return
+
+
+class NewsCache:
+    """具備背景更新與單一飛行去重的新聞快取"""
+
+    def __init__(self, loader, ttl=300, wait_timeout=60, progress=False, is_empty=None):
+        """
+        loader: 無參數的可呼叫物件，回傳新聞列表（通常為 scrape_news）
+        ttl: 資料被視為新鮮的秒數
+        wait_timeout: 冷啟動（尚無任何資料）時請求最多等待的秒數
+        progress: 為 True 時以 loader(progress=callback) 呼叫，每取得一則新聞就回報給 stream() 的讀取端
+        is_empty: 判斷 loader 結果是否沒有資料（沒有資料時沿用舊資料），預設為 not news_data
+        """
+        self._loader = loader
+        self._is_empty = is_empty or (lambda news_data: not news_data)
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._streaming = progress
+
+        self._lock = threading.Lock()
+        self._data = None
+        self._fetched_at = None
+        self._updated_at = None  # 目前這份內容第一次取得的時間
+        self._version = None
+        self._inflight = None  # 正在進行的爬取完成事件
+        self._progress = None  # 正在進行的爬取進度（RefreshProgress）
+        self._last_error = None
+        self.refresh_count = 0
+
+    def get(self):
+        """
+        取得新聞資料與快取資訊
+        回傳 (news_data, meta)，meta 包含 cache_age、stale、refreshing 等欄位，
+        version / updated_at 只在資料內容改變時更新
+        """
+        with self._lock:
+            if self._data is not None:
+                if self._age() > self.ttl:
+                    self._start_refresh_locked()
+                return self._data, self._meta_locked()
+            event = self._start_refresh_locked()
+
+        # 冷啟動：所有請求等待同一次爬取
+        event.wait(self.wait_timeout)
+        with self._lock:
+            return (self._data if self._data is not None else []), self._meta_locked()
+
+    def peek(self):
+        """不觸發更新、不等待，直接回傳目前的快取資料（可能為 None）與快取資訊"""
+        with self._lock:
+            return self._data, self._meta_locked()
+
+    def refresh(self):
+        """觸發背景更新（若已有更新在進行則共用），回傳完成事件"""
+        with self._lock:
+            return self._start_refresh_locked()
+
+    def stream(self):
+        """
+        觸發背景更新（若已有更新在進行則加入）並依取得順序逐則產出該次更新的新聞，
+        先送出加入前已取得的部分；更新完成後結果照常寫回快取
+        loader 不回報進度時（progress=False）在更新完成後一次產出全部結果
+        """
+        with self._lock:
+            self._start_refresh_locked()
+            progress = self._progress
+        return progress.follow()
+
+    def _age(self):
+        if self._fetched_at is None:
+            return None
+        return time.time() - self._fetched_at
+
+    def _meta_locked(self):
+        age = self._age()
+        return {
+            'cache_age': round(age, 3) if age is not None else None,
+            'stale': age is None or age > self.ttl,
+            'refreshing': self._inflight is not None,
+            'fetched_at': self._fetched_at,
+            'updated_at': self._updated_at,
+            'version': self._version,
+            'ttl': self.ttl,
+            'last_error': self._last_error,
+        }
+
+    def _start_refresh_locked(self):
+        """在持有鎖的情況下啟動背景爬取，已有爬取進行中時直接共用"""
+        if self._inflight is not None:
+            return self._inflight
+
+        event = threading.Event()
+        self._inflight = event
+        self._progress = RefreshProgress()
+        worker = threading.Thread(target=self._run_refresh, args=(event, self._progress), daemon=True)
+        worker.start()
+        return event
+
+    def _run_refresh(self, event, progress):
+        error = None
+        try:
+            if self._streaming:
+                news_data = self._loader(progress=progress.publish)
+            else:
+                news_data = self._loader()
+            if not progress.items and isinstance(news_data, list):
+                for news_item in news_data:
+                    progress.publish(news_item)
+            with self._lock:
+                self.refresh_count += 1
+                # 爬取結果為空時保留上一次成功的資料
+                if not self._is_empty(news_data) or self._data is None:
+                    now = time.time()
+                    if self._version is None or news_data != self._data:
+                        self._data = news_data
+                        self._updated_at = now
+                        self._version = next(_versions)
+                    self._fetched_at = now
+                    self._last_error = None
+                else:
+                    self._last_error = '爬取結果為空，沿用舊資料'
+                    logger.warning("背景爬取未取得資料，沿用快取中的舊資料")
+        except Exception as e:
+            logger.error(f"背景爬取失敗: {e}")
+            error = str(e)
+            with self._lock:
+                self._last_error = error
+        finally:
+            with self._lock:
+                self._inflight = None
+                self._progress = None
+            progress.finish(error)
+            event.set()
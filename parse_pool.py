@@ -0,0 +1,138 @@
+"""
+多程序的新聞頁面解析
+parse_story 是純 CPU 工作，在爬蟲的事件迴圈中執行時受 GIL 限制只能用到一個核心。
+ParsePool 把下載好的頁面原始位元組交給子程序解析，只傳回 records.Article 記錄（見 records.py）：
+- 同一個事件迴圈中陸續送來的頁面累積到 chunk_size 則（或等待 FLUSH_DELAY 秒）後一起送出，
+  減少程序間傳遞與排程的次數
+- 子程序中記錄的指標（捨棄原因、images 階段耗時）隨結果傳回，在等待結果的任務中補記，
+  因此仍會計入該次爬取的 CrawlSummary
+- 子程序以 spawn 啟動，不複製 API 或工作程序中的執行緒與連線
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+
+DEFAULT_CHUNK_SIZE = 4
+FLUSH_DELAY = 0.005  # 不足一批時最多等待的秒數
+
+
+def _parse_chunk(pages):
+    """在子程序中解析一批 (html, story_url)，回傳 [(Article 或 None, 計數器, 各階段耗時), ...]"""
+    from crawler import parse_story
+
+    results = []
+    for html, story_url in pages:
+        summary = metrics.CrawlSummary()
+        with metrics.collect(summary):
+            news_item = parse_story(html, story_url)
+        results.append((news_item, summary.counters, summary.stages))
+    return results
+
+
+def _replay_metrics(counters, stages):
+    """把子程序記錄的指標計入本程序的 registry 與目前的爬取摘要"""
+    for (name, labels), amount in counters.items():
+        metrics.inc(name, amount, **dict(labels))
+    for stage, samples in stages.items():
+        for seconds in samples:
+            metrics.observe_stage(stage, seconds)
+
+
+class ParsePool:
+    """以程序池解析新聞頁面，可跨事件迴圈與執行緒共用"""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, flush_delay=FLUSH_DELAY):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.flush_delay = flush_delay
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        self._pending = {}  # 事件迴圈 -> [(html, story_url, future), ...]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, workers, chunk_size=DEFAULT_CHUNK_SIZE):
+        """取得指定子程序數與批次大小的共用程序池（子程序啟動需要時間，不應每次爬取重建）"""
+        key = (workers, chunk_size)
+        with cls._shared_lock:
+            pool = cls._shared.get(key)
+            if pool is None:
+                pool = cls._shared[key] = cls(workers, chunk_size)
+            return pool
+
+    async def parse(self, html, story_url):
+        """在子程序中執行 crawler.parse_story(html, story_url)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            pending = self._pending.setdefault(loop, [])
+            pending.append((html, story_url, future))
+            if len(pending) >= self.chunk_size:
+                self._submit(loop, self._pending.pop(loop))
+            elif len(pending) == 1:
+                loop.call_later(self.flush_delay, self._flush, loop)
+        news_item, counters, stages = await future
+        _replay_metrics(counters, stages)
+        return news_item
+
+    def _flush(self, loop):
+        with self._lock:
+            batch = self._pending.pop(loop, None)
+            if batch:
+                self._submit(loop, batch)
+
+    def _submit(self, loop, batch):
+        pages = [(html, story_url) for html, story_url, _ in batch]
+        try:
+            done = self._executor.submit(_parse_chunk, pages)
+        except RuntimeError as e:  # 程序池已關閉
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        def on_done(result):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._deliver, batch, result)
+
+        done.add_done_callback(on_done)
+
+    @staticmethod
+    def _deliver(batch, result):
+        error = result.exception()
+        for index, (_, _, future) in enumerate(batch):
+            if future.done():  # 等待的任務已被取消
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result.result()[index])
+
+    def parse_many(self, pages):
+        """同步解析 [(html, story_url), ...]，依輸入順序回傳新聞列表（供回填與基準測試使用）"""
+        chunks = [pages[i:i + self.chunk_size] for i in range(0, len(pages), self.chunk_size)]
+        news = []
+        for results in self._executor.map(_parse_chunk, chunks):
+            for news_item, counters, stages in results:
+                _replay_metrics(counters, stages)
+                news.append(news_item)
+        return news
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+        with self._shared_lock:
+            for key, pool in list(self._shared.items()):
+                if pool is self:
+                    del self._shared[key]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,86 @@
+"""
+每個主機的令牌桶限速器
+以「每秒請求數」表達對目標網站的禮貌限制，取代固定的 time.sleep()
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """執行緒安全的令牌桶"""
+
+    def __init__(self, rate, capacity=1):
+        """
+        rate: 每秒補充的令牌數（即每秒允許的請求數）
+        capacity: 桶的容量，允許的瞬間突發請求數
+        """
+        if rate <= 0:
+            raise ValueError("rate 必須大於 0")
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """預約一個令牌，回傳取得令牌前需要等待的秒數"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """阻塞直到取得令牌"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class HostRateLimiter:
+    """依主機名稱分配獨立令牌桶"""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate=2.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, rate, burst=1):
+        """
+        取得同一程序內共用的限速器（依 rate/burst 區分）
+        同時進行的爬取（API 背景更新、串流、多主題工作）共用每個主機的令牌桶，合計仍遵守每秒請求數
+        """
+        key = (rate, burst)
+        with cls._shared_lock:
+            limiter = cls._shared.get(key)
+            if limiter is None:
+                limiter = cls._shared[key] = cls(rate, burst)
+            return limiter
+
+    def bucket_for(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def reserve(self, url):
+        """預約該主機的令牌，回傳需等待的秒數"""
+        return self.bucket_for(url).reserve()
+
+    def acquire(self, url):
+        """阻塞直到該主機允許下一個請求"""
+        return self.bucket_for(url).acquire()
@@ -0,0 +1,162 @@
+"""
+新聞與圖片的精簡記錄型別
+爬蟲解析、本地儲存與 API 快取之間傳遞的都是 Article / Image，欄位在建立時驗證與正規化一次，
+之後的請求直接沿用，不再逐則複製與重建
+- 以 __slots__ 儲存欄位，沒有每個物件各自的 dict，數十萬則新聞常駐記憶體時差異明顯
+- 大量重複的短字串（記者署名、圖片說明、MIME 類型）以 sys.intern 共用同一個物件；
+  圖片記錄本身不另外登錄（以弱參照表去重時，每張不重複的圖片反而多出約 140 位元組）
+- 保留 dict 風格的讀取（item['title']、item.get('images')、dict(item)），既有程式與快照格式不需改動；
+  序列化為 JSON 時以 json_default 轉為與原本相同的 dict
+"""
+
+import sys
+from dataclasses import dataclass, fields, replace
+
+
+class FieldAccess:
+    """以 dict 風格讀寫 __slots__ 欄位；_optional 中的欄位為 None 時視為不存在"""
+
+    __slots__ = ()
+    _optional = ()
+
+    def keys(self):
+        return [name for name in self._names if not (name in self._optional and getattr(self, name) is None)]
+
+    def __getitem__(self, key):
+        if key not in self._names or (key in self._optional and getattr(self, key) is None):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def as_dict(self):
+        """API 回應與本地儲存使用的 dict 格式"""
+        return {name: getattr(self, name) for name in self.keys()}
+
+
+def _intern(text):
+    return sys.intern(str(text)) if text else ''
+
+
+@dataclass(frozen=True, slots=True)
+class Image(FieldAccess):
+    """新聞圖片；width/height/bytes/mime 只有探測過的圖片才有（見 image_probe.py）"""
+
+    url: str
+    alt: str = ''
+    title: str = ''
+    is_main: bool = False
+    width: int = None
+    height: int = None
+    bytes: int = None
+    mime: str = None
+
+    _optional = ('width', 'height', 'bytes', 'mime')
+
+    @classmethod
+    def create(cls, url, alt='', title='', is_main=False, width=None, height=None, bytes=None, mime=None):
+        """建立圖片記錄，正規化欄位型別並共用重複的說明文字"""
+        return cls(str(url), _intern(alt), _intern(title), bool(is_main), width, height, bytes,
+                   _intern(mime) or None)
+
+    @classmethod
+    def from_dict(cls, data):
+        """由 dict 建立（沿用舊版 ensure_images_field 的驗證），不是 dict 或沒有 url 時回傳 None"""
+        if isinstance(data, Image):
+            return data
+        if not isinstance(data, dict) or not data.get('url'):
+            return None
+        return cls.create(**{name: data[name] for name in cls._names if name in data})
+
+    def __reduce__(self):
+        # 從子程序（parse_pool.py）傳回時同樣共用重複的字串
+        return Image.create, tuple(getattr(self, name) for name in self._names)
+
+    def probed(self, meta):
+        """加上探測結果（width/height/bytes/mime）的新記錄"""
+        return Image.create(**dict(self.as_dict(), **meta))
+
+
+def normalize_images(images):
+    """把圖片列表轉為 Image 的 tuple，略過格式不正確的項目"""
+    if not isinstance(images, (list, tuple)):
+        return ()
+    return tuple(image for image in map(Image.from_dict, images) if image is not None)
+
+
+@dataclass(slots=True)
+class Article(FieldAccess):
+    """
+    一則新聞；publish_time / reporter 為頁面上的原始文字，published_at / reporter_name 為正規化結果
+    content 為段落以換行連接的單一字串，images 為 Image 的 tuple
+    topics 只有多主題爬取工作的結果才有（見 crawl_job.py）；alternate_urls 為內容近似的其他新聞URL（見 dedupe.py）
+    """
+
+    title: str
+    publish_time: str
+    published_at: str
+    reporter: str
+    reporter_name: str
+    content: str
+    url: str
+    images: tuple = ()
+    topics: list = None
+    alternate_urls: list = None
+
+    _optional = ('topics', 'alternate_urls')
+
+    def __post_init__(self):
+        # 同一位記者的署名大量重複，共用字串物件
+        self.reporter = _intern(self.reporter)
+        self.reporter_name = _intern(self.reporter_name) or None
+        if not isinstance(self.images, tuple) or not all(isinstance(image, Image) for image in self.images):
+            self.images = normalize_images(self.images)
+
+    def __setitem__(self, key, value):
+        if key not in self._names:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """由 dict（快照、舊資料）建立，缺少的文字欄位以空字串代替"""
+        if isinstance(data, Article):
+            return data
+        return cls(
+            title=data.get('title', ''),
+            publish_time=data.get('publish_time', ''),
+            published_at=data.get('published_at'),
+            reporter=data.get('reporter', ''),
+            reporter_name=data.get('reporter_name'),
+            content=data.get('content', ''),
+            url=data.get('url', ''),
+            images=data.get('images'),
+            topics=data.get('topics'),
+            alternate_urls=data.get('alternate_urls')
+        )
+
+    def as_dict(self):
+        item = FieldAccess.as_dict(self)
+        item['images'] = [image.as_dict() for image in self.images]
+        return item
+
+    def with_images(self, images):
+        return replace(self, images=normalize_images(images))
+
+
+Image._names = tuple(field.name for field in fields(Image))
+Article._names = tuple(field.name for field in fields(Article))
+
+
+def json_default(value):
+    """json.dumps 的 default：把 Article / Image 轉為 dict"""
+    if isinstance(value, FieldAccess):
+        return value.as_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,118 @@
+"""
+HTTP 錄製/重播
+record 模式下把爬蟲實際收到的回應存入 cassette 檔；replay 模式下直接從 cassette 回應，不連網。
+cassette 也可以交給 replay_server.py 以本地 HTTP 服務的形式提供，並加入延遲與錯誤
+"""
+
+import base64
+import json
+import os
+import threading
+
+from http_cache import conditional_headers
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+# 重播時保留的回應標頭
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+
+
+class Cassette:
+    """以URL為鍵保存回應的錄製檔（JSON）"""
+
+    def __init__(self, path=None, mode=REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"不支援的模式: {mode}")
+        self.path = path
+        self.mode = mode
+        self.entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.entries = {
+            url: {
+                'status': entry['status'],
+                'headers': entry['headers'],
+                'body': base64.b64decode(entry['body']),
+            }
+            for url, entry in data.items()
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                url: {
+                    'status': entry['status'],
+                    'headers': entry['headers'],
+                    'body': base64.b64encode(entry['body']).decode('ascii'),
+                }
+                for url, entry in self.entries.items()
+            }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def add(self, url, status, headers, body):
+        """加入或覆蓋一筆回應"""
+        kept = {name: headers[name] for name in KEPT_HEADERS if headers.get(name)}
+        with self._lock:
+            self.entries[url] = {'status': status, 'headers': kept, 'body': body}
+
+    def record(self, result):
+        """錄製一個 FetchResult；304 不錄製，保留原本的完整回應"""
+        if result.status == 304:
+            return
+        self.add(result.url, result.status, result.headers, result.body)
+        self.save()
+
+    def lookup(self, url, request_headers=None):
+        """
+        依URL找出回應，回傳 (status, headers, body)
+        請求帶有相符的 If-None-Match/If-Modified-Since 時回傳 304；沒有錄製時回傳 404
+        """
+        entry = self.entries.get(url)
+        if entry is None:
+            return 404, {}, b''
+        request_headers = request_headers or {}
+        headers = entry['headers']
+        validators = conditional_headers(headers.get('ETag'), headers.get('Last-Modified'))
+        if validators and any(request_headers.get(name) == value for name, value in validators.items()):
+            return 304, headers, b''
+        return entry['status'], headers, entry['body']
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def make_sample_cassette(path=None, story_count=30, page_size=10,
+                         base_url='https://udn.com/search/word/2/空汙'):
+    """
+    以 sample_pages 的合成頁面建立 cassette：story_count 則新聞分布在多頁搜尋結果中，
+    每個頁面都有 ETag，可用於離線測試與基準測試
+    """
+    from frontier import search_page_url
+    from sample_pages import make_search_page, make_story_page, story_url
+
+    cassette = Cassette(path)
+    story_ids = list(range(1000 + story_count, 1000, -1))
+    html_type = {'Content-Type': 'text/html; charset=utf-8'}
+
+    for page, start in enumerate(range(0, len(story_ids), page_size), 1):
+        body = make_search_page(story_ids[start:start + page_size]).encode('utf-8')
+        cassette.add(search_page_url(base_url, page), 200,
+                     dict(html_type, ETag=f'"search-{page}-{story_count}"'), body)
+
+    for n in story_ids:
+        body = make_story_page(n, legacy=(n % 5 == 0)).encode('utf-8')
+        cassette.add(story_url(n), 200, dict(html_type, ETag=f'"story-{n}"'), body)
+
+    cassette.save()
+    return cassette
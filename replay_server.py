@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+本地重播伺服器
+以 HTTP 服務提供 cassette 中錄製的回應，可設定延遲與錯誤注入，
+搭配爬蟲的來源覆寫（CRAWL_ORIGIN_OVERRIDE）即可在不連網的情況下完整跑一次爬取
+
+用法:
+    python replay_server.py cassette.json --port 8765 --latency 0.2 --error-rate 0.1
+    python replay_server.py --sample --port 8765     # 使用合成頁面
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+
+from aiohttp import web
+
+from replay import Cassette, make_sample_cassette
+
+DEFAULT_ORIGIN = 'https://udn.com'
+
+STATS_KEY = web.AppKey('stats', dict)
+
+
+def create_app(cassette, origin=DEFAULT_ORIGIN, latency=0.0, jitter=0.0,
+               error_rate=0.0, error_status=503, seed=None):
+    """
+    建立重播用的 aiohttp 應用
+    latency / jitter: 每個回應的延遲秒數與隨機增減範圍
+    error_rate: 回應錯誤的機率；error_status 為錯誤狀態碼，0 表示直接中斷連線
+    """
+    rng = random.Random(seed)
+    stats = {'requests': 0, 'errors': 0, 'not_modified': 0}
+
+    async def handle(request):
+        stats['requests'] += 1
+        delay = max(0.0, latency + rng.uniform(-jitter, jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+        if error_rate and rng.random() < error_rate:
+            stats['errors'] += 1
+            if error_status == 0:
+                request.transport.close()
+                raise web.HTTPInternalServerError()
+            return web.Response(status=error_status, headers={'Retry-After': '1'})
+
+        url = origin + request.path
+        if request.query_string:
+            url += '?' + request.query_string
+        status, headers, body = cassette.lookup(url, request.headers)
+        if status == 304:
+            stats['not_modified'] += 1
+        return web.Response(status=status, headers=headers, body=body or None)
+
+    app = web.Application()
+    app[STATS_KEY] = stats
+    app.router.add_route('GET', '/{tail:.*}', handle)
+    return app
+
+
+class ReplayServer:
+    """在背景執行緒中執行的重播伺服器，供測試與基準測試使用"""
+
+    def __init__(self, cassette, host='127.0.0.1', port=0, **options):
+        self.app = create_app(cassette, **options)
+        self.host = host
+        self.port = port
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def stats(self):
+        return self.app[STATS_KEY]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait(10)
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='cassette 重播伺服器')
+    parser.add_argument('cassette', nargs='?', help='cassette 檔路徑')
+    parser.add_argument('--sample', action='store_true', help='使用合成頁面建立的 cassette')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--origin', default=DEFAULT_ORIGIN, help='cassette 中網址的來源')
+    parser.add_argument('--latency', type=float, default=0.0, help='每個回應的延遲秒數')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延遲的隨機增減範圍')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回應錯誤的機率 (0-1)')
+    parser.add_argument('--error-status', type=int, default=503, help='錯誤狀態碼，0 表示中斷連線')
+    args = parser.parse_args()
+
+    if args.sample:
+        cassette = make_sample_cassette()
+    elif args.cassette:
+        cassette = Cassette(args.cassette)
+    else:
+        parser.error('請指定 cassette 檔或使用 --sample')
+
+    print(f"重播 {len(cassette)} 個回應於 http://{args.host}:{args.port}")
+    print(f"爬蟲設定: CRAWL_ORIGIN_OVERRIDE={args.origin}=http://{args.host}:{args.port}")
+    web.run_app(
+        create_app(cassette, origin=args.origin, latency=args.latency, jitter=args.jitter,
+                   error_rate=args.error_rate, error_status=args.error_status),
+        host=args.host, port=args.port, print=None
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+預先編碼的 JSON 回應
+同一份結果只序列化一次（UTF-8，不把中文轉成 \\uXXXX），同時保存 gzip 與 brotli 壓縮版本，
+並以內容雜湊作為 ETag；之後的請求只需挑選壓縮格式或回應 304
+每次請求都不同的欄位（例如快取年齡）接在預先編碼的內容後面，不影響 ETag
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from records import json_default
+
+try:
+    import brotli
+except ImportError:  # 沒有 brotli 時只提供 gzip
+    brotli = None
+
+GZIP_LEVEL = 9       # 每份結果只壓縮一次，使用最高壓縮率
+BROTLI_QUALITY = 9   # 11 的壓縮時間約為 9 的十倍，換來的大小差異不大
+MIN_COMPRESS_BYTES = 512
+
+
+def parse_accept_encoding(header):
+    """解析 Accept-Encoding，回傳 {編碼: q 值}"""
+    qualities = {}
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8')
+
+
+class EncodedResponse:
+    """
+    一份序列化後的回應：body 為未壓縮的 UTF-8 JSON，encodings 為 {'gzip': bytes, 'br': bytes}
+    extend 為 payload 最後一個欄位（值為 dict）的名稱時，每次請求可在該物件後面補上額外欄位（見 negotiate）；
+    預先編碼的是補上欄位前的內容，gzip 以另一個 gzip member 接上額外欄位（RFC 1952 允許多個 member），
+    brotli 無法接續，這類回應只提供 gzip
+    """
+
+    def __init__(self, payload, extend=None):
+        self.body = _dumps(payload)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.extend = extend
+        if extend is not None:
+            if list(payload)[-1] != extend or not payload[extend]:
+                raise ValueError(f'{extend} 必須是 payload 最後一個非空的物件欄位')
+            self._prefix = self.body[:-2]  # 去掉結尾的 }}，之後接上額外欄位
+        self.encodings = {}
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            if extend is not None:
+                self.encodings['gzip'] = gzip.compress(self._prefix, compresslevel=GZIP_LEVEL, mtime=0)
+                return
+            if brotli is not None:
+                self.encodings['br'] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            self.encodings['gzip'] = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+
+    def negotiate(self, accept_encoding, extra=None):
+        """
+        依 Accept-Encoding 挑選最小的可接受版本，回傳 (body, content_encoding 或 None)
+        extra: 補在 extend 物件後面的欄位 dict，只在建立時指定了 extend 時使用
+        """
+        qualities = parse_accept_encoding(accept_encoding)
+        wildcard = qualities.get('*', 0.0)
+        best = (self.body, None)
+        for coding, data in self.encodings.items():
+            if qualities.get(coding, wildcard) > 0 and len(data) < len(best[0]):
+                best = (data, coding)
+        if self.extend is None:
+            return best
+        tail = (b',' + _dumps(extra)[1:] if extra else b'}') + b'}'
+        data, coding = best
+        if coding is None:
+            return self._prefix + tail, None
+        return data + gzip.compress(tail, compresslevel=GZIP_LEVEL, mtime=0), coding
+
+
+class EncodedResponseCache:
+    """
+    以請求參數為鍵保存預先編碼的回應，依最近使用淘汰
+    每筆記錄綁定產生它的資料版本（例如 NewsCache 的 version），版本改變後才重新編碼；
+    編碼與壓縮在鎖外進行，同一個 (key, version) 同一時間只建立一次，其他請求等待同一份結果
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, response)
+        self._building = {}            # (key, version) -> Future
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, key, version, build):
+        """取得 key 對應的回應；沒有或版本已改變時呼叫 build() 產生"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+            future = self._building.get((key, version))
+            owner = future is None
+            if owner:
+                future = self._building[(key, version)] = Future()
+                self.builds += 1
+        if not owner:
+            return future.result()
+
+        try:
+            response = build()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._building[(key, version)]
+                if not future.done():
+                    self._entries[key] = (version, response)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        future.set_result(response)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,90 @@
+"""
+合成的範例頁面
+依照聯合新聞網新版（article-*）與舊版（story_*）的版面結構產生新聞頁與搜尋頁，
+供離線測試與基準測試使用；內容為假資料，不是實際抓取的頁面
+"""
+
+import random
+
+NAV_LINKS = ''.join(
+    f'<li><a href="/news/cate/{i}">分類 {i}</a></li>' for i in range(1, 40)
+)
+
+SCRIPTS = ''.join(
+    f'<script>window.__DATA_{i}__ = {{"id": {i}, "items": [{", ".join(str(n) for n in range(400))}]}};</script>'
+    for i in range(20)
+)
+
+
+def story_url(story_id, category=7266):
+    return f'https://udn.com/news/story/{category}/{story_id}'
+
+
+def make_story_page(story_id, paragraphs=20, images=4, legacy=False, seed=None):
+    """產生一則新聞頁面 HTML，legacy=True 時使用舊版 story_* 版面"""
+    rng = random.Random(story_id if seed is None else seed)
+    title = f'空汙新聞第 {story_id} 則：細懸浮微粒濃度{rng.choice(["上升", "下降", "持平"])}'
+    body = ''.join(
+        f'<p>{"".join(rng.choice("空氣品質監測站今日觀測到懸浮微粒濃度變化環保署呼籲民眾減少戶外活動") for _ in range(rng.randint(60, 160)))}</p>'
+        for _ in range(paragraphs)
+    )
+    figures = ''.join(
+        f'<figure class="article-content__cover"><img src="//pgw.udn.com.tw/gw/photo.php?u=https://uc.udn.com.tw/photo/2024/01/0{story_id % 9}/{story_id}_{n}.jpg"'
+        f' alt="示意圖 {n}" width="640" height="360"></figure>'
+        for n in range(images)
+    )
+    noise = (
+        '<p><img data-src="https://s.udn.com.tw/static/font-icons/facebook.png" width="20" height="20"></p>'
+        '<p><!-- 廣告 --><span>延伸閱讀</span></p>'
+    )
+
+    if legacy:
+        article = f"""
+        <div id="story_body">
+          <h1 class="story_art_title">{title}</h1>
+          <div class="story_bady_info_author">2024-01-{1 + story_id % 28:02d} 10:{story_id % 60:02d}</div>
+          <span class="story_bady_info_author">聯合報 記者王{story_id}／台北報導</span>
+          <div class="story_content">{figures}{body}{noise}</div>
+        </div>"""
+    else:
+        article = f"""
+        <article class="article">
+          <div class="article-head__figure"><img src="https://pgw.udn.com.tw/gw/photo.php?u=https://uc.udn.com.tw/photo/main/{story_id}.jpg" alt="主圖" title="主圖標題"></div>
+          <h1 class="article-head__title">{title}</h1>
+          <section class="authors">
+            <time class="article-content__time">2024-01-{1 + story_id % 28:02d} 10:{story_id % 60:02d}</time>
+            <span class="article-content__author"><a href="/search/author">記者王{story_id}</a>／台北即時報導</span>
+          </section>
+          <section class="article-content__editor">{figures}{body}{noise}<script>var inline = "不應出現在內文";</script></section>
+        </article>"""
+
+    return f"""<!DOCTYPE html>
+<html lang="zh-Hant-TW">
+<head><meta charset="utf-8"><title>{title} | 聯合新聞網</title>{SCRIPTS}</head>
+<body>
+  <header><ul class="navigation">{NAV_LINKS}</ul></header>
+  <main>{article}</main>
+  <aside>{''.join(f'<a href="{story_url(story_id + n)}">相關新聞 {n}</a>' for n in range(1, 8))}</aside>
+  <footer>{SCRIPTS}</footer>
+</body>
+</html>"""
+
+
+def make_search_page(story_ids, category=7266):
+    """產生一頁搜尋結果 HTML，依傳入順序列出新聞連結"""
+    items = ''.join(
+        f'<div class="story-list__news"><a href="{story_url(story_id, category)}?from=udn-search">'
+        f'<h2>空汙新聞第 {story_id} 則</h2></a></div>'
+        for story_id in story_ids
+    )
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8">{SCRIPTS}</head>
+<body><ul class="navigation">{NAV_LINKS}</ul><div class="search-result">{items}</div></body></html>"""
+
+
+def make_corpus(count=50):
+    """產生 (url, html) 列表，每 5 則中有 1 則使用舊版版面"""
+    return [
+        (story_url(story_id), make_story_page(story_id, legacy=(story_id % 5 == 0)))
+        for story_id in range(1, count + 1)
+    ]
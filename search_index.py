@@ -0,0 +1,109 @@
+"""
+新聞全文檢索
+以 SQLite FTS5 建立倒排索引（articles_fts，rowid 對應 articles 的 rowid），隨新聞儲存時增量更新：
+- 中日韓文字的連續字元切成重疊的二字詞（bigram），並在最後加上結尾的單字；英文與數字以整個詞為單位
+- 查詢以同樣方式切詞，連續的中文組成 FTS5 片語（相當於子字串比對），單一中文字以前綴比對
+  （每個字都是某個二字詞的開頭或結尾的單字，因此不會漏掉），查詢中的每一段之間為 AND
+- 以 bm25 排序，標題與記者欄位的權重高於內文；常見詞可能命中大量新聞，
+  因此只為發佈時間最新的 RANK_WINDOW 則命中計算分數並排序，其餘命中依發佈時間接在後面
+- 索引為 contentless（content=''），不重複保存切詞後的文字；更新與刪除時以舊內容送出 'delete' 命令
+"""
+
+import re
+
+# FTS5 的欄位依序為 title, reporter, content
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, reporter, content, content = '', tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+BM25_WEIGHTS = (5.0, 2.0, 1.0)
+RANK_WINDOW = 1000  # 依相關度排序時計算分數的最新命中數（依發佈時間）
+
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_TOKEN_RE = re.compile(rf'([{_CJK}]+)|[^\W_{_CJK}]+')
+SNIPPET_CHARS = 60
+
+
+def _bigrams(run):
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    """索引用的切詞：中日韓文字產生重疊的二字詞與結尾的單字，其他以英數字詞為單位（轉為小寫）"""
+    tokens = []
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        run = match.group()
+        if match.group(1):
+            tokens.extend(_bigrams(run))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def index_text(text):
+    """寫入 FTS5 的文字：以空白分隔的詞"""
+    return ' '.join(tokenize(text))
+
+
+def _phrases(term):
+    """查詢詞中每一段連續的中文或英數字轉成一個 FTS5 片語"""
+    phrases = []
+    for match in _TOKEN_RE.finditer(term.lower()):
+        run = match.group()
+        if match.group(1) and len(run) == 1:
+            phrases.append(f'"{run}"*')
+        elif match.group(1):
+            phrases.append('"' + ' '.join(_bigrams(run)) + '"')
+        else:
+            phrases.append(f'"{run}"')
+    return phrases
+
+
+def build_match_query(q=None, reporter=None):
+    """
+    將使用者輸入轉成 FTS5 MATCH 運算式，以空白分隔的每個詞都必須出現
+    reporter 只比對記者欄位；沒有可查詢的詞時回傳 None
+    """
+    clauses = _phrases(q or '')
+    clauses.extend(f'reporter : {phrase}' for phrase in _phrases(reporter or ''))
+    return ' AND '.join(clauses) or None
+
+
+def make_snippet(content, q, width=SNIPPET_CHARS):
+    """擷取內文中第一個查詢詞附近的文字，沒有命中時回傳開頭"""
+    content = content or ''
+    lowered = content.lower()
+    position = -1
+    for term in (q or '').lower().split():
+        position = lowered.find(term)
+        if position >= 0:
+            break
+    if position < 0:
+        return content[:width * 2] + ('…' if len(content) > width * 2 else '')
+    start = max(0, position - width)
+    end = min(len(content), position + width)
+    return ('…' if start else '') + content[start:end] + ('…' if end < len(content) else '')
+
+
+def _fields(item):
+    return tuple(index_text(item.get(field)) for field in ('title', 'reporter', 'content'))
+
+
+def index_article(conn, rowid, news_item, old_item=None):
+    """
+    在 conn 目前的交易中更新一則新聞的索引
+    old_item 為先前已索引的內容（contentless 索引刪除時需要原本的文字），news_item 為 None 時只移除
+    """
+    if old_item:
+        conn.execute(
+            "INSERT INTO articles_fts (articles_fts, rowid, title, reporter, content) "
+            "VALUES ('delete', ?, ?, ?, ?)",
+            (rowid, *_fields(old_item))
+        )
+    if news_item:
+        conn.execute(
+            'INSERT INTO articles_fts (rowid, title, reporter, content) VALUES (?, ?, ?, ?)',
+            (rowid, *_fields(news_item))
+        )
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+新聞欄位正規化測試腳本
+驗證 article_fields.py 的發佈時間與記者姓名正規化，以及依發佈時間範圍查詢的 ArticleStore.news_between 與 /api/news
+"""
+
+import pytest
+
+import app as api
+from article_fields import clean_reporter, format_timestamp, parse_publish_time, parse_time_arg
+from article_store import ArticleStore
+from crawler import parse_story
+from response_cache import EncodedResponseCache
+from sample_pages import make_story_page, story_url
+
+
+@pytest.fixture
+def dated_store(store):
+    """story_url(1..10)，發佈時間依序為 2024-01-02 到 2024-01-11"""
+    for n in range(1, 11):
+        store.save(story_url(n), parse_story(make_story_page(n), story_url(n)))
+    return store
+
+
+def test_publish_time():
+    timestamp = parse_publish_time('2024-01-10 09:00')
+    assert format_timestamp(timestamp) == '2024-01-10T09:00:00+08:00'
+    assert parse_publish_time('發布時間：2024/1/10 09:00:30') == timestamp + 30
+    assert parse_publish_time('時間不明') is None and format_timestamp(None) is None
+    assert parse_time_arg('2024-01-10T09:00:00+08:00') == parse_time_arg('2024-01-10T01:00:00Z') == timestamp
+    for value in ('nan', 'inf', '-inf', '1e30', '9999-12-31'):
+        with pytest.raises(ValueError):
+            parse_time_arg(value, end_of_day=True)
+    print("✅ 發佈時間正規化正確")
+
+
+def test_clean_reporter():
+    assert clean_reporter('記者王小明／台北報導') == '王小明'
+    assert clean_reporter('聯合報 記者王小明／台北即時報導') == '王小明'
+    assert clean_reporter('經濟日報 編譯陳大明/綜合外電') == '陳大明'
+    assert clean_reporter('記者王小明、李大華／台北報導') == '王小明、李大華'
+    assert clean_reporter('聯合新聞網／綜合報導') is None
+    assert clean_reporter('記者不明') is None
+    print("✅ 記者姓名正規化正確")
+
+
+def test_news_between(dated_store):
+    store = dated_store
+    news, has_more = store.news_between(parse_time_arg('2024-01-04'), parse_time_arg('2024-01-07'))
+    assert [item['url'] for item in news] == [story_url(5), story_url(4), story_url(3)]
+    assert not has_more and news[0]['published_at'].startswith('2024-01-06T')
+
+    news, has_more = store.news_between(since=parse_time_arg('2024-01-04'), limit=2, offset=2)
+    assert [item['url'] for item in news] == [story_url(8), story_url(7)] and has_more
+    assert store.news_between(until=parse_time_arg('2024-01-01')) == ([], False)
+    print("✅ 發佈時間範圍查詢正確")
+
+
+def test_query_job_news_time_range():
+    """多主題工作的結果依 published_at 篩選發佈時間範圍，沒有 published_at 的新聞不符合"""
+    news = [parse_story(make_story_page(n), story_url(n)) for n in range(6, 2, -1)]
+    news.append(api.process_news_item({'url': story_url(2), 'title': '舊快照', 'publish_time': '2024-01-05 10:00'}))
+    result = {'topics': {'2/空汙': news}}
+    since, until = parse_time_arg('2024-01-04'), parse_time_arg('2024-01-06', end_of_day=True)
+    selected = api.query_job_news(result, '空汙', None, 10, 0, None, since, until)
+    assert [item['url'] for item in selected] == [story_url(5), story_url(4), story_url(3)]
+    assert api.query_job_news(result, '空汙', None, 10, 0, None, until=since) == []
+    print("✅ 多主題工作結果的發佈時間範圍正確")
+
+
+def test_news_endpoint_time_range(dated_store, default_store, monkeypatch):
+    store = dated_store
+    monkeypatch.setattr(api, 'encoded_responses', EncodedResponseCache())
+    client = api.app.test_client()
+    query = {'since': '2024-01-04', 'until': '2024-01-06', 'limit': 2}
+
+    response = client.get('/api/news', query_string=query)
+    body = response.get_json()
+    assert [item['url'] for item in body['data']] == [story_url(5), story_url(4)]  # until 包含當天
+    assert body['pagination']['next_offset'] == 2 and 'cache' not in body
+    assert body['data'][0]['reporter_name'] == '王5'
+
+    # 資料庫沒有寫入時沿用編碼好的回應；結果沒變時以 ETag 重新驗證
+    headers = {'If-None-Match': response.headers['ETag']}
+    assert client.get('/api/news', query_string=query, headers=headers).status_code == 304
+    assert api.encoded_responses.builds == 1
+
+    # 其他連線（爬蟲工作程序）寫入後重新查詢
+    ArticleStore(store.path).save(story_url(5), None)
+    changed = client.get('/api/news', query_string=query, headers=headers)
+    assert changed.status_code == 200 and api.encoded_responses.builds == 2
+    assert [item['url'] for item in changed.get_json()['data']] == [story_url(4), story_url(3)]
+
+    assert client.get('/api/news', query_string={'since': '昨天'}).status_code == 400
+    assert client.get('/api/news', query_string={'since': 'nan'}).status_code == 400
+    assert client.get('/api/news', query_string={'until': 'inf'}).status_code == 400
+    assert client.get('/api/news', query_string={'since': '2024-01-06', 'until': '2024-01-04'}).status_code == 400
+    assert client.get('/api/news', query_string={'since': '2024-01-04', 'cursor': '7'}).status_code == 400
+    print("✅ /api/news 發佈時間範圍正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+新聞儲存測試腳本
+驗證 article_store.py 的URL正規化、存取與條件請求標頭
+"""
+
+import pytest
+
+from article_store import normalize_story_url
+
+
+def test_normalize_story_url():
+    """同一則新聞的不同URL寫法正規化後相同"""
+    base = 'https://udn.com/news/story/7266/7712345'
+    variants = [
+        base,
+        base + '/',
+        base + '?from=udn-search',
+        base + '#comments',
+        'http://UDN.com/news/story/7266/7712345',
+    ]
+    assert {normalize_story_url(url) for url in variants} == {base}
+    print("✅ URL正規化正確")
+
+
+def test_save_and_get(store):
+    """儲存後可以還原成爬蟲輸出的格式（圖片補上 is_main）"""
+    url = 'https://udn.com/news/story/7266/7712345'
+    news_item = {
+        'title': '空汙新聞',
+        'publish_time': '2024-01-01 10:00',
+        'reporter': '記者王小明',
+        'content': '第一段\n第二段',
+        'url': url,
+        'images': [{'url': 'https://pgw.udn.com.tw/a.jpg', 'alt': '圖', 'title': ''}]
+    }
+    store.save(url + '?from=search', news_item, etag='"abc"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+
+    record = store.get(url)
+    assert store.to_news_item(record, url).as_dict() == {
+        **news_item, 'published_at': '2024-01-01T10:00:00+08:00', 'reporter_name': '王小明',
+        'images': [{'url': 'https://pgw.udn.com.tw/a.jpg', 'alt': '圖', 'title': '', 'is_main': False}]
+    }
+    assert store.conditional_headers(record) == {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+    }
+    assert store.count() == 1
+    print("✅ 新聞存取正確")
+
+
+def test_invalid_page_is_remembered(store):
+    """內容不完整的頁面也會記錄，避免重複下載"""
+    url = 'https://udn.com/news/story/7266/1'
+    store.save(url, None)
+
+    record = store.get(url)
+    assert record is not None
+    assert store.to_news_item(record) is None
+    print("✅ 無效頁面已記錄")
+
+
+def test_touch_updates_checked_at(store):
+    """304 回應只更新驗證時間"""
+    url = 'https://udn.com/news/story/7266/2'
+    store.save(url, {'title': 't', 'content': 'c'})
+    before = store.get(url)
+    store.touch(url)
+    after = store.get(url)
+
+    assert after['checked_at'] >= before['checked_at']
+    assert after['fetched_at'] == before['fetched_at']
+    print("✅ 驗證時間已更新")
+
+
+def test_crawl_state(store):
+    """增量爬取的高水位記錄"""
+    query = 'https://udn.com/search/word/2/空汙'
+    assert store.get_crawl_state(query) is None
+
+    store.save_crawl_state(query, 7712345, ['https://udn.com/news/story/7266/7712345'])
+    store.save_crawl_state(query, 7712400, ['https://udn.com/news/story/7266/7712400'])
+    state = store.get_crawl_state(query)
+    assert state['high_water'] == 7712400
+    assert state['urls'] == ['https://udn.com/news/story/7266/7712400']
+    assert not state['exhausted']
+    store.save_crawl_state(query, 7712400, state['urls'], exhausted=True)
+    assert store.get_crawl_state(query)['exhausted']
+    print("✅ 高水位記錄正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+歷史回填測試腳本
+驗證 backfill.py 的邊界狀態、存檔點與失敗重試，以及當機後續傳不重新下載已完成的新聞
+"""
+
+import asyncio
+import functools
+
+import pytest
+
+import crawler
+from backfill import BackfillFrontier, DONE, FAILED, PENDING
+from http_cache import ValidatorCache
+from frontier import search_page_url
+from replay import make_sample_cassette
+from sample_pages import make_search_page
+
+BASE_URL = 'https://udn.com/search/word/2/空汙'
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingFrontier(BackfillFrontier):
+    """記錄 crash_after 則結果後模擬程序當機"""
+
+    crash_after = None
+
+    def finish(self, url, news_item, source):
+        if self.crash_after == 0:
+            raise Crash()
+        self.crash_after -= 1
+        super().finish(url, news_item, source)
+
+
+def run(frontier, store, **kwargs):
+    crawler.search_page_cache = ValidatorCache()
+    return asyncio.run(crawler.backfill_async(frontier, store=store, rate=1000, **kwargs))
+
+
+def test_resume_after_crash(crawl_env, store):
+    """當機時未寫入存檔點的新聞放回 pending，續傳時從本地儲存讀取，其餘才下載"""
+    crawler.use_cassette(make_sample_cassette(story_count=30, page_size=10))
+    frontier = CrashingFrontier('crash', store.path, base_url=BASE_URL, end_page=3, checkpoint_every=5)
+    frontier.crash_after = 7
+    with pytest.raises(Crash):
+        run(frontier, store, batch_size=10)
+    stored_before = store.count()
+
+    resumed = BackfillFrontier('crash', store.path, checkpoint_every=5)
+    assert resumed.status()['counts'][DONE] == 5 and resumed.status()['next_page'] == 2
+    processed, summary = run(resumed, store, batch_size=10)
+
+    status = resumed.status()
+    assert status['counts'] == {PENDING: 0, 'in_flight': 0, DONE: 30, FAILED: 0}
+    assert resumed.complete() and processed == 25
+    assert summary['counters']['stories']['fetched'] == 30 - stored_before  # 已下載的新聞不重新下載
+    print("✅ 當機後續傳正確")
+
+
+def test_page_range_and_since(crawl_env, store):
+    """end_page 限定走訪的頁數；一批新聞全部早於 since 時不再載入更多頁；搜尋頁失敗不推進頁數"""
+    crawler.use_cassette(make_sample_cassette(story_count=30, page_size=10))
+    frontier = BackfillFrontier('pages', store.path, base_url=BASE_URL, start_page=2, end_page=2)
+    processed, _ = run(frontier, store)
+    assert processed == 10 and frontier.complete()
+
+    missing = BackfillFrontier('missing', store.path, base_url=BASE_URL, start_page=5)
+    assert run(missing, store)[0] == 0
+    assert missing.status()['next_page'] == 5 and not missing.exhausted
+
+    dated = BackfillFrontier('dated', store.path, base_url=BASE_URL, since=1704038400)  # 2024-01-01
+    dated.end_batch([{'published_at': '2024-01-03T10:00:00+08:00'}, None])
+    assert not dated.exhausted
+    dated.end_batch([{'published_at': '2023-12-30T10:00:00+08:00'}, {'published_at': None}])
+    assert dated.exhausted
+    print("✅ 頁數與時間範圍正確")
+
+
+def test_shifted_search_results(crawl_env, store):
+    """回填期間搜尋結果往後移，整頁都是已看過的新聞時繼續載入下一頁；沒有結果或連續多頁沒有新新聞時才停止"""
+    cassette = make_sample_cassette(story_count=30, page_size=10)
+    page_url = functools.partial(search_page_url, BASE_URL)
+    cassette.entries[page_url(2)] = cassette.entries[page_url(1)]  # 新發佈的新聞把第 1 頁的結果推到第 2 頁
+    crawler.use_cassette(cassette)
+    frontier = BackfillFrontier('shifted', store.path, base_url=BASE_URL, end_page=3)
+    processed, _ = run(frontier, store)
+    assert processed == 20 and frontier.complete()
+    assert frontier.status()['counts'][DONE] == 20
+
+    cassette.add(page_url(4), 200, {'Content-Type': 'text/html; charset=utf-8'}, make_search_page([]).encode('utf-8'))
+    empty = BackfillFrontier('empty', store.path, base_url=BASE_URL, start_page=4)
+    assert run(empty, store)[0] == 0 and empty.complete()
+
+    cassette.entries[page_url(3)] = cassette.entries[page_url(1)]
+    stale = BackfillFrontier('stale', store.path, base_url=BASE_URL, max_stale_pages=2)
+    run(stale, store)
+    assert stale.status()['counts'][DONE] == 10 and stale.exhausted and stale.status()['next_page'] == 4
+    print("✅ 搜尋結果位移時繼續回填")
+
+
+def test_failed_attempts(tmp_path):
+    """失敗未達上限前放回 pending，重試用盡後為 failed，retry_failed 重新排入"""
+    frontier = BackfillFrontier('retry', str(tmp_path / 'articles.db'), base_url=BASE_URL, checkpoint_every=100, max_attempts=2)
+    url = 'https://udn.com/news/story/7266/1'
+    frontier._conn.execute(
+        "INSERT INTO backfill_urls (job, url, page, state, updated_at) VALUES ('retry', ?, 1, 'pending', 0)", (url,)
+    )
+    for expected in (PENDING, FAILED):
+        assert frontier.take(10) == [url]
+        frontier.finish(url, None, 'failed')
+        frontier.checkpoint()
+        assert frontier.status()['counts'][expected] == 1
+    assert frontier.retry_failed() == 1 and frontier.pending_count() == 1
+    print("✅ 失敗重試正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+多主題爬取工作測試腳本
+驗證 crawl_job.py 的主題組合、邊界合併去重與新聞分配
+"""
+
+import pytest
+
+from crawl_job import CrawlJob, Topic, news_for_query, search_url
+
+
+def story(n, category=7266):
+    return f'https://udn.com/news/story/{category}/{n}'
+
+
+def test_topics():
+    """關鍵字 × 分類的所有組合，重複的關鍵字只算一次"""
+    job = CrawlJob(['空汙', 'PM2.5', '空汙', ' '], categories=['2', 1])
+    assert [topic.key for topic in job.topics()] == ['2/空汙', '1/空汙', '2/PM2.5', '1/PM2.5']
+    assert Topic('空汙', 2).url == search_url('空汙', 2) == 'https://udn.com/search/word/2/空汙'
+    print("✅ 主題組合正確")
+
+
+def test_merge_frontiers():
+    """重疊的新聞只出現一次，由新到舊排序"""
+    topic_urls = {
+        '2/空汙': [story(5), story(3), story(1)],
+        '2/PM2.5': [story(4), story(3), story(2)],
+    }
+    assert CrawlJob.merge_frontiers(topic_urls) == [story(n) for n in (5, 4, 3, 2, 1)]
+    print("✅ 邊界合併去重正確")
+
+
+def test_build_result_fan_out():
+    """同一則新聞分配給所有搜尋到它的主題，且共用同一個 dict"""
+    topic_urls = {
+        '2/空汙': [story(3), story(1)],
+        '2/PM2.5': [story(3), story(2)],
+    }
+    articles = {url: {'title': url, 'url': url} for url in (story(3), story(2))}  # story(1) 解析失敗
+    result = CrawlJob.build_result(topic_urls, articles)
+
+    assert result['article_count'] == 2
+    assert [item['url'] for item in result['topics']['2/空汙']] == [story(3)]
+    assert [item['url'] for item in result['topics']['2/PM2.5']] == [story(3), story(2)]
+    assert result['topics']['2/空汙'][0] is result['topics']['2/PM2.5'][0]
+    assert articles[story(3)]['topics'] == ['2/空汙', '2/PM2.5']
+    print("✅ 新聞分配正確")
+
+
+def test_news_for_query():
+    """依關鍵字查詢，跨分類合併；沒有主題時回傳 None"""
+    a, b, c = ({'url': story(n)} for n in (1, 2, 3))
+    result = {'topics': {'2/空汙': [c, a], '1/空汙': [b, a], '2/PM2.5': [b]}}
+
+    assert [item['url'] for item in news_for_query(result, '空汙')] == [story(3), story(2), story(1)]
+    assert news_for_query(result, '空汙', category=1) == [b, a]
+    assert news_for_query(result, '颱風') is None
+    print("✅ 關鍵字查詢正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
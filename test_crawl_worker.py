@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+爬蟲工作程序測試腳本
+驗證 crawl_worker.py 的檔案鎖、排程與快照寫入，以及 API 在 store 模式下只讀取快照
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pytest
+
+import app as api
+from crawl_job import CrawlJob
+from crawl_worker import CrawlLock, CrawlWorker, CronSchedule, IntervalSchedule, NEWS_SNAPSHOT, JOB_SNAPSHOT
+from news_cache import NewsCache
+from response_cache import EncodedResponseCache
+
+SUMMARY = {'started_at': 0, 'elapsed': 1.0, 'counters': {}, 'stages': {}}
+
+
+def story(n):
+    return f'https://udn.com/news/story/7266/{n}'
+
+
+def news_item(n):
+    return {'title': f'新聞 {n}', 'publish_time': '', 'reporter': '', 'content': '內容',
+            'url': story(n), 'images': []}
+
+
+def fake_scrape(limit, store, with_summary, **options):
+    return [news_item(n) for n in range(limit, 0, -1)], SUMMARY
+
+
+def fake_job(job, store, **options):
+    items = [news_item(2), news_item(1)]
+    return {'topics': {'2/空汙': items}, 'article_count': len(items), 'summary': SUMMARY}
+
+
+def test_lock_is_exclusive(tmp_path):
+    """同一個鎖檔同時只能被一個持有者取得，釋放後可再取得"""
+    path = str(tmp_path / 'crawl.lock')
+    first, second = CrawlLock(path), CrawlLock(path)
+    assert first.acquire()
+    assert not second.acquire()
+    assert str(os.getpid()) in first.holder()
+    first.release()
+    assert second.acquire()
+    second.release()
+    print("✅ 檔案鎖互斥正確")
+
+
+def test_schedules():
+    assert IntervalSchedule(300).next_after(1000) == 1300
+
+    start = datetime(2024, 1, 1, 10, 7, 30).timestamp()
+    every_ten = CronSchedule('*/10 * * * *')
+    assert datetime.fromtimestamp(every_ten.next_after(start)) == datetime(2024, 1, 1, 10, 10)
+
+    working_hours = CronSchedule('0 9-17 * * 1-5')  # 2024-01-06 是星期六
+    friday_evening = datetime(2024, 1, 5, 18, 0).timestamp()
+    assert datetime.fromtimestamp(working_hours.next_after(friday_evening)) == datetime(2024, 1, 8, 9, 0)
+
+    for bad in ('* * * *', '60 * * * *', '*/0 * * * *'):
+        try:
+            CronSchedule(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✅ 排程計算正確")
+
+
+def test_run_once_writes_snapshots(store):
+    lock = CrawlLock(store.path + '.lock')
+    worker = CrawlWorker(store=store, lock=lock, job=CrawlJob(['空汙']), limit=5, options={},
+                         scrape=fake_scrape, run_job=fake_job)
+    assert worker.run_once()
+
+    news = store.get_snapshot(NEWS_SNAPSHOT)
+    assert [item['url'] for item in news['data']] == [story(n) for n in (5, 4, 3, 2, 1)]
+    assert news['summary'] == SUMMARY
+    job = store.get_snapshot(JOB_SNAPSHOT)
+    assert job['data']['article_count'] == 2 and 'summary' not in job['data']
+
+    # 其他程序持有鎖時跳過
+    other = CrawlLock(lock.path)
+    assert other.acquire()
+    assert not worker.run_once()
+    other.release()
+    assert worker.runs == 1
+    print("✅ 快照寫入與鎖定正確")
+
+
+def test_failed_crawl_keeps_snapshot(store):
+    store.save_snapshot(NEWS_SNAPSHOT, [news_item(1)])
+
+    def broken(**kwargs):
+        raise RuntimeError('udn.com 無回應')
+
+    worker = CrawlWorker(store=store, lock=CrawlLock(store.path + '.lock'), job=False, options={},
+                         scrape=broken)
+    assert not worker.run_once()
+    assert [item['url'] for item in store.get_snapshot(NEWS_SNAPSHOT)['data']] == [story(1)]
+    assert CrawlLock(store.path + '.lock').acquire()  # 失敗後仍釋放鎖
+    print("✅ 爬取失敗時保留舊快照")
+
+
+def test_run_forever_stops(store, tmp_path):
+    calls = []
+    worker = CrawlWorker(store=store, lock=CrawlLock(str(tmp_path / 'crawl.lock')), job=False, options={},
+                         scrape=lambda **kwargs: calls.append(time.time()) or ([news_item(1)], SUMMARY))
+    stop = threading.Event()
+    thread = threading.Thread(target=worker.run_forever, args=(IntervalSchedule(0.05), stop))
+    thread.start()
+    time.sleep(0.3)
+    stop.set()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert len(calls) >= 3
+    print("✅ 排程執行與停止正確")
+
+
+def test_api_reads_store(default_store, monkeypatch):
+    """store 模式下 API 只讀取快照並從中分頁，不會啟動爬蟲"""
+    default_store.save_snapshot(NEWS_SNAPSHOT, [news_item(n) for n in range(20, 0, -1)], SUMMARY)
+    monkeypatch.setattr(api, 'NEWS_SOURCE', 'store')
+    monkeypatch.setattr(api, 'news_cache', NewsCache(api.load_news, ttl=10))
+    monkeypatch.setattr(api, 'window_caches', OrderedDict())
+    monkeypatch.setattr(api, 'scrape_news', None)  # 呼叫爬蟲會直接失敗
+
+    client = api.app.test_client()
+    body = client.get('/api/news').get_json()
+    assert [item['url'] for item in body['data']] == [story(n) for n in range(20, 10, -1)]
+
+    body = client.get('/api/news', query_string={'cursor': body['pagination']['next_cursor'],
+                                                 'limit': 5}).get_json()
+    assert [item['url'] for item in body['data']] == [story(n) for n in range(10, 5, -1)]
+
+    health = client.get('/api/health').get_json()
+    assert health['news_source'] == 'store' and health['last_crawl'] == SUMMARY
+    print("✅ API 讀取快照正確")
+
+
+def test_api_empty_job(default_store, monkeypatch):
+    """爬取工作沒有任何新聞時，設定中的關鍵字回傳空結果，只有不在設定中的關鍵字回傳 404"""
+    monkeypatch.setattr(api, 'NEWS_SOURCE', 'store')
+    monkeypatch.setattr(api, 'news_job', CrawlJob(['空汙']))
+    monkeypatch.setattr(api, 'job_cache', NewsCache(api.load_job, ttl=10,
+                                                    is_empty=lambda result: not result['article_count']))
+    monkeypatch.setattr(api, 'encoded_responses', EncodedResponseCache())
+
+    client = api.app.test_client()
+    response = client.get('/api/news', query_string={'q': '空汙'})
+    assert response.status_code == 200 and response.get_json()['count'] == 0
+    assert client.get('/api/news', query_string={'q': '颱風'}).status_code == 404
+    assert client.get('/api/news', query_string={'q': '空汙', 'category': 1}).status_code == 404
+
+    default_store.save_snapshot(JOB_SNAPSHOT, fake_job(api.news_job, default_store))
+    api.job_cache.refresh().wait(5)
+    body = client.get('/api/news', query_string={'q': '空汙'}).get_json()
+    assert [item['url'] for item in body['data']] == [story(2), story(1)]
+    print("✅ 空的爬取工作結果正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+近似重複新聞測試腳本
+驗證 dedupe.py 的內容指紋與 LSH 分群、爬取結果與多主題工作的合併，以及本地儲存的內文變更判斷
+"""
+
+import pytest
+
+import crawler
+from crawl_job import CrawlJob, news_for_query
+from dedupe import DuplicateIndex, collapse, content_hash, minhash, similarity
+from replay import make_sample_cassette
+from sample_pages import make_story_page, story_url
+
+WIRE = '\n'.join([
+    '行政院環境部今天公布上週空氣品質監測結果，中南部測站細懸浮微粒濃度多日超過標準。',
+    '環境部表示，東北季風減弱、大氣擴散條件不佳，加上境外污染物移入，造成空品惡化。',
+    '環境部呼籲敏感族群減少戶外活動，外出時配戴口罩，並留意各地空品監測站的即時資訊。',
+    '環境部也將加強稽查工廠與營建工地，要求業者落實各項污染防制措施，避免情況持續。',
+])
+REPUBLISHED = '（中央社記者陳小華台北15日電）\n' + WIRE.replace('。', '. ') + '\n延伸閱讀'
+OTHER = '\n'.join([
+    '台北市立動物園今天宣布，園區內的大貓熊寶寶已經滿週歲，將在週末舉辦慶生活動。',
+    '園方表示，慶生活動將準備特製的竹筍蛋糕，並開放民眾在指定時段入園參觀拍照。',
+])
+
+
+def news(n, content):
+    return {'title': f'新聞 {n}', 'url': story_url(n), 'content': content, 'images': []}
+
+
+def test_fingerprints():
+    """內容雜湊忽略空白與標點；轉載的新聞相似度高，無關的新聞相似度低"""
+    assert content_hash(WIRE) == content_hash(WIRE.replace('\n', ' ').replace('。', '.'))
+    assert content_hash(WIRE) != content_hash(REPUBLISHED)
+    assert similarity(minhash(WIRE), minhash(REPUBLISHED)) >= 0.7
+    assert similarity(minhash(WIRE), minhash(OTHER)) < 0.2
+    assert minhash('') is None
+
+    index = DuplicateIndex()
+    assert index.add('a', WIRE) == 'a'
+    assert index.add('b', OTHER) == 'b'
+    assert index.add('c', REPUBLISHED) == 'a'
+    assert index.add('d', WIRE) == 'a'
+    assert index.find(REPUBLISHED + '\n更多新聞') == 'a' and index.find('完全不同的內容') is None
+    assert index.clusters == {'a': ['a', 'c', 'd'], 'b': ['b']}
+    print("✅ 內容指紋與分群正確")
+
+
+def test_collapse():
+    """每群保留最前面的一則並附上其他URL；多主題工作在各主題與跨分類查詢時同樣只出現一次"""
+    items = [news(4, REPUBLISHED), news(3, OTHER), news(2, WIRE)]
+    kept = collapse(items)
+    assert [item['url'] for item in kept] == [story_url(4), story_url(3)]
+    assert kept[0]['alternate_urls'] == [story_url(2)] and 'alternate_urls' not in kept[1]
+
+    topic_urls = {'2/空汙': [story_url(3), story_url(2)], '1/空汙': [story_url(4)]}
+    articles = {item['url']: news(int(item['url'].rsplit('/', 1)[1]), item['content']) for item in items}
+    result = CrawlJob.build_result(topic_urls, articles, dedupe=True)
+    assert [item['url'] for item in result['topics']['2/空汙']] == [story_url(3), story_url(2)]
+    assert articles[story_url(2)]['alternate_urls'] == [story_url(4)]
+    assert [item['url'] for item in news_for_query(result, '空汙')] == [story_url(4), story_url(3)]
+    print("✅ 近似重複合併正確")
+
+
+def test_short_content_is_not_clustered():
+    """內文為空或太短（只有標題、圖說）的新聞各自保留，不因內文相同而合併"""
+    items = [news(1, ''), news(2, '...'), news(3, '圖／聯合報'), news(4, '圖／聯合報'), news(5, WIRE)]
+    kept = collapse(items)
+    assert [item['url'] for item in kept] == [story_url(n) for n in range(1, 6)]
+    assert not any('alternate_urls' in item for item in kept)
+
+    index = DuplicateIndex()
+    assert index.add('a', '') == 'a' and index.add('b', '') == 'b'
+    assert index.find('') is None and index.find('圖／聯合報') is None
+    print("✅ 太短的內文不參與分群")
+
+
+def test_stored_duplicates(store):
+    """之前儲存的相同新聞以保存的簽章找出，列入新爬取新聞的 alternate_urls；內文改變或失效時更新簽章"""
+    store.save(story_url(1), news(1, WIRE))
+    store.save(story_url(2), news(2, OTHER))
+    assert store.find_duplicates(WIRE) == [story_url(1)]  # content_hash 完全相同
+    assert store.find_duplicates(REPUBLISHED) == [story_url(1)]  # LSH 近似
+    assert store.find_duplicates('圖／聯合報') == []
+
+    items = [news(3, REPUBLISHED), news(4, OTHER + '\n（更新）')]
+    kept = collapse(items, store=store)
+    assert [item['url'] for item in kept] == [story_url(3), story_url(4)]
+    assert kept[0]['alternate_urls'] == [story_url(1)] and kept[1]['alternate_urls'] == [story_url(2)]
+
+    store.save(story_url(1), None)
+    store.save(story_url(2), news(2, REPUBLISHED))
+    assert store.find_duplicates(WIRE, exclude={story_url(3)}) == [story_url(2)]
+    print("✅ 比對已儲存的新聞正確")
+
+
+def test_scrape_collapses_republished_story(crawl_env, store):
+    """同一篇稿件以兩個新聞URL刊出時，爬取結果只保留一則；儲存時以內文雜湊判斷內容是否改變"""
+    cassette = make_sample_cassette(story_count=4)
+    original = cassette.entries[story_url(1002)]
+    cassette.entries[story_url(1001)] = dict(original, headers={'ETag': '"copy"'})
+
+    crawler.use_cassette(cassette)
+    reported = []
+    news_data, summary = crawler.scrape_news(limit=4, rate=1000, store=store, with_summary=True,
+                                             progress=reported.append)
+    assert crawler.scrape_news(limit=4, rate=1000, store=store, dedupe=False)[-1]['url'] == story_url(1001)
+
+    assert [item['url'] for item in news_data] == [story_url(n) for n in (1004, 1003, 1002)]
+    assert news_data[2]['alternate_urls'] == [story_url(1001)]
+    assert len(reported) == 3 and {item['url'] for item in reported} == {item['url'] for item in news_data}
+    assert summary['counters']['duplicates'] == 1
+    assert summary['stages']['dedupe']['count'] == 2  # 補足時搜尋結果已用盡
+
+    item = store.to_news_item(store.get(story_url(1003)))
+    assert store.save(story_url(1003), item, etag='"v2"') is False
+    assert store.save(story_url(1003), dict(item.as_dict(), content=item['content'] + '（更新）')) is True
+    assert store.save(story_url(9), crawler.parse_story(make_story_page(9), story_url(9))) is True
+    assert store.get(story_url(1002))['content_hash'] == store.get(story_url(1001))['content_hash']
+    print("✅ 爬取結果合併轉載新聞正確")
+
+
+def test_scrape_tops_up_after_collapse(crawl_env, store):
+    """合併掉的重複新聞不佔 limit 的名額，從搜尋結果接著選取補足；offset 與 cursor 同樣適用"""
+    cassette = make_sample_cassette(story_count=12, page_size=10)
+    cassette.entries[story_url(1011)] = dict(cassette.entries[story_url(1012)], headers={'ETag': '"copy"'})
+    crawler.use_cassette(cassette)
+
+    news_data = crawler.scrape_news(limit=4, rate=1000, store=store)
+    assert [item['url'] for item in news_data] == [story_url(n) for n in (1012, 1010, 1009, 1008)]
+    assert news_data[0]['alternate_urls'] == [story_url(1011)]
+
+    cassette.entries[story_url(1003)] = dict(cassette.entries[story_url(1004)], headers={'ETag': '"copy"'})
+    by_offset = crawler.scrape_news(limit=3, offset=8, rate=1000, store=store)
+    by_cursor = crawler.scrape_news(limit=3, cursor='1005', rate=1000, store=store)
+    assert [item['url'] for item in by_offset] == [item['url'] for item in by_cursor] == \
+        [story_url(n) for n in (1004, 1002, 1001)]
+    print("✅ 合併重複新聞後補足 limit")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
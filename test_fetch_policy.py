@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+請求策略測試腳本
+驗證 fetch_policy.py 的退避時間與 Retry-After、斷路器狀態、自適應並發，
+以及爬蟲遇到 503 時重試、主機斷路時沿用已儲存的結果
+"""
+
+import asyncio
+import random
+
+import pytest
+
+import crawler
+import metrics
+from fetch_policy import (AdaptiveConcurrency, CircuitBreaker, CircuitOpenError, FetchPolicy,
+                          HostCircuitBreakers, RetryPolicy, CLOSED, HALF_OPEN, OPEN, parse_retry_after)
+from rate_limiter import HostRateLimiter
+from replay import make_sample_cassette
+from replay_server import ReplayServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_retry_delay():
+    """退避時間在 0 到 base_delay × 2^attempt（上限 max_delay）之間，至少等待 Retry-After，超過上限不重試"""
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, max_retry_after=10.0, rng=random.Random(1))
+    for attempt in range(6):
+        for _ in range(50):
+            assert 0 <= policy.delay(attempt) <= min(5.0, 2 ** attempt)
+    assert policy.delay(0, retry_after=3) >= 3
+    assert policy.delay(0, retry_after=11) is None
+    assert policy.should_retry_status(503) and not policy.should_retry_status(404)
+
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:30 GMT', now=1445412480) == 30
+    assert parse_retry_after('soon') is None and parse_retry_after(None) is None
+    print("✅ 退避時間與 Retry-After 正確")
+
+
+def test_circuit_breaker():
+    """連續失敗達門檻後斷路，冷卻後只放行一個試探請求，試探失敗加倍冷卻、成功則恢復"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    assert [breaker.record_failure() for _ in range(3)] == [False, False, True]
+    assert breaker.state == OPEN and not breaker.allow() and breaker.retry_in() == 10
+
+    clock.now = 10
+    assert breaker.allow() == HALF_OPEN and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # 試探請求進行中
+    assert breaker.record_failure() and breaker.retry_in() == 20
+
+    clock.now = 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0 and breaker.allow() == CLOSED
+
+    breakers = HostCircuitBreakers(failure_threshold=1)
+    host, other = breakers.for_url('https://udn.com/news/story/7266/1')
+    assert host == 'udn.com' and breakers.for_url('https://udn.com/search')[1] is other
+    other.record_failure()
+    assert list(breakers.unhealthy()) == ['udn.com']
+    print("✅ 斷路器狀態正確")
+
+
+def test_adaptive_concurrency():
+    """失敗或延遲升高時並發減半（同一波只減一次），持續成功時逐步回升，同時進行的請求不超過上限"""
+    clock = FakeClock()
+    limiter = AdaptiveConcurrency(8, clock=clock)
+    limiter.record(0.1, ok=False)
+    limiter.record(0.1, ok=False)
+    assert limiter.limit == 4 and limiter.decreases == 1
+
+    clock.now = 5
+    for _ in range(20):
+        limiter.record(0.1, ok=True)
+    assert 4 < limiter.limit <= 8
+    before = limiter.limit
+    for _ in range(10):
+        limiter.record(2.0, ok=True)  # 延遲從 0.1 秒升到 2 秒
+    assert limiter.limit < before
+
+    async def run():
+        limiter = AdaptiveConcurrency(2)
+        active = peak = 0
+
+        async def request():
+            nonlocal active, peak
+            async with limiter:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(request() for _ in range(6)))
+        return peak
+
+    assert asyncio.run(run()) == 2
+    print("✅ 自適應並發正確")
+
+
+def test_retry_on_status(crawl_env, store):
+    """伺服器回應 503 時依 Retry-After 重試，所有新聞仍成功下載"""
+    retries = metrics.registry.value('crawler_retries_total')
+    with ReplayServer(make_sample_cassette(story_count=4), error_rate=0.2, error_status=503, seed=2) as server:
+        crawler.ORIGIN_OVERRIDES['https://udn.com'] = server.url
+        news, summary = crawler.scrape_news(limit=4, rate=1000, store=store, with_summary=True)
+        stats = dict(server.stats)
+
+    assert len(news) == 4 and summary['counters']['stories'] == {'fetched': 4}
+    assert stats['errors'] > 0
+    assert metrics.registry.value('crawler_retries_total') - retries == stats['errors']
+    assert summary['stages']['retry_backoff']['total'] >= stats['errors']  # Retry-After: 1
+    print("✅ 503 回應重試正確")
+
+
+def test_cancelled_probe_releases_breaker(crawl_env):
+    """試探請求進行中被取消時釋放試探名額，下一個請求可以再試探"""
+    clock = FakeClock()
+    policy = FetchPolicy(breakers=HostCircuitBreakers(failure_threshold=1, reset_timeout=10, clock=clock))
+
+    with ReplayServer(make_sample_cassette(story_count=1), latency=5) as server:
+        crawler.ORIGIN_OVERRIDES['https://udn.com'] = server.url
+        story_url = 'https://udn.com/news/story/7266/1001'
+        host, breaker = policy.breakers.for_url(crawler.request_url(story_url))
+        breaker.record_failure()
+        clock.now = 10
+
+        async def run():
+            limiter = HostRateLimiter(rate=1000)
+            async with crawler.create_client_session() as session:
+                probe = asyncio.ensure_future(crawler.fetch_with_retry(session, story_url, limiter, policy=policy))
+                await asyncio.sleep(0.2)
+                assert breaker.state == HALF_OPEN and not breaker.allow()
+                probe.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await probe
+
+        asyncio.run(run())
+
+    assert breaker.state == HALF_OPEN and breaker.allow()
+    print("✅ 取消試探請求後斷路器可再試探")
+
+
+def test_cancelled_request_keeps_others_probe(crawl_env):
+    """斷路前送出的請求被取消時不會釋放其他請求持有的試探名額"""
+    clock = FakeClock()
+    policy = FetchPolicy(breakers=HostCircuitBreakers(failure_threshold=1, reset_timeout=10, clock=clock))
+
+    with ReplayServer(make_sample_cassette(story_count=1), latency=5) as server:
+        crawler.ORIGIN_OVERRIDES['https://udn.com'] = server.url
+        story_url = 'https://udn.com/news/story/7266/1001'
+        host, breaker = policy.breakers.for_url(crawler.request_url(story_url))
+
+        async def run():
+            limiter = HostRateLimiter(rate=1000)
+            async with crawler.create_client_session() as session:
+                request = asyncio.ensure_future(crawler.fetch_with_retry(session, story_url, limiter, policy=policy))
+                await asyncio.sleep(0.2)
+                breaker.record_failure()
+                clock.now = 10
+                assert breaker.allow() == HALF_OPEN  # 其他請求取得試探名額
+                request.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await request
+
+        asyncio.run(run())
+
+    assert breaker.state == HALF_OPEN and not breaker.allow()
+    print("✅ 取消非試探請求時保留試探名額")
+
+
+def test_open_circuit_serves_stale(crawl_env, store):
+    """主機斷路時不送出請求，新聞與搜尋頁沿用已儲存的結果，沒有舊結果時立即失敗"""
+    crawler.use_cassette(make_sample_cassette(story_count=2))
+    crawler.scrape_news(limit=2, rate=1000, store=store)
+    crawler.use_cassette(None)
+    cache = crawler.search_page_cache
+    story_url, search_url = 'https://udn.com/news/story/7266/1002', 'https://udn.com/search/word/2/空汙'
+
+    policy = FetchPolicy(breakers=HostCircuitBreakers(failure_threshold=1, reset_timeout=60))
+    policy.breakers.for_url(story_url)[1].record_failure()
+    rejections = metrics.registry.value('crawler_circuit_rejections_total')
+
+    async def run():
+        limiter = HostRateLimiter(rate=1000)
+        async with crawler.create_client_session() as session:
+            stale = await crawler.fetch_story(session, story_url, limiter, store,
+                                              revalidate_after=0, policy=policy)
+            missing = await crawler.fetch_story(session, 'https://udn.com/news/story/7266/9', limiter, store,
+                                                revalidate_after=0, policy=policy)
+            urls = await crawler.fetch_search_page(session, search_url, limiter, cache=cache, policy=policy)
+            try:
+                await crawler.fetch_search_page(session, search_url + '/2', limiter, cache=cache, policy=policy)
+                assert False
+            except CircuitOpenError as e:
+                assert e.host == 'udn.com' and e.retry_in > 0
+            return stale, missing, urls
+
+    (item, source), missing, urls = asyncio.run(run())
+    assert source == 'stale' and item['url'] == story_url
+    assert missing == (None, 'failed')
+    assert urls == cache.get(search_url)['parsed'] and len(urls) == 2
+    assert metrics.registry.value('crawler_circuit_rejections_total') - rejections == 4
+    print("✅ 斷路時沿用已儲存的結果")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+搜尋結果邊界測試腳本
+以假的搜尋頁驗證 frontier.py 的延遲載入、排序與 limit/offset/cursor 分頁
+"""
+
+import asyncio
+
+import pytest
+
+import crawler
+from frontier import SearchFrontier, search_page_url, story_id, encode_cursor
+from replay import make_sample_cassette
+from sample_pages import make_search_page, story_url
+
+BASE_URL = 'https://udn.com/search/word/2/空汙'
+
+
+def story(n):
+    return f'https://udn.com/news/story/7266/{n}'
+
+
+class FakeSearch:
+    """每頁 5 則，共 4 頁；記錄被請求的頁面"""
+
+    def __init__(self):
+        self.pages = {
+            search_page_url(BASE_URL, page): [story(100 - (page - 1) * 5 - i) for i in (3, 0, 4, 1, 2)]
+            for page in range(1, 5)
+        }
+        self.requested = []
+
+    async def __call__(self, url):
+        self.requested.append(url)
+        return self.pages.get(url, [])
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_story_id():
+    assert story_id(story(7712345) + '?from=search') == 7712345
+    assert story_id('https://udn.com/news/cate/2') == 0
+    print("✅ 新聞ID解析正確")
+
+
+def test_lazy_offset_window():
+    """只載入取得區段所需的頁數，結果由新到舊"""
+    search = FakeSearch()
+    frontier = SearchFrontier(BASE_URL, search)
+
+    urls = run(frontier.window(limit=4, offset=3))
+    assert urls == [story(97), story(96), story(95), story(94)]
+    assert search.requested == [BASE_URL, search_page_url(BASE_URL, 2)]
+    print("✅ offset 區段只載入 2 頁")
+
+
+def test_cursor_window():
+    """游標之後的區段與 offset 區段一致"""
+    search = FakeSearch()
+    frontier = SearchFrontier(BASE_URL, search)
+    first = run(frontier.window(limit=6))
+    cursor = encode_cursor(first[-1])
+
+    frontier = SearchFrontier(BASE_URL, FakeSearch())
+    after_cursor = run(frontier.window(limit=6, cursor=cursor))
+    frontier = SearchFrontier(BASE_URL, FakeSearch())
+    by_offset = run(frontier.window(limit=6, offset=6))
+
+    assert after_cursor == by_offset == [story(n) for n in range(94, 88, -1)]
+    print("✅ 游標分頁正確")
+
+
+def test_exhausted():
+    """超出結果數量時回傳剩餘部分，不再請求更多頁"""
+    search = FakeSearch()
+    frontier = SearchFrontier(BASE_URL, search)
+    urls = run(frontier.window(limit=10, offset=15))
+
+    assert urls == [story(n) for n in range(85, 80, -1)]
+    assert frontier.exhausted
+    assert len(search.requested) == 5  # 4 頁 + 1 個空白頁
+    print("✅ 結果用盡時正確停止")
+
+
+def test_max_pages():
+    search = FakeSearch()
+    frontier = SearchFrontier(BASE_URL, search, max_pages=2)
+    urls = run(frontier.window(limit=20))
+    assert len(urls) == 10
+    assert len(search.requested) == 2
+    print("✅ 頁數上限正確")
+
+
+def test_newer_than_stops_at_known():
+    """增量模式遇到已知新聞即停止載入"""
+    search = FakeSearch()
+    frontier = SearchFrontier(BASE_URL, search)
+    assert run(frontier.newer_than(high_water=100, limit=10)) == []
+    assert search.requested == [BASE_URL]
+
+    search = FakeSearch()
+    frontier = SearchFrontier(BASE_URL, search)
+    assert run(frontier.newer_than(high_water=93, limit=10)) == [story(n) for n in range(100, 93, -1)]
+    assert len(search.requested) == 2
+    print("✅ 增量載入在已知範圍停止")
+
+
+def test_incremental_crawl(crawl_env, store):
+    """增量爬取時 limit 變大會從搜尋結果補足；已儲存的新聞過了驗證間隔仍重新驗證"""
+    crawler.use_cassette(make_sample_cassette(story_count=12, page_size=5))
+    assert len(crawler.scrape_news(limit=3, rate=1000, store=store, incremental=True)) == 3
+
+    news, summary = crawler.scrape_news(limit=10, rate=1000, store=store, incremental=True, with_summary=True)
+    assert [item['url'] for item in news] == [story_url(n) for n in range(1012, 1002, -1)]
+    assert summary['counters']['stories'] == {'store': 3, 'fetched': 7}
+
+    with store._conn:
+        store._conn.execute('UPDATE articles SET checked_at = 0')
+    news, summary = crawler.scrape_news(limit=10, rate=1000, store=store, incremental=True, with_summary=True)
+    assert len(news) == 10 and summary['counters']['stories'] == {'revalidated': 10}
+    print("✅ 增量爬取補足與重新驗證正確")
+
+
+def test_incremental_short_listing(crawl_env, store):
+    """搜尋結果不足 limit 則時記錄已用盡，之後的增量爬取不再補足；不同 limit 的高水位分開記錄"""
+    cassette = make_sample_cassette(story_count=3, page_size=5)
+    cassette.add(search_page_url(crawler.BASE_URL, 2), 200, {'Content-Type': 'text/html; charset=utf-8'},
+                 make_search_page([]).encode('utf-8'))  # 最後一頁之後是空白的搜尋結果
+    crawler.use_cassette(cassette)
+    assert len(crawler.scrape_news(limit=5, rate=1000, store=store, incremental=True)) == 3
+    assert store.get_crawl_state(crawler.incremental_state_key(crawler.BASE_URL, 5))['exhausted']
+
+    news, summary = crawler.scrape_news(limit=5, rate=1000, store=store, incremental=True, with_summary=True)
+    assert len(news) == 3 and summary['stages']['search_page']['count'] == 1
+
+    assert len(crawler.scrape_news(limit=2, rate=1000, store=store, incremental=True)) == 2
+    state = store.get_crawl_state(crawler.incremental_state_key(crawler.BASE_URL, 5))
+    assert len(state['urls']) == 3 and state['exhausted']
+    assert not store.get_crawl_state(crawler.incremental_state_key(crawler.BASE_URL, 2))['exhausted']
+    print("✅ 搜尋結果用盡時不再補足")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
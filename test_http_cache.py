@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+條件請求快取測試腳本
+驗證 http_cache.py 的驗證資訊記錄、LRU 上限與命中統計
+"""
+
+import pytest
+
+from http_cache import ValidatorCache, ConditionalStats, conditional_headers
+
+
+def test_conditional_headers():
+    """依 ETag/Last-Modified 產生條件請求標頭"""
+    assert conditional_headers() == {}
+    assert conditional_headers(etag='"a"') == {'If-None-Match': '"a"'}
+    assert conditional_headers(last_modified='Mon, 01 Jan 2024 00:00:00 GMT') == {
+        'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+    }
+    print("✅ 條件請求標頭正確")
+
+
+def test_validator_cache():
+    """有驗證資訊的回應才會被快取，並受容量上限限制"""
+    cache = ValidatorCache(max_entries=2)
+    cache.put('https://udn.com/a', {}, 100, ['x'])
+    assert cache.get('https://udn.com/a') is None
+
+    cache.put('https://udn.com/a', {'ETag': '"a"'}, 100, ['a'])
+    cache.put('https://udn.com/b', {'Last-Modified': 'yesterday'}, 100, ['b'])
+    cache.get('https://udn.com/a')
+    cache.put('https://udn.com/c', {'ETag': '"c"'}, 100, ['c'])
+
+    assert len(cache) == 2
+    assert cache.get('https://udn.com/b') is None
+    assert cache.get('https://udn.com/a')['parsed'] == ['a']
+    assert cache.headers_for('https://udn.com/c') == {'If-None-Match': '"c"'}
+    print("✅ 驗證快取與 LRU 上限正確")
+
+
+def test_conditional_stats():
+    """命中統計與節省頻寬"""
+    stats = ConditionalStats()
+    stats.record_miss(1000)
+    stats.record_hit(1000)
+    stats.record_hit(1000)
+
+    assert stats.as_dict() == {
+        'hits': 2,
+        'misses': 1,
+        'hit_rate': 66.7,
+        'bytes_downloaded': 1000,
+        'bytes_saved': 2000
+    }
+    print("✅ 命中統計正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+圖片URL過濾測試腳本
+驗證 image_filter.py 以完整URL片段比對關鍵字，不再誤判 upload、header、online 等路徑
+"""
+
+import pytest
+
+from image_filter import ImageUrlRules
+
+rules = ImageUrlRules()
+
+
+def test_keywords_match_whole_components():
+    """包含關鍵字子字串的一般路徑應該放行"""
+    assert rules.is_valid('https://uc.udn.com.tw/upload/2024/01/01/header-1.jpg')
+    assert rules.is_valid('https://uc.udn.com.tw/photo/online/deadline_2.png')
+    assert rules.is_valid('https://uc.udn.com.tw/photo/madrid/leader.webp')
+
+    assert not rules.is_valid('https://s.udn.com.tw/static/font-icons/facebook.png')
+    assert not rules.is_valid('https://s.udn.com.tw/static/font-icons/LINE.png')
+    assert not rules.is_valid('https://s.udn.com.tw/static/ad/banner_3.jpg')
+    assert not rules.is_valid('https://s.udn.com.tw/static/img/logo/udn-logo.png')
+    assert not rules.is_valid('https://udn.com/static/pixel.gif?t=1')
+    print("✅ 關鍵字以完整片段比對")
+
+
+def test_excluded_hosts():
+    """廣告主機與其子網域應該排除"""
+    assert not rules.is_valid('https://ad.doubleclick.net/ddm/123.gif')
+    assert not rules.is_valid('https://tpc.googlesyndication.com/simgad/123.jpg')
+    assert rules.is_valid('https://uc.udn.com.tw/photo/doubleclick.net.jpg')
+    print("✅ 廣告主機被排除")
+
+
+def test_extensions():
+    """副檔名必須在路徑片段或查詢參數值的結尾"""
+    assert rules.is_valid('https://pgw.udn.com.tw/gw/photo.php?u=https://uc.udn.com.tw/photo/1.jpg&x=0&fw=800')
+    assert rules.is_valid('https://uc.udn.com.tw/photo/1.JPEG')
+    assert not rules.is_valid('https://s.udn.com.tw/static/img/icon-share.svg')
+    assert not rules.is_valid('https://uc.udn.com.tw/photo/1.jpgx')
+    assert not rules.is_valid('https://udn.com/news/story/7266/123')
+    print("✅ 副檔名判斷正確")
+
+
+def test_custom_rules_and_cache():
+    custom = ImageUrlRules(exclude_keywords=['thumb'], exclude_hosts=[], extensions=['png'], cache_size=0)
+    assert custom.is_valid('https://example.com/ad/1.png')
+    assert not custom.is_valid('https://example.com/thumb/1.png')
+    assert not custom.is_valid('https://example.com/1.jpg')
+
+    cached = ImageUrlRules(cache_size=8)
+    url = 'https://uc.udn.com.tw/photo/1.jpg'
+    assert cached.is_valid(url) and cached.is_valid(url)
+    assert cached.is_valid.cache_info().hits == 1
+    print("✅ 自訂規則與快取正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+圖片探測測試腳本
+驗證 image_probe.py 從檔頭讀取尺寸、探測結果的持久化快取，以及爬取時為圖片加上尺寸資訊
+"""
+
+import asyncio
+import struct
+
+import pytest
+
+import crawler
+from crawler import FetchResult
+from image_probe import ImageProber, sniff_image, total_size
+from replay import make_sample_cassette
+from sample_pages import make_story_page, story_url
+
+
+def png(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sII', 13, b'IHDR', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00' * 20
+
+
+def jpeg(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, height, width) + b'\x03' + b'\x00' * 9
+    return b'\xff\xd8' + app0 + sof0 + b'\xff\xda'
+
+
+def webp(width, height):
+    chunk = b'VP8X' + struct.pack('<I', 10) + b'\x00' * 4
+    return (b'RIFF' + struct.pack('<I', 30) + b'WEBP' + chunk
+            + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little'))
+
+
+def test_sniff_image():
+    """從檔頭讀出格式與尺寸"""
+    assert sniff_image(png(640, 360)) == ('image/png', 640, 360)
+    assert sniff_image(gif(1, 1)) == ('image/gif', 1, 1)
+    assert sniff_image(jpeg(1024, 768)) == ('image/jpeg', 1024, 768)
+    assert sniff_image(webp(800, 450)) == ('image/webp', 800, 450)
+    assert sniff_image(jpeg(1024, 768)[:10]) == ('image/jpeg', None, None)
+    assert sniff_image(b'<html>') == (None, None, None)
+    print("✅ 圖片檔頭解析正確")
+
+
+def test_total_size():
+    assert total_size(206, {'Content-Range': 'bytes 0-16383/123456'}, b'x' * 16384) == 123456
+    assert total_size(200, {'Content-Length': '2048'}, b'x' * 2048) == 2048
+    assert total_size(200, {}, b'x' * 100) == 100
+    print("✅ 圖片大小計算正確")
+
+
+class FakeImages:
+    """以URL回傳固定圖片內容的假 fetch，記錄請求"""
+
+    def __init__(self, images):
+        self.images = images
+        self.requests = []
+
+    async def __call__(self, url, headers, max_bytes):
+        self.requests.append((url, headers))
+        await asyncio.sleep(0)
+        body = self.images.get(url)
+        if body is None:
+            return FetchResult(url, 404, {}, b'')
+        return FetchResult(url, 206, {'Content-Range': f'bytes 0-{len(body) - 1}/{len(body) * 10}'},
+                           body[:max_bytes])
+
+
+def test_annotate_and_cache(store):
+    """加上尺寸資訊、移除追蹤像素，且每張圖片只探測一次"""
+    fetch = FakeImages({
+        'https://img/a.jpg': jpeg(1200, 800),
+        'https://img/pixel.gif': gif(1, 1),
+    })
+    images = [
+        {'url': 'https://img/a.jpg', 'alt': 'a', 'title': ''},
+        {'url': 'https://img/pixel.gif', 'alt': '', 'title': ''},
+        {'url': 'https://img/missing.png', 'alt': '', 'title': ''},
+        {'url': 'https://img/a.jpg', 'alt': '重複', 'title': ''},
+    ]
+
+    async def run():
+        return await ImageProber(fetch, store).annotate(images)
+
+    annotated = asyncio.run(run())
+    assert [image['alt'] for image in annotated] == ['a', '重複']
+    assert annotated[0]['width'] == 1200 and annotated[0]['height'] == 800
+    assert annotated[0]['mime'] == 'image/jpeg'
+    assert annotated[0]['bytes'] == len(jpeg(1200, 800)) * 10
+    assert len(fetch.requests) == 3
+    assert fetch.requests[0][1] == {'Range': 'bytes=0-16383'}
+
+    # 新的探測器（例如下一次爬取）直接使用儲存的結果
+    assert asyncio.run(run()) == annotated
+    assert len(fetch.requests) == 3
+    print("✅ 圖片探測與快取正確")
+
+
+def test_crawl_with_probe_images(crawl_env, store):
+    """probe_images=True 時爬取結果的圖片帶有尺寸資訊"""
+    n = 1001
+    cassette = make_sample_cassette(story_count=1)
+    cassette.add(story_url(n), 200, {'Content-Type': 'text/html; charset=utf-8'},
+                 make_story_page(n, paragraphs=2, images=2).encode('utf-8'))
+    for image in crawler.parse_story(make_story_page(n, paragraphs=2, images=2), story_url(n))['images']:
+        body = png(1280, 720) if image.get('is_main') else gif(1, 1)
+        cassette.add(image['url'], 200, {'Content-Type': 'image/png'}, body)
+
+    crawler.use_cassette(cassette)
+    news = crawler.scrape_news(limit=1, rate=1000, store=store, probe_images=True)
+
+    assert len(news) == 1
+    assert news[0].as_dict()['images'] == [{
+        'url': news[0]['images'][0]['url'], 'alt': '主圖', 'title': '主圖標題', 'is_main': True,
+        'width': 1280, 'height': 720, 'bytes': len(png(1280, 720)), 'mime': 'image/png'
+    }]
+    print("✅ 爬取時已探測圖片")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
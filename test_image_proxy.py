@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+圖片代理測試腳本
+驗證 image_proxy.py 的磁碟 LRU 快取、縮圖與 WebP 轉換，以及 /api/image 的 ETag 與快取標頭
+"""
+
+import io
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import app as api
+from image_proxy import DiskLRUCache, ImageFetchError, ImageProxy
+
+IMAGE_URL = 'https://pgw.udn.com.tw/gw/photo.php?u=https://uc.udn.com.tw/photo/2024/01/01/1.jpg'
+
+
+def make_jpeg(width=1200, height=800):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class FakeOrigin:
+    def __init__(self):
+        self.requests = []
+        self.body = make_jpeg()
+
+    def __call__(self, url):
+        self.requests.append(url)
+        return self.body
+
+
+def make_proxy(directory, max_bytes=50 * 1024 * 1024):
+    origin = FakeOrigin()
+    return ImageProxy(cache=DiskLRUCache(str(directory), max_bytes=max_bytes), fetch=origin), origin
+
+
+def test_lru_eviction_and_reload(tmp_path):
+    """超過容量時淘汰最久未使用的檔案，重新啟動後保留使用順序"""
+    directory = str(tmp_path)
+    cache = DiskLRUCache(directory, max_bytes=250)
+    cache.put('a', b'\xff\xd8' + b'a' * 98, 'image/jpeg')
+    time.sleep(0.01)
+    cache.put('b', b'\xff\xd8' + b'b' * 98, 'image/jpeg')
+    time.sleep(0.01)
+    assert cache.get('a') is not None  # a 變成最近使用
+    time.sleep(0.01)
+    cache.put('c', b'\xff\xd8' + b'c' * 98, 'image/jpeg')
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert len(os.listdir(directory)) == 2
+
+    # 寫入中斷留下的暫存檔在重新啟動時刪除，剛建立的（其他程序正在寫入）保留
+    stale_tmp, fresh_tmp = os.path.join(directory, 'stale.jpg.1.tmp'), os.path.join(directory, 'fresh.jpg.2.tmp')
+    for path in (stale_tmp, fresh_tmp):
+        with open(path, 'wb') as f:
+            f.write(b'\xff\xd8')
+    os.utime(stale_tmp, (0, 0))
+
+    reloaded = DiskLRUCache(directory, max_bytes=250)
+    assert not os.path.exists(stale_tmp) and os.path.exists(fresh_tmp)
+    assert reloaded.total_bytes == 200
+    assert reloaded.get('a').etag == cache.get('a').etag
+    print("✅ 磁碟 LRU 快取正確")
+
+
+def test_variants_fetch_origin_once(tmp_path):
+    """所有衍生版本共用同一份原圖，只從來源下載一次"""
+    proxy, origin = make_proxy(tmp_path)
+    thumb = proxy.get(IMAGE_URL, width=300)
+    webp = proxy.get(IMAGE_URL, width=300, fmt='webp')
+    original = proxy.get(IMAGE_URL)
+    again = proxy.get(IMAGE_URL, width=300)
+
+    assert len(origin.requests) == 1
+    with Image.open(thumb.path) as image:
+        assert image.size == (300, 200)
+    assert thumb.mime == 'image/jpeg' and webp.mime == 'image/webp'
+    with Image.open(webp.path) as image:
+        assert image.format == 'WEBP'
+    assert original.size == len(origin.body)
+    assert again == thumb
+    print("✅ 縮圖與 WebP 只下載一次原圖")
+
+
+def test_image_endpoint(tmp_path, monkeypatch):
+    """/api/image 回傳強 ETag 與長期快取標頭，If-None-Match 相符時回傳 304"""
+    proxy, origin = make_proxy(tmp_path)
+    monkeypatch.setattr(api, 'image_proxy', proxy)
+    client = api.app.test_client()
+
+    response = client.get('/api/image', query_string={'url': IMAGE_URL, 'w': 160, 'format': 'webp'})
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    etag = response.headers['ETag']
+    assert etag.startswith('"') and not etag.startswith('W/')
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+
+    response = client.get('/api/image', query_string={'url': IMAGE_URL, 'w': 160, 'format': 'webp'},
+                          headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert len(origin.requests) == 1
+    print("✅ /api/image 快取標頭正確")
+
+
+def test_image_endpoint_undecodable_origin(tmp_path, monkeypatch):
+    """來源圖片截斷或無法解碼時回傳 502"""
+    proxy, origin = make_proxy(tmp_path)
+    origin.body = origin.body[:400]
+    monkeypatch.setattr(api, 'image_proxy', proxy)
+    client = api.app.test_client()
+    assert client.get('/api/image', query_string={'url': IMAGE_URL, 'w': 160}).status_code == 502
+    print("✅ 無法解碼的圖片回傳 502")
+
+
+class FakeResponse:
+    def __init__(self, status, location=None, body=b''):
+        self.status_code = status
+        self.headers = {'Location': location} if location else {}
+        self.is_redirect = location is not None
+        self.raw = io.BytesIO(body)
+        self.raw.read = lambda size, decode_content=False, _read=self.raw.read: _read(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        assert kwargs['allow_redirects'] is False
+        self.requested.append(url)
+        return self.responses[url]
+
+
+def test_redirects_are_checked(tmp_path):
+    """每一跳轉址都需通過主機檢查，轉到不允許的主機時不送出請求"""
+    proxy = ImageProxy(cache=DiskLRUCache(str(tmp_path)))
+    body = make_jpeg(10, 10)
+    proxy._session = FakeSession({
+        IMAGE_URL: FakeResponse(302, '/photo/2.jpg'),
+        'https://pgw.udn.com.tw/photo/2.jpg': FakeResponse(200, body=body),
+    })
+    assert proxy.get(IMAGE_URL).size == len(body)
+
+    evil = 'https://pgw.udn.com.tw/redirect.jpg'
+    proxy._session = FakeSession({evil: FakeResponse(301, 'http://169.254.169.254/latest/meta-data')})
+    with pytest.raises(ImageFetchError):
+        proxy.get(evil)
+    assert proxy._session.requested == [evil]
+    print("✅ 轉址目標經過檢查")
+
+
+def test_concurrent_requests_share_lock(tmp_path):
+    """同時請求同一張圖片時只下載一次，所有請求結束後才移除鍵的鎖"""
+    proxy, origin = make_proxy(tmp_path)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch(url):
+        started.set()
+        release.wait(5)
+        return origin(url)
+
+    proxy._fetch = slow_fetch
+    threads = [threading.Thread(target=proxy.get, args=(IMAGE_URL,)) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.1)
+    assert proxy._locks[f'original|{IMAGE_URL}'][1] == 4
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(origin.requests) == 1 and proxy._locks == {}
+    print("✅ 同時請求共用同一把鎖")
+
+
+def test_image_endpoint_rejects_bad_requests():
+    client = api.app.test_client()
+    assert client.get('/api/image', query_string={'url': 'https://example.com/a.jpg'}).status_code == 400
+    assert client.get('/api/image', query_string={'url': 'file:///etc/passwd'}).status_code == 400
+    assert client.get('/api/image', query_string={'url': IMAGE_URL, 'w': 99999}).status_code == 400
+    assert client.get('/api/image', query_string={'url': IMAGE_URL, 'format': 'bmp'}).status_code == 400
+    print("✅ 不合法的請求被拒絕")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+效能指標測試腳本
+驗證 metrics.py 的 Prometheus 輸出、爬取摘要，以及 /api/metrics 端點
+"""
+
+import pytest
+
+import crawler
+import metrics
+from replay import make_sample_cassette
+from replay_server import ReplayServer
+from sample_pages import story_url
+
+
+def test_prometheus_format():
+    """計數器與直方圖依 Prometheus 文字格式輸出"""
+    registry = metrics.MetricsRegistry()
+    registry.inc('crawler_fetches_total', status=200)
+    registry.inc('crawler_fetches_total', 2, status=200)
+    registry.observe('crawler_stage_seconds', 0.003, stage='parse')
+    registry.observe('crawler_stage_seconds', 0.2, stage='parse')
+    text = registry.render()
+
+    assert '# TYPE crawler_fetches_total counter' in text
+    assert 'crawler_fetches_total{status="200"} 3' in text
+    assert 'crawler_stage_seconds_bucket{stage="parse",le="0.001"} 0' in text
+    assert 'crawler_stage_seconds_bucket{stage="parse",le="0.005"} 1' in text
+    assert 'crawler_stage_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert 'crawler_stage_seconds_count{stage="parse"} 2' in text
+    print("✅ Prometheus 格式正確")
+
+
+def test_percentile():
+    """最近秩法的百分位數，與基準測試腳本共用"""
+    values = [0.5, 0.1, 0.4, 0.2, 0.3]
+    assert metrics.percentile(values, 0.50) == 0.3
+    assert metrics.percentile(values, 0.95) == metrics.percentile(values, 1.0) == 0.5
+    assert metrics.percentile([], 0.5) == 0.0
+    print("✅ 百分位數正確")
+
+
+def test_dropped_articles_counted():
+    """標題或內文不完整的頁面依原因計數"""
+    before = metrics.registry.value('crawler_articles_dropped_total', reason='missing_content')
+    assert crawler.parse_story('<html><h1>只有標題</h1></html>', story_url(1)) is None
+    after = metrics.registry.value('crawler_articles_dropped_total', reason='missing_content')
+    assert after == before + 1
+    print("✅ 捨棄的新聞已計數")
+
+
+def test_crawl_summary(crawl_env, store):
+    """scrape_news(with_summary=True) 回傳本次爬取的計數與各階段耗時"""
+    with ReplayServer(make_sample_cassette(story_count=5)) as server:
+        crawler.ORIGIN_OVERRIDES['https://udn.com'] = server.url
+        news, summary = crawler.scrape_news(limit=5, rate=1000, store=store, with_summary=True)
+
+    counters = summary['counters']
+    assert len(news) == 5
+    assert counters['fetches'] == {'200': 6}
+    assert counters['stories'] == {'fetched': 5}
+    assert counters['bytes_downloaded'] > 0
+    assert counters['crawls'] == 1
+    assert sum(counters['connections'].values()) == 6
+    for stage in ('connect', 'request', 'download', 'search_page', 'story', 'parse', 'images', 'store'):
+        assert summary['stages'][stage]['count'] > 0, stage
+    assert summary['stages']['parse']['count'] == 5
+    assert summary['elapsed'] >= summary['stages']['search_page']['total']
+    print("✅ 爬取摘要正確")
+
+
+def test_metrics_endpoint():
+    """/api/metrics 回傳 Prometheus 文字格式，並記錄 API 請求"""
+    import app as api
+
+    client = api.app.test_client()
+    client.get('/api/health')
+    response = client.get('/api/metrics')
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'api_requests_total{endpoint="health_check",status="200"}' in text
+    assert '# TYPE crawler_stage_seconds histogram' in text
+    print("✅ /api/metrics 端點正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+新聞快取測試腳本
+以假的爬蟲函數驗證 news_cache.py 的 TTL、背景更新與單一飛行去重
+"""
+
+import threading
+import time
+
+import pytest
+
+from news_cache import NewsCache
+
+
+class SlowLoader:
+    """模擬耗時的爬蟲，記錄被呼叫的次數"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call_no = self.calls
+        time.sleep(self.delay)
+        return [{'title': f'新聞 {call_no}'}]
+
+
+def test_single_flight_cold_start():
+    """100 個並發請求只觸發一次爬取"""
+    loader = SlowLoader()
+    cache = NewsCache(loader, ttl=60)
+    results = []
+
+    def worker():
+        results.append(cache.get())
+
+    threads = [threading.Thread(target=worker) for _ in range(100)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loader.calls == 1
+    assert len(results) == 100
+    assert all(data == [{'title': '新聞 1'}] for data, _ in results)
+    print(f"✅ 100 個並發請求共觸發 {loader.calls} 次爬取")
+
+
+def test_stale_while_revalidate():
+    """過期後立即回傳舊資料，並在背景更新"""
+    loader = SlowLoader(delay=0.1)
+    cache = NewsCache(loader, ttl=0.05)
+    cache.get()
+    time.sleep(0.1)
+
+    start = time.time()
+    data, meta = cache.get()
+    elapsed = time.time() - start
+
+    assert data == [{'title': '新聞 1'}]
+    assert meta['stale'] is True
+    assert meta['refreshing'] is True
+    assert elapsed < 0.05
+
+    cache.refresh().wait(1)
+    data, meta = cache.get()
+    assert data == [{'title': '新聞 2'}]
+    print(f"✅ 過期資料即時回傳 ({elapsed * 1000:.2f} ms)，背景更新完成")
+
+
+def test_failed_refresh_keeps_old_data():
+    """背景爬取失敗時保留上一次成功的資料"""
+    state = {'fail': False}
+
+    def loader():
+        if state['fail']:
+            raise RuntimeError('網路錯誤')
+        return [{'title': '舊新聞'}]
+
+    cache = NewsCache(loader, ttl=0)
+    cache.get()
+    state['fail'] = True
+    cache.refresh().wait(1)
+
+    data, meta = cache.get()
+    assert data == [{'title': '舊新聞'}]
+    assert meta['last_error'] == '網路錯誤'
+    print("✅ 爬取失敗時沿用舊資料")
+
+
+def test_empty_result_keeps_old_data():
+    """is_empty 判斷為沒有資料的結果只在冷啟動時採用，之後沿用舊資料"""
+    results = [{'topics': {'2/空汙': []}, 'article_count': 0},
+               {'topics': {'2/空汙': [{'title': '新聞'}]}, 'article_count': 1},
+               {'topics': {'2/空汙': []}, 'article_count': 0}]
+    cache = NewsCache(lambda: results.pop(0), ttl=0, is_empty=lambda result: not result['article_count'])
+    assert cache.get()[0]['article_count'] == 0
+    cache.refresh().wait(1)
+    cache.refresh().wait(1)
+    data, meta = cache.get()
+    assert data['article_count'] == 1 and meta['last_error'] == '爬取結果為空，沿用舊資料'
+    print("✅ 空結果沿用舊資料")
+
+
+def test_version_changes_with_content():
+    """內容相同的更新沿用原本的資料物件與版本，內容改變時版本更新"""
+    state = {'news': [{'title': '新聞'}]}
+    cache = NewsCache(lambda: list(state['news']), ttl=0)
+    data, meta = cache.get()
+    cache.refresh().wait(1)
+    again, again_meta = cache.peek()
+    assert again is data and again_meta['version'] == meta['version']
+    assert again_meta['updated_at'] == meta['updated_at'] and again_meta['fetched_at'] >= meta['fetched_at']
+
+    state['news'] = [{'title': '新新聞'}]
+    cache.refresh().wait(1)
+    changed, changed_meta = cache.peek()
+    assert changed == state['news'] and changed_meta['version'] != meta['version']
+    print("✅ 資料版本只在內容改變時更新")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+多程序解析測試腳本
+驗證 parse_pool.py 的結果與 parse_story 一致、子程序的指標會補記，以及爬蟲以程序池解析的完整流程
+"""
+
+import pytest
+
+import crawler
+import metrics
+from parse_pool import ParsePool
+from replay import make_sample_cassette
+from sample_pages import make_corpus
+
+
+def test_parse_many():
+    """依輸入順序回傳與 parse_story 相同的結果，不完整的頁面為 None 並記錄捨棄原因"""
+    pages = [(html.encode('utf-8'), url) for url, html in make_corpus(9)]
+    pages.append((b'<html><body><p>no title</p></body></html>', 'https://udn.com/news/story/7266/1'))
+    before = metrics.registry.value('crawler_articles_dropped_total', reason='missing_title')
+    with ParsePool(workers=2, chunk_size=4) as pool:
+        news = pool.parse_many(pages)
+    assert metrics.registry.value('crawler_articles_dropped_total', reason='missing_title') == before + 1
+    assert news == [crawler.parse_story(html, url) for html, url in pages]
+    assert news[-1] is None
+    print("✅ 程序池解析結果一致")
+
+
+def test_crawl_with_parse_pool(crawl_env, store):
+    """parse_workers 大於 0 時新下載的頁面在子程序中解析，摘要仍包含 images 階段"""
+    crawler.use_cassette(make_sample_cassette(story_count=12, page_size=5))
+    news, summary = crawler.scrape_news(limit=10, rate=1000, store=store, with_summary=True,
+                                        parse_workers=2, parse_chunk_size=3)
+    assert [item['url'] for item in news] == [f'https://udn.com/news/story/7266/{n}' for n in range(1012, 1002, -1)]
+    assert summary['counters']['stories'] == {'fetched': 10}
+    assert summary['stages']['parse']['count'] == 10 and summary['stages']['images']['count'] == 10
+    print("✅ 爬蟲以程序池解析正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
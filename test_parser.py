@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+解析器測試腳本
+驗證 lxml 版 parse_story 與舊版 BeautifulSoup 實作的輸出一致
+"""
+
+import pytest
+
+from crawler import parse_story, parse_story_soup, extract_story_urls
+from sample_pages import make_corpus, make_search_page, make_story_page, story_url
+
+
+def test_matches_soup_parser():
+    """新舊版面的合成頁面解析結果完全一致"""
+    corpus = make_corpus(20)
+    for url, html in corpus:
+        assert parse_story(html.encode('utf-8'), url) == parse_story_soup(html, url), url
+    print(f"✅ {len(corpus)} 個頁面解析結果一致")
+
+
+def test_story_fields():
+    """欄位內容、主圖順序與內文中的 script 處理"""
+    url = story_url(7)
+    news_item = parse_story(make_story_page(7), url)
+
+    assert news_item['title'].startswith('空汙新聞第 7 則')
+    assert news_item['publish_time'] == '2024-01-08 10:07'
+    assert news_item['reporter'] == '記者王7／台北即時報導'
+    assert news_item['published_at'] == '2024-01-08T10:07:00+08:00'
+    assert news_item['reporter_name'] == '王7'
+    assert '不應出現在內文' not in news_item['content']
+    assert news_item['images'][0]['is_main'] is True
+    assert len(news_item['images']) == 5  # 主圖 + 4 張內文圖，社群圖示被過濾
+    print("✅ 欄位解析正確")
+
+
+def test_incomplete_pages():
+    """缺少標題或內文的頁面回傳 None"""
+    assert parse_story(b'', 'u') is None
+    assert parse_story('<html><body><p>沒有標題</p></body></html>', 'u') is None
+    assert parse_story('<h1>只有標題</h1>', 'u') is None
+    html = '<h1>標題</h1><div class="story_content"><p>內文</p></div>'
+    assert parse_story(html, 'u') == parse_story_soup(html, 'u')
+    print("✅ 不完整頁面處理正確")
+
+
+def test_extract_story_urls():
+    """搜尋頁連結依出現順序去重並正規化"""
+    html = make_search_page([3, 1, 3, 2])
+    assert extract_story_urls(html, 'https://udn.com/search/word/2/空汙') == [
+        story_url(3), story_url(1), story_url(2)
+    ]
+    print("✅ 新聞連結擷取正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
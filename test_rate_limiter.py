@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+限速器測試腳本
+驗證 rate_limiter.py 的令牌桶速率與主機隔離
+"""
+
+import threading
+import time
+
+import pytest
+
+from rate_limiter import TokenBucket, HostRateLimiter
+
+
+def test_token_bucket_rate():
+    """每秒 20 個請求的桶，取 11 個令牌約需 0.5 秒"""
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    assert 0.45 <= elapsed < 0.8
+    print(f"✅ 11 個令牌耗時 {elapsed:.2f} 秒")
+
+
+def test_token_bucket_concurrent():
+    """多執行緒同時取令牌時仍遵守速率"""
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(11)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    assert 0.18 <= elapsed < 0.5
+    print(f"✅ 並發取得 11 個令牌耗時 {elapsed:.2f} 秒")
+
+
+def test_hosts_are_isolated():
+    """不同主機使用各自的令牌桶"""
+    limiter = HostRateLimiter(rate=1, burst=1)
+    assert limiter.reserve('https://udn.com/news/story/1') == 0
+    assert limiter.reserve('https://pgw.udn.com.tw/a.jpg') == 0
+    assert limiter.reserve('https://udn.com/news/story/2') > 0.9
+    print("✅ 主機間限速互不影響")
+
+
+def test_shared_limiter_is_reused():
+    """相同速率的爬取共用同一個限速器，合計仍遵守每秒請求數"""
+    first = HostRateLimiter.shared(0.5)
+    assert HostRateLimiter.shared(0.5) is first
+    assert HostRateLimiter.shared(0.25) is not first
+    first.reserve('https://shared.example/news/1')
+    assert HostRateLimiter.shared(0.5).reserve('https://shared.example/news/2') > 1.9
+    print("✅ 同速率的爬取共用主機令牌桶")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
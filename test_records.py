@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+新聞記錄測試腳本
+驗證 records.py 的 Article / Image 在建立時正規化、dict 風格的讀取，以及 JSON 與 pickle 的格式
+"""
+
+import json
+import pickle
+
+import pytest
+
+from records import Article, Image, json_default
+
+SNAPSHOT_ITEM = {
+    'title': '空汙新聞',
+    'publish_time': '2024-01-01 10:00',
+    'published_at': '2024-01-01T10:00:00+08:00',
+    'reporter': '記者王小明／台北即時報導',
+    'reporter_name': '王小明',
+    'content': '第一段\n第二段',
+    'url': 'https://udn.com/news/story/7266/1',
+    'images': [
+        {'url': 'https://pgw.udn.com.tw/a.jpg', 'alt': None, 'title': 3, 'is_main': 1},
+        {'url': 'https://pgw.udn.com.tw/b.jpg', 'width': 640, 'height': 480, 'bytes': 1000, 'mime': 'image/jpeg'},
+        {'url': ''},
+        'https://pgw.udn.com.tw/c.jpg',
+    ]
+}
+
+
+def test_from_dict():
+    """快照中的 dict 轉為 Article 時驗證圖片欄位，略過格式不正確的圖片"""
+    article = Article.from_dict(SNAPSHOT_ITEM)
+    assert article.images == (
+        Image('https://pgw.udn.com.tw/a.jpg', '', '3', True),
+        Image('https://pgw.udn.com.tw/b.jpg', width=640, height=480, bytes=1000, mime='image/jpeg'),
+    )
+    assert Article.from_dict(article) is article
+    assert Article.from_dict(dict(SNAPSHOT_ITEM, images=None)).images == ()
+
+    other = Article.from_dict(dict(SNAPSHOT_ITEM, reporter=''.join(['記者王小明／', '台北即時報導'])))
+    assert other.reporter is article.reporter  # 重複的署名共用同一個字串
+    print("✅ dict 轉換與驗證正確")
+
+
+def test_field_access():
+    """dict 風格的讀寫；探測欄位與 topics 沒有值時視為不存在"""
+    article = Article.from_dict(SNAPSHOT_ITEM)
+    main, probed = article.images
+    assert article['title'] == '空汙新聞' and article.get('missing', 'x') == 'x'
+    assert 'topics' not in article and article.get('topics') is None
+    assert 'width' not in main and 'width' in probed
+    assert dict(probed) == {'url': 'https://pgw.udn.com.tw/b.jpg', 'alt': '', 'title': '', 'is_main': False,
+                            'width': 640, 'height': 480, 'bytes': 1000, 'mime': 'image/jpeg'}
+
+    article['topics'] = ['2/空汙']
+    assert article.keys()[-1] == 'topics'
+    try:
+        article['extra'] = 1
+        assert False
+    except KeyError:
+        pass
+    print("✅ 欄位存取正確")
+
+
+def test_serialization():
+    """JSON 與原本的 dict 格式相同；pickle（程序池傳回結果）後內容不變"""
+    article = Article.from_dict(SNAPSHOT_ITEM)
+    encoded = json.loads(json.dumps({'data': [article]}, ensure_ascii=False, default=json_default))
+    assert encoded['data'][0] == article.as_dict()
+    assert encoded['data'][0]['images'][0] == {
+        'url': 'https://pgw.udn.com.tw/a.jpg', 'alt': '', 'title': '3', 'is_main': True
+    }
+    assert Article.from_dict(encoded['data'][0]) == article
+    assert pickle.loads(pickle.dumps(article)) == article
+    print("✅ 序列化正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
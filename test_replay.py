@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+錄製/重播測試腳本
+驗證 replay.py 的 cassette 存取、爬蟲的 replay 模式，以及 replay_server.py 的來源覆寫與錯誤注入
+"""
+
+import pytest
+
+import crawler
+from article_store import ArticleStore
+from http_cache import ValidatorCache
+from replay import Cassette, RECORD, make_sample_cassette
+from replay_server import ReplayServer
+
+
+def scrape(store, **kwargs):
+    """以空白的搜尋頁快取爬取一次"""
+    crawler.search_page_cache = ValidatorCache()
+    return crawler.scrape_news(rate=1000, store=store, **kwargs)
+
+
+def test_cassette_round_trip(tmp_path):
+    """存檔後重新載入內容相同，驗證器相符時回傳 304"""
+    path = str(tmp_path / 'cassette.json')
+    cassette = Cassette(path, mode=RECORD)
+    cassette.add('https://udn.com/a', 200, {'ETag': '"v1"', 'Set-Cookie': 'x'}, '空汙'.encode('utf-8'))
+    cassette.save()
+
+    loaded = Cassette(path)
+    assert loaded.lookup('https://udn.com/a') == (200, {'ETag': '"v1"'}, '空汙'.encode('utf-8'))
+    assert loaded.lookup('https://udn.com/a', {'If-None-Match': '"v1"'})[0] == 304
+    assert loaded.lookup('https://udn.com/missing')[0] == 404
+    print("✅ cassette 存取正確")
+
+
+def test_replay_mode_without_network(crawl_env, store):
+    """replay 模式直接從 cassette 回應，完整爬取不需要網路"""
+    crawler.use_cassette(make_sample_cassette(story_count=12, page_size=5))
+    news = scrape(store, limit=8)
+
+    assert len(news) == 8
+    assert news[0]['url'] == 'https://udn.com/news/story/7266/1012'
+    assert all(item['images'] for item in news)
+    print("✅ replay 模式爬取正確")
+
+
+def test_replay_server_with_origin_override(crawl_env, store, monkeypatch):
+    """來源覆寫後請求送到本地重播伺服器，注入的錯誤會經由重試恢復"""
+    cassette = make_sample_cassette(story_count=6)
+    monkeypatch.setattr(crawler, 'RETRY_DELAY', 0)
+    # 並發時注入的錯誤落在哪個網址取決於請求到達順序，放寬嘗試次數避免單則新聞連續失敗
+    monkeypatch.setattr(crawler, 'MAX_ATTEMPTS', 10)
+    with ReplayServer(cassette, error_rate=0.3, error_status=0, seed=3) as server:
+        crawler.ORIGIN_OVERRIDES['https://udn.com'] = server.url
+        news = scrape(store, limit=6, concurrency=3)
+        stats = dict(server.stats)
+
+    assert len(news) == 6
+    assert stats['errors'] > 0
+    assert stats['requests'] == 7 + stats['errors']  # 1 頁搜尋結果 + 6 則新聞
+    print("✅ 重播伺服器與錯誤注入正確")
+
+
+def test_record_mode(crawl_env, tmp_path):
+    """record 模式保存實際收到的回應，可再以 replay 模式重播"""
+    path = str(tmp_path / 'cassette.json')
+    with ReplayServer(make_sample_cassette(story_count=3)) as server:
+        crawler.ORIGIN_OVERRIDES['https://udn.com'] = server.url
+        crawler.use_cassette(Cassette(path, mode=RECORD))
+        recorded = scrape(ArticleStore(str(tmp_path / 'recorded.db')), limit=3)
+    crawler.ORIGIN_OVERRIDES.clear()
+
+    crawler.use_cassette(Cassette(path))
+    replayed = scrape(ArticleStore(str(tmp_path / 'replayed.db')), limit=3)
+
+    assert len(Cassette(path)) == 4
+    assert replayed == recorded and len(recorded) == 3
+    print("✅ 錄製後重播結果相同")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+預先編碼回應測試腳本
+驗證 response_cache.py 的壓縮格式協商與 ETag，以及 /api/news 只在資料更新時重新編碼
+"""
+
+import gzip
+import json
+import threading
+
+import pytest
+from flask import json as flask_json
+
+import app as api
+from crawler import parse_story
+from news_cache import NewsCache
+from response_cache import EncodedResponse, EncodedResponseCache, parse_accept_encoding
+from sample_pages import make_story_page, story_url
+
+
+def sample_news(count=10):
+    return [api.process_news_item(parse_story(make_story_page(n, seed=n), story_url(n)))
+            for n in range(7700000 + count, 7700000, -1)]
+
+
+def test_accept_encoding():
+    assert parse_accept_encoding('gzip, deflate, br;q=0.5') == {'gzip': 1.0, 'deflate': 1.0, 'br': 0.5}
+    encoded = EncodedResponse({'data': ['空汙' * 500]})
+    assert encoded.negotiate('gzip')[1] == 'gzip'
+    assert encoded.negotiate('gzip;q=0, identity')[1] is None
+    assert encoded.negotiate('*')[1] in ('gzip', 'br')
+    assert encoded.negotiate(None) == (encoded.body, None)
+    assert gzip.decompress(encoded.encodings['gzip']) == encoded.body
+    print("✅ 壓縮格式協商正確")
+
+
+def test_extended_body():
+    """每次請求的額外欄位補在最後一個物件中，gzip 以第二個 member 接上，ETag 不受影響"""
+    payload = {'data': ['空汙' * 500], 'cache': {'ttl': 300}}
+    encoded = EncodedResponse(payload, extend='cache')
+    assert encoded.etag == EncodedResponse(payload).etag and 'br' not in encoded.encodings
+    extra = {'cache_age': 1.5, 'stale': False}
+    expected = {'data': payload['data'], 'cache': {'ttl': 300, **extra}}
+
+    body, coding = encoded.negotiate('gzip, br', extra)
+    assert coding == 'gzip' and json.loads(gzip.decompress(body)) == expected
+    body, coding = encoded.negotiate(None, extra)
+    assert coding is None and json.loads(body) == expected
+    assert encoded.negotiate(None) == (encoded.body, None)
+    with pytest.raises(ValueError):
+        EncodedResponse({'cache': {'ttl': 300}, 'data': []}, extend='cache')
+    print("✅ 額外欄位接續正確")
+
+
+def test_utf8_body_is_smaller():
+    """中文以 UTF-8 輸出，不轉成 \\uXXXX；gzip 後再大幅縮小"""
+    news = sample_news()
+    escaped = flask_json.dumps({'data': news}).encode()
+    encoded = EncodedResponse({'data': news})
+    assert b'\\u' not in encoded.body
+    assert len(encoded.body) < len(escaped) * 0.7
+    assert len(encoded.encodings['gzip']) < len(encoded.body) / 3
+    assert EncodedResponse({'data': news}).etag == encoded.etag
+    print(f"✅ 回應大小: 轉義 {len(escaped)} → UTF-8 {len(encoded.body)} → gzip {len(encoded.encodings['gzip'])} bytes")
+
+
+def test_news_endpoint_encodes_once(monkeypatch):
+    """只在快取內容改變時重新編碼；內容相同的更新（store 模式輪詢）沿用原本的回應與 ETag"""
+    news = {'data': sample_news()}
+    cache = NewsCache(lambda: list(news['data']), ttl=300)
+    cache.refresh().wait(5)
+    monkeypatch.setattr(api, 'news_cache', cache)
+    monkeypatch.setattr(api, 'encoded_responses', EncodedResponseCache())
+    client = api.app.test_client()
+
+    first = client.get('/api/news', headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert first.headers['Vary'] == 'Accept-Encoding'
+    body = json.loads(gzip.decompress(first.get_data()))
+    assert body['count'] == 10 and body['stats']['total_images'] > 0
+    assert body['cache']['stale'] is False and body['cache']['ttl'] == 300
+    assert body['cache']['cache_age'] is not None and not body['cache']['refreshing']
+
+    plain = client.get('/api/news')
+    assert 'Content-Encoding' not in plain.headers
+    plain_body = plain.get_json()
+    assert plain_body['cache'].pop('cache_age') >= body['cache'].pop('cache_age')
+    assert plain_body == body
+    assert plain.headers['ETag'] == first.headers['ETag']
+
+    not_modified = client.get('/api/news', headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304 and not not_modified.get_data()
+    assert api.encoded_responses.builds == 1
+
+    # 重新載入得到新的列表但內容相同：不重新編碼，ETag 不變
+    cache.refresh().wait(5)
+    assert client.get('/api/news', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert api.encoded_responses.builds == 1
+
+    # 內容改變後重新編碼，ETag 改變
+    news['data'] = news['data'][:5]
+    cache.refresh().wait(5)
+    changed = client.get('/api/news', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and changed.get_json()['count'] == 5
+    assert changed.headers['ETag'] != first.headers['ETag']
+    assert api.encoded_responses.builds == 2
+    print("✅ /api/news 只在資料更新時重新編碼")
+
+
+def test_single_flight_build():
+    """同一版本同時只編碼一次，編碼時不阻擋其他 key"""
+    cache = EncodedResponseCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_build():
+        calls.append('slow')
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('a', 1, slow_build))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    assert cache.get('b', 1, lambda: 'other') == 'other'  # 不需等待 a 編碼完成
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['slow'] * 5 and calls == ['slow']
+    assert cache.get('a', 1, slow_build) == 'slow' and cache.get('a', 2, lambda: 'new') == 'new'
+    assert cache.builds == 3
+    print("✅ 編碼單一飛行正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+全文檢索測試腳本
+驗證 search_index.py 的中文二字詞切詞、查詢轉換，以及 ArticleStore.search 與 /api/search
+"""
+
+import sqlite3
+
+import pytest
+
+import app as api
+import search_index
+from article_store import ArticleStore
+from article_fields import parse_publish_time, parse_time_arg
+from search_index import build_match_query, tokenize
+
+ARTICLES = [
+    (1, '中南部空汙拉警報 環境部籲減少戶外活動', '記者王小明／台北報導', '2024-01-10 09:00',
+     '受到東北季風影響，中南部細懸浮微粒濃度偏高，環境部呼籲民眾減少戶外活動。'),
+    (2, '颱風來襲 北部風雨增強', '記者李大華／台北報導', '2024-01-12 18:30',
+     '颱風外圍環流影響，北部地區風雨明顯增強，空氣品質良好。'),
+    (3, 'PM2.5 監測站數據更新', '記者王小明／高雄報導', '2024-01-15 12:00',
+     '環境部公布最新監測資料，PM2.5 濃度較上週下降，空汙情形改善。'),
+]
+
+
+def story(n):
+    return f'https://udn.com/news/story/7266/{n}'
+
+
+@pytest.fixture
+def articles(store):
+    """存入 ARTICLES 的本地儲存"""
+    for n, title, reporter, publish_time, content in ARTICLES:
+        store.save(story(n), {'title': title, 'reporter': reporter, 'publish_time': publish_time,
+                              'content': content, 'images': []})
+    return store
+
+
+def urls(results):
+    return [item['url'] for item in results[0]]
+
+
+def test_tokenize_and_query():
+    assert tokenize('空汙PM2.5') == ['空汙', '汙', 'pm2', '5']
+    assert tokenize('記者王') == ['記者', '者王', '王']
+    assert build_match_query('細懸浮微粒') == '"細懸 懸浮 浮微 微粒"'
+    assert build_match_query('霾 "x" OR') == '"霾"* AND "x" AND "or"'
+    assert build_match_query(reporter='王小明') == 'reporter : "王小 小明"'
+    assert build_match_query('  ') is None
+    print("✅ 切詞與查詢轉換正確")
+
+
+def test_publish_time():
+    assert parse_publish_time('2024-01-10 09:00') == parse_time_arg('2024-01-10 09:00') == 1704848400
+    assert parse_publish_time('時間不明') is None
+    assert parse_time_arg('2024-01-10', end_of_day=True) - parse_time_arg('2024-01-10') == 86400
+    assert parse_time_arg('1704848400') == 1704848400
+    try:
+        parse_time_arg('昨天')
+        assert False
+    except ValueError:
+        pass
+    print("✅ 發佈時間解析正確")
+
+
+def test_search(articles):
+    store = articles
+    assert set(urls(store.search('空汙'))) == {story(1), story(3)}
+    assert urls(store.search('環境部 戶外')) == [story(1)]
+    assert urls(store.search('颱')) == [story(2)]           # 單一字
+    assert urls(store.search('汙')) and story(2) not in urls(store.search('汙'))
+    assert urls(store.search('pm2.5')) == [story(3)]
+    assert urls(store.search(reporter='王小明', order='time')) == [story(3), story(1)]
+    assert urls(store.search('空汙', until=parse_time_arg('2024-01-12', end_of_day=True))) == [story(1)]
+    assert urls(store.search(since=parse_time_arg('2024-01-11'))) == [story(3), story(2)]
+    assert store.search('不存在的詞') == ([], False)
+
+    results, has_more = store.search('環境部', limit=1)
+    assert len(results) == 1 and has_more
+    assert '環境部' in results[0]['snippet'] and results[0]['score'] is not None
+    print("✅ 全文檢索正確")
+
+
+def test_rank_window(articles, monkeypatch):
+    """相關度只排序發佈時間最新的 RANK_WINDOW 則命中，較舊的命中依時間接在後面，翻頁時順序不變"""
+    monkeypatch.setattr(search_index, 'RANK_WINDOW', 2)
+    store = articles
+    store.save(story(4), {'title': '空汙 空汙 空汙', 'reporter': '記者陳小華', 'publish_time': '2023-12-01 08:00',
+                          'content': '空汙空汙空汙。', 'images': []})
+    results, has_more = store.search('空汙')
+    assert urls((results, has_more)) == [story(1), story(3), story(4)] and not has_more
+    assert results[1]['score'] is not None and results[2]['score'] is None
+    paged = [url for offset in range(3) for url in urls(store.search('空汙', limit=1, offset=offset))]
+    assert paged == [story(1), story(3), story(4)]
+    print("✅ 相關度排序視窗正確")
+
+
+def test_index_updates(articles):
+    """重新儲存時更新索引，無效的記錄從索引移除，舊資料庫開啟時補建索引"""
+    store = articles
+    store.save(story(2), {'title': '颱風遠離', 'reporter': '記者李大華', 'publish_time': '2024-01-13 08:00',
+                          'content': '天氣轉晴。', 'images': []})
+    assert urls(store.search('颱風')) == [story(2)]
+    assert urls(store.search('風雨')) == []
+    store.save(story(2), None)
+    assert urls(store.search('颱風')) == []
+
+    # 模擬沒有索引的舊資料庫
+    conn = sqlite3.connect(store.path)
+    conn.execute('DROP TABLE articles_fts')
+    conn.commit()
+    conn.close()
+    reopened = ArticleStore(store.path)
+    assert urls(reopened.search('細懸浮微粒')) == [story(1)]
+    print("✅ 索引增量更新正確")
+
+
+def test_search_endpoint(articles, default_store):
+    client = api.app.test_client()
+    body = client.get('/api/search', query_string={'q': '空汙', 'limit': 1}).get_json()
+    assert body['status'] == 'success' and body['count'] == 1
+    assert body['pagination']['next_offset'] == 1
+    assert 'took_ms' in body and 'content' not in body['data'][0]
+
+    body = client.get('/api/search', query_string={'q': '空汙', 'since': '2024-01-11'}).get_json()
+    assert [item['url'] for item in body['data']] == [story(3)]
+
+    response = client.get('/api/search', query_string={'q': '颱風'})
+    assert '颱風' in response.get_data(as_text=True)  # 中文不轉義
+
+    assert client.get('/api/search').status_code == 400
+    assert client.get('/api/search', query_string={'q': 'a', 'since': '昨天'}).status_code == 400
+    assert client.get('/api/search', query_string={'q': 'a', 'since': 'nan'}).status_code == 400
+    assert client.get('/api/search', query_string={'q': 'a', 'order': 'score'}).status_code == 400
+    print("✅ /api/search 正確")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
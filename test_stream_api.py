@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+新聞串流API測試腳本
+以 Flask test client 與預先填入的快取驗證 /api/news/stream 的 NDJSON 與 SSE 格式，
+以及快取過期時多個串流共用同一次爬取並寫回快取
+"""
+
+import json
+import threading
+
+import pytest
+
+import app as api
+from news_cache import NewsCache
+
+SAMPLE_NEWS = [
+    {'title': '空汙新聞一', 'content': '內容一', 'images': []},
+    {'title': '空汙新聞二', 'content': '內容二', 'images': [{'url': 'https://pgw.udn.com.tw/a.jpg'}]},
+]
+SUMMARY = {'elapsed': 0.1, 'stages': {}}
+
+
+@pytest.fixture
+def seeded_cache(monkeypatch):
+    """以填好樣本新聞的快取取代 api.news_cache，測試結束後還原"""
+    cache = NewsCache(lambda: [api.process_news_item(item) for item in SAMPLE_NEWS], ttl=300)
+    cache.refresh().wait(5)
+    monkeypatch.setattr(api, 'news_cache', cache)
+    return cache
+
+
+def test_ndjson_stream(seeded_cache):
+    """每行一則新聞，中文不轉義"""
+    response = api.app.test_client().get('/api/news/stream')
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['X-News-Source'] == 'cache'
+    lines = body.strip().split('\n')
+    assert [json.loads(line)['title'] for line in lines] == ['空汙新聞一', '空汙新聞二']
+    assert '空汙新聞一' in body
+    print("✅ NDJSON 串流正確")
+
+
+def test_sse_stream(seeded_cache):
+    """SSE 格式以 done 事件結尾"""
+    response = api.app.test_client().get('/api/news/stream?format=sse')
+    events = response.get_data(as_text=True).strip().split('\n\n')
+
+    assert response.mimetype == 'text/event-stream'
+    assert [event.split('\n')[0] for event in events] == ['event: article', 'event: article', 'event: done']
+    assert json.loads(events[-1].split('data: ')[1]) == {'count': 2}
+    print("✅ SSE 串流正確")
+
+
+def test_live_streams_share_one_crawl(monkeypatch):
+    """快取沒有資料時，同時串流的請求共用同一次背景爬取，爬取完成後結果寫回快取"""
+    release = threading.Event()
+    calls = []
+
+    def fake_scrape(limit, offset, cursor, with_summary, progress=None, **options):
+        calls.append((limit, offset, cursor))
+        news = [api.process_news_item(item) for item in SAMPLE_NEWS]
+        progress(news[0])
+        release.wait(5)
+        progress(news[1])
+        return news, SUMMARY
+
+    cache = NewsCache(api.load_news, ttl=300, progress=True)
+    monkeypatch.setattr(api, 'NEWS_SOURCE', 'crawl')
+    monkeypatch.setattr(api, 'news_cache', cache)
+    monkeypatch.setattr(api, 'scrape_news', fake_scrape)
+    client = api.app.test_client()
+
+    joined, second = threading.Event(), {}
+
+    def second_stream():
+        # 串流回應在各自的執行緒中讀取，請求 context 才不會互相交錯
+        response = api.app.test_client().get('/api/news/stream?format=sse', buffered=False)
+        joined.set()
+        second.update(source=response.headers['X-News-Source'], body=response.get_data(as_text=True))
+
+    first = client.get('/api/news/stream', buffered=False)
+    thread = threading.Thread(target=second_stream)
+    thread.start()
+    joined.wait(5)
+    release.set()
+    body = first.get_data(as_text=True)
+    thread.join(5)
+
+    assert first.headers['X-News-Source'] == second['source'] == 'live'
+    assert [json.loads(line)['title'] for line in body.strip().split('\n')] == ['空汙新聞一', '空汙新聞二']
+    assert second['body'].count('event: article') == 2
+    assert len(calls) == 1
+    assert [item['title'] for item in cache.peek()[0]] == ['空汙新聞一', '空汙新聞二']
+    assert client.get('/api/news/stream').headers['X-News-Source'] == 'cache'
+    print("✅ 串流共用同一次爬取並寫回快取")
+
+
+def test_invalid_format():
+    response = api.app.test_client().get('/api/news/stream?format=xml')
+    assert response.status_code == 400
+    print("✅ 不支援的格式回傳 400")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
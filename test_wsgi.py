@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+正式部署設定測試腳本
+驗證 wsgi.py 匯入時不會爬取、gunicorn.conf.py 的設定，以及 bench_api_load.py 的負載測試
+"""
+
+import os
+import runpy
+import threading
+from unittest import mock
+
+import pytest
+from werkzeug.serving import make_server
+
+from bench_api_load import run_load
+
+
+def test_import_does_not_crawl():
+    """匯入 WSGI 進入點只建立應用，不會啟動爬取"""
+    import wsgi
+    assert wsgi.application is wsgi.app
+    import app as api
+    assert api.news_cache.refresh_count == 0 and api.news_cache.peek()[1]['refreshing'] is False
+    print("✅ 匯入時沒有爬取")
+
+
+def test_gunicorn_config():
+    with mock.patch.dict(os.environ, {'API_WORKERS': '3', 'API_KEEPALIVE': '10'}, clear=False):
+        os.environ.pop('NEWS_SOURCE', None)
+        config = runpy.run_path('gunicorn.conf.py')
+        assert os.environ['NEWS_SOURCE'] == 'store'
+    assert config['workers'] == 3 and config['keepalive'] == 10
+    assert config['worker_class'] == 'gthread' and config['preload_app'] is False
+    assert config['graceful_timeout'] > 0 and config['timeout'] > 0
+    print("✅ gunicorn 設定正確")
+
+
+def test_load_script():
+    import app as api
+    server = make_server('127.0.0.1', 0, api.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        result = run_load(f'http://127.0.0.1:{server.server_port}', '/api/health',
+                          concurrency=2, duration=0.3)
+    finally:
+        server.shutdown()
+    assert result['requests'] > 0 and result['errors'] == 0
+    assert 0 < result['p50'] <= result['p95'] <= result['p99']
+    print(f"✅ 負載測試: {result['rps']:.0f} req/s")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-s', __file__]))
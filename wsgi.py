@@ -0,0 +1,13 @@
+"""
+正式環境的 WSGI 進入點
+由 gunicorn 載入（設定見 gunicorn.conf.py），取代 app.py 內建的 Werkzeug 開發伺服器：
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+匯入時只建立 Flask 應用，不會爬取、也不會開啟資料庫或圖片快取；
+這些資源都在每個 worker 第一次用到時才建立，worker 之間不共用任何連線。
+"""
+
+from app import app
+
+application = app